@@ -0,0 +1,309 @@
+"""
+CV-RAG Embedding Service Benchmark
+==================================
+Accuracy and CPU throughput of each embedding backend behind the service.
+
+For every backend (see embedding_backends.py):
+
+1. Accuracy - embeds the golden queries and the document chunks in-process
+   and compares them with the torch backend (min / mean cosine similarity,
+   checked against TOLERANCES).
+2. Throughput - starts embedding_service.py with that backend on a free
+   port, then keeps --concurrency /embed requests in flight for --duration
+   seconds and reports req/s and p50/p95/p99 latency (JSON responses, or
+   raw float32 bytes with --binary).
+
+It also reports payload size and serialize + parse time of one embedding
+in each wire format (see embedding_wire.py).
+
+Results are written as JSON, tagged with the git commit, next to the
+retrieval benchmark reports.
+
+Usage:
+    python benchmark_embedding.py                                   # all backends
+    python benchmark_embedding.py --backends torch,onnx-int8 --workers 2
+    python benchmark_embedding.py --concurrency 32 --duration 20
+    python benchmark_embedding.py --backends onnx --binary
+
+Exits with status 1 if a backend's embeddings fall outside its tolerance.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+from benchmark_retrieval import DEFAULT_OUTPUT_DIR, SCRIPT_DIR, build_corpus, git_commit, load_golden
+from embedding_backends import BACKENDS, DEFAULT_MODEL, TOLERANCES, compare_embeddings, load_model
+from embedding_wire import OCTET_STREAM, measure_formats, print_formats
+from index_tuner import percentile
+
+SERVICE = SCRIPT_DIR / "embedding_service.py"
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def check_accuracy(backends: List[str], texts: List[str], model_name: str) -> Tuple[Dict, np.ndarray]:
+    """
+    Compare each backend's embeddings with the torch backend's.
+
+    Args:
+        backends: Backends to check
+        texts: Sample texts
+        model_name: Model name or path
+
+    Returns:
+        (mapping of backend -> min/mean cosine, tolerance and pass flag,
+        torch embeddings of texts)
+    """
+    reference = load_model("torch", model_name).encode(texts, batch_size=32)
+
+    results = {}
+    for backend in backends:
+        embeddings = load_model(backend, model_name).encode(texts, batch_size=32)
+        result = compare_embeddings(reference, np.asarray(embeddings))
+        result['tolerance'] = TOLERANCES[backend]
+        result['ok'] = result['min_cosine'] >= TOLERANCES[backend]
+        results[backend] = result
+        print(f"   {backend:<11} min cosine {result['min_cosine']:.6f}  "
+              f"{'✅' if result['ok'] else '❌'} (>= {TOLERANCES[backend]})")
+    return results, reference
+
+
+def start_service(backend: str, port: int, workers: int, model_name: str,
+                  threads: int = None, startup_timeout: float = 300) -> subprocess.Popen:
+    """
+    Start embedding_service.py and wait until /health reports the model loaded.
+
+    Args:
+        backend: EMBED_BACKEND for the service
+        port: Port to listen on
+        workers: EMBED_WORKERS
+        model_name: EMBED_MODEL
+        threads: EMBED_THREADS (None: the service default)
+        startup_timeout: Seconds to wait for the model to load
+
+    Returns:
+        The running server process
+
+    Raises:
+        RuntimeError: If the service exits, fails to load the model or does
+            not become healthy
+    """
+    env = dict(os.environ, EMBED_BACKEND=backend, EMBED_PORT=str(port),
+               EMBED_WORKERS=str(workers), EMBED_MODEL=model_name)
+    if threads:
+        env['EMBED_THREADS'] = str(threads)
+
+    process = subprocess.Popen([sys.executable, str(SERVICE)], cwd=SCRIPT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"embedding_service.py exited with status {process.returncode}")
+        try:
+            response = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            if response.status_code == 200:
+                return process
+            if response.json().get('status') == 'error':
+                process.terminate()
+                raise RuntimeError(f"embedding_service.py: {response.json()['error']}")
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError(f"embedding_service.py not healthy after {startup_timeout:.0f}s")
+
+
+async def load_test(url: str, texts: List[str], concurrency: int, duration: float,
+                    binary: bool = False) -> Dict:
+    """
+    Keep `concurrency` /embed requests in flight for `duration` seconds.
+
+    Args:
+        url: /embed endpoint
+        texts: Request texts, sent round-robin
+        concurrency: Requests in flight
+        duration: Seconds to run after a short warm-up
+        binary: Ask for raw float32 bytes instead of JSON lists
+
+    Returns:
+        Dictionary with req/s, error count and latency percentiles
+    """
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    headers = {'Accept': OCTET_STREAM} if binary else {}
+
+    async with httpx.AsyncClient(timeout=30, limits=limits, headers=headers) as client:
+        # Warm-up: every connection and the model's first batches
+        await asyncio.gather(*(client.post(url, json={'text': text}) for text in texts[:concurrency]))
+
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json={'text': texts[i % len(texts)]})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+                i += concurrency
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None
+    }
+
+
+def run(backends: List[str], model_name: str, workers: int, threads: int,
+        concurrency: int, duration: float, binary: bool = False) -> Dict:
+    """
+    Run the accuracy check and the throughput test for each backend.
+
+    Args:
+        backends: Backends to benchmark
+        model_name: Model name or path
+        workers: Service worker processes
+        threads: Intra-op threads per worker (None: service default)
+        concurrency: Requests in flight
+        duration: Seconds of load per backend
+        binary: Load-test with raw float32 responses
+
+    Returns:
+        Report dictionary (see module docstring)
+    """
+    golden = load_golden()
+    queries = [item['query'] for item in golden['queries']]
+    texts = queries + [chunk['content'] for chunk in build_corpus(golden)]
+
+    print(f"\n🎯 Accuracy against torch ({len(texts)} texts)...")
+    accuracy, reference = check_accuracy(backends, texts, model_name)
+
+    print("\n📦 Wire formats (one embedding, serialize + parse)...")
+    wire_formats = measure_formats(np.asarray(reference[0], dtype=np.float32))
+    print_formats(wire_formats)
+
+    response_format = "binary float32" if binary else "JSON"
+    print(f"\n🚀 Throughput ({workers} worker(s), {concurrency} in flight, {duration:.0f}s each, "
+          f"{response_format} responses)...")
+    throughput = {}
+    for backend in backends:
+        port = free_port()
+        process = start_service(backend, port, workers, model_name, threads)
+        try:
+            throughput[backend] = asyncio.run(load_test(f"http://127.0.0.1:{port}/embed", queries,
+                                                        concurrency, duration, binary))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        print(f"   {backend:<11} {throughput[backend]['req_per_s']:>8.1f} req/s")
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'cpus': os.cpu_count()},
+        'model': model_name,
+        'workers': workers,
+        'threads': threads,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'response_format': response_format,
+        'wire_formats': wire_formats,
+        'backends': {backend: {**accuracy[backend], **throughput[backend]} for backend in backends}
+    }
+
+
+def print_report(report: Dict):
+    """Print the per-backend table."""
+    print(f"\n{'backend':<12}{'min cos':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for backend, result in report['backends'].items():
+        print(f"{backend:<12}{result['min_cosine']:>10.5f}{result['req_per_s']:>10.1f}"
+              f"{result['p50_ms'] or 0:>10.2f}{result['p95_ms'] or 0:>10.2f}{result['p99_ms'] or 0:>10.2f}"
+              f"{result['errors']:>8}")
+
+
+def main():
+    """Run the benchmark and save the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark the embedding service backends on CPU")
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help=f"Comma-separated subset of {', '.join(BACKENDS)}")
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", DEFAULT_MODEL),
+                        help="sentence-transformers model name or path")
+    parser.add_argument("--workers", type=int, default=1, help="Service worker processes (default 1)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Intra-op threads per worker (default: CPUs / workers)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight (default 16)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per backend (default 10)")
+    parser.add_argument("--binary", action="store_true",
+                        help="Load-test with Accept: application/octet-stream (raw float32)")
+    parser.add_argument("--output", help="Report path (default ../data/benchmarks/embedding_<commit>.json)")
+    args = parser.parse_args()
+
+    backends = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        print(f"❌ Unknown backend(s): {', '.join(sorted(unknown))}")
+        sys.exit(2)
+
+    print("=" * 60)
+    print("CV-RAG Embedding Service Benchmark")
+    print("=" * 60)
+
+    report = run(backends, args.model, args.workers, args.threads, args.concurrency, args.duration,
+                 args.binary)
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"embedding_{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print_report(report)
+    print(f"\n✅ Report saved to {output}")
+
+    failed = [backend for backend, result in report['backends'].items() if not result['ok']]
+    if failed:
+        print(f"\n❌ Embeddings outside tolerance: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
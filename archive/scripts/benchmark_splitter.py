@@ -0,0 +1,98 @@
+"""
+CV-RAG Splitter Benchmark
+=========================
+Checks that FastRecursiveSplitter produces exactly the same chunks as
+LangChain's RecursiveCharacterTextSplitter (as chunk_document used to
+configure it) on every Markdown file under docs/, then reports the speedup.
+
+Exits with status 1 if any chunk differs. The same comparison runs under
+pytest as tests/test_fast_splitter.py.
+
+Usage:
+    python benchmark_splitter.py [repeats]
+
+Requires langchain-text-splitters (only for the comparison).
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from chunker import SEPARATORS
+from fast_splitter import FastRecursiveSplitter
+
+DOCS_DIR = Path(__file__).parent.parent.parent / "docs"
+CONFIGS = [(500, 50), (200, 20), (1000, 100), (100, 0), (50, 50)]
+
+
+def load_corpus() -> dict:
+    """Read every Markdown document under docs/ (recursively)."""
+    return {str(path.relative_to(DOCS_DIR)): path.read_text(encoding='utf-8')
+            for path in sorted(DOCS_DIR.rglob("*.md"))}
+
+
+def time_splitter(split_fn, texts: list, repeats: int) -> float:
+    """Best wall-clock time over repeats to split all texts."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for text in texts:
+            split_fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Check equivalence and benchmark both splitters."""
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    corpus = load_corpus()
+    if not corpus:
+        print(f"❌ No Markdown files found under {DOCS_DIR}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("CV-RAG Splitter Benchmark")
+    print("=" * 60)
+    print(f"📚 {len(corpus)} documents, {sum(len(t) for t in corpus.values()):,} characters")
+
+    mismatches = 0
+    for chunk_size, chunk_overlap in CONFIGS:
+        reference = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=list(SEPARATORS),
+            length_function=len,
+        )
+        fast = FastRecursiveSplitter(chunk_size, chunk_overlap, separators=list(SEPARATORS))
+
+        n_chunks = 0
+        for name, text in corpus.items():
+            expected = reference.split_text(text)
+            actual = fast.split_text(text)
+            n_chunks += len(expected)
+            if actual != expected:
+                mismatches += 1
+                print(f"  ❌ {name} (size={chunk_size}, overlap={chunk_overlap}): "
+                      f"{len(actual)} chunks vs {len(expected)} expected")
+
+        texts = list(corpus.values())
+        langchain_time = time_splitter(reference.split_text, texts, repeats)
+        fast_time = time_splitter(fast.split_text, texts, repeats)
+        print(f"  size={chunk_size:>4} overlap={chunk_overlap:>3}: {n_chunks:>4} chunks | "
+              f"langchain {langchain_time * 1000:7.2f} ms | fast {fast_time * 1000:7.2f} ms | "
+              f"{langchain_time / fast_time:4.1f}x")
+
+    if mismatches:
+        print(f"\n❌ {mismatches} document/config combinations differ from LangChain")
+        sys.exit(1)
+    print("\n✅ All chunks identical to RecursiveCharacterTextSplitter")
+
+
+if __name__ == "__main__":
+    main()
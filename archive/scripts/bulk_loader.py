@@ -0,0 +1,256 @@
+"""
+CV-RAG Bulk Vector Loader
+=========================
+Fast loading of chunk rows (with pgvector embeddings) into cv_chunks.
+
+Inserting one row per cursor.execute() costs a network round trip per chunk,
+which dominates ingest time against a remote database like Neon. This module
+streams rows to Postgres with COPY ... FROM STDIN instead:
+
+- "copy_binary": PGCOPY binary format. Vectors are written in pgvector's
+  binary wire format (int16 dim, int16 unused, dim x float4), so no float
+  is ever printed or parsed as text.
+- "copy_text":   COPY text format, vectors written as '[x,y,...]' literals.
+- "batched":     psycopg2.extras.execute_values (multi-row INSERTs).
+- "per_row":     the original one-INSERT-per-chunk loop (for benchmarks).
+
+bulk_load_chunks() tries binary COPY first and falls back to execute_values if
+the server or connection pooler rejects COPY.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import io
+import struct
+from typing import Dict, Iterable, Iterator, List
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+COLUMNS = ("chunk_id", "content", "source", "chunk_index", "total_chunks", "embedding", "content_hash",
+           "version", "section")
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+
+
+def chunk_row(chunk: Dict) -> tuple:
+    """
+    Convert a chunk dictionary into a tuple in COLUMNS order.
+
+    Args:
+        chunk: Chunk with embedding (and optional content_hash / version / section)
+
+    Returns:
+        Row tuple
+    """
+    return (
+        chunk['chunk_id'],
+        chunk['content'],
+        chunk['source'],
+        chunk['chunk_index'],
+        chunk['total_chunks'],
+        chunk['embedding'],
+        chunk.get('content_hash'),
+        chunk.get('version'),
+        chunk.get('section')
+    )
+
+
+class IteratorFile(io.RawIOBase):
+    """Read-only file object over an iterator of byte strings (for copy_expert)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _binary_field(value, kind: str) -> bytes:
+    """Encode one field in PGCOPY binary format (length-prefixed)."""
+    if value is None:
+        return struct.pack("!i", -1)
+    if kind == "int":
+        return struct.pack("!ii", 4, value)
+    if kind == "vector":
+        payload = struct.pack(f"!hh{len(value)}f", len(value), 0, *value)
+        return struct.pack("!i", len(payload)) + payload
+    data = value.encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+BINARY_KINDS = ("text", "text", "text", "int", "int", "vector", "text", "text", "text")
+
+
+def encode_binary_rows(rows: Iterable[tuple]) -> Iterator[bytes]:
+    """
+    Encode rows as a PGCOPY binary stream.
+
+    Args:
+        rows: Row tuples in COLUMNS order
+
+    Yields:
+        Byte strings (header, one per row, trailer)
+    """
+    yield PGCOPY_HEADER
+    field_count = struct.pack("!h", len(COLUMNS))
+    for row in rows:
+        yield field_count + b"".join(_binary_field(value, kind) for value, kind in zip(row, BINARY_KINDS))
+    yield PGCOPY_TRAILER
+
+
+def _text_field(value) -> str:
+    """Encode one field in COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(repr(float(x)) for x in value) + "]"
+    return (str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+
+def encode_text_rows(rows: Iterable[tuple]) -> Iterator[bytes]:
+    """
+    Encode rows as a COPY text-format stream.
+
+    Args:
+        rows: Row tuples in COLUMNS order
+
+    Yields:
+        One tab-separated, newline-terminated line per row
+    """
+    for row in rows:
+        yield ("\t".join(_text_field(value) for value in row) + "\n").encode("utf-8")
+
+
+def copy_rows(cursor, rows: Iterable[tuple], table: str = "cv_chunks", binary: bool = True):
+    """
+    Stream rows into a table with COPY ... FROM STDIN.
+
+    Args:
+        cursor: psycopg2 cursor
+        rows: Row tuples in COLUMNS order
+        table: Target table name
+        binary: Use PGCOPY binary format (otherwise text format)
+    """
+    if binary:
+        stream = IteratorFile(encode_binary_rows(rows))
+        options = " WITH (FORMAT binary)"
+    else:
+        stream = IteratorFile(encode_text_rows(rows))
+        options = ""
+
+    cursor.copy_expert(f"COPY {table} ({', '.join(COLUMNS)}) FROM STDIN{options}", stream)
+
+
+def insert_rows_batched(cursor, rows: List[tuple], table: str = "cv_chunks", page_size: int = 500):
+    """
+    Insert rows with multi-row INSERT statements (execute_values).
+
+    Args:
+        cursor: psycopg2 cursor
+        rows: Row tuples in COLUMNS order
+        table: Target table name
+        page_size: Rows per INSERT statement
+    """
+    execute_values(
+        cursor,
+        f"INSERT INTO {table} ({', '.join(COLUMNS)}) VALUES %s",
+        rows,
+        template="(%s, %s, %s, %s, %s, %s::vector, %s, %s, %s)",
+        page_size=page_size
+    )
+
+
+def insert_rows_per_row(cursor, rows: List[tuple], table: str = "cv_chunks"):
+    """
+    Insert rows one statement at a time (the original, slowest approach).
+
+    Args:
+        cursor: psycopg2 cursor
+        rows: Row tuples in COLUMNS order
+        table: Target table name
+    """
+    for row in rows:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s, %s::vector, %s, %s, %s)",
+            row
+        )
+
+
+def _vector_literal_rows(rows: List[tuple]) -> List[tuple]:
+    """Render embeddings as pgvector text literals for the INSERT paths."""
+    return [row[:5] + (_text_field(row[5]),) + row[6:] for row in rows]
+
+
+def load_rows(conn, rows: List[tuple], method: str = "copy_binary", table: str = "cv_chunks"):
+    """
+    Load rows using a specific method (no fallback). Caller commits.
+
+    Args:
+        conn: psycopg2 connection object
+        rows: Row tuples in COLUMNS order
+        method: "copy_binary", "copy_text", "batched" or "per_row"
+        table: Target table name
+    """
+    with conn.cursor() as cursor:
+        if method == "copy_binary":
+            copy_rows(cursor, rows, table, binary=True)
+        elif method == "copy_text":
+            copy_rows(cursor, rows, table, binary=False)
+        elif method == "batched":
+            insert_rows_batched(cursor, _vector_literal_rows(rows), table)
+        elif method == "per_row":
+            insert_rows_per_row(cursor, _vector_literal_rows(rows), table)
+        else:
+            raise ValueError(f"Unknown load method: {method}")
+
+
+def bulk_load_chunks(conn, chunks: List[Dict], table: str = "cv_chunks") -> str:
+    """
+    Bulk-load chunks, preferring binary COPY with execute_values as fallback.
+
+    Runs inside the caller's transaction; a savepoint keeps a failed COPY
+    from aborting it. Caller commits.
+
+    Args:
+        conn: psycopg2 connection object
+        chunks: Chunks with embeddings
+        table: Target table name
+
+    Returns:
+        Name of the method that loaded the rows
+    """
+    rows = [chunk_row(chunk) for chunk in chunks]
+
+    with conn.cursor() as cursor:
+        cursor.execute("SAVEPOINT bulk_load;")
+    try:
+        load_rows(conn, rows, "copy_binary", table)
+        return "copy_binary"
+    except psycopg2.Error as e:
+        print(f"  COPY failed ({e.pgerror or e}); falling back to execute_values")
+        with conn.cursor() as cursor:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_load;")
+
+    load_rows(conn, rows, "batched", table)
+    return "batched"
@@ -15,15 +15,50 @@ This file is kept for reference only.
 
 For the current implementation, see: n8n/README.md
 
+Usage:
+    python chunker.py                          # resume + supplemental -> data/chunks.json
+    python chunker.py --dir ../docs            # every *.md/*.txt under a directory -> data/chunks.jsonl
+    python chunker.py --dir ../docs --workers 8 --output /tmp/chunks.jsonl
+    python chunker.py --mode tokens            # Markdown-aware, token-budgeted chunks
+
+--mode tokens packs headings, bullet items and paragraphs into chunks of at
+most --max-tokens tokens of the embedding model's tokenizer (see
+token_chunker.py) instead of 500-character windows.
+
+Every chunk records its Markdown heading trail ('section') and, for files
+named docs/versions/<type>_<role>_*.md, the resume variant ('version'), so
+retrieval can be filtered by them (see metadata_filters.py).
+
+Directory mode chunks files in a process pool and streams the results out
+as JSON Lines (one chunk per line) with a bounded number of documents in
+flight, so memory stays flat however many resume variants are ingested.
+Each file's 'source' is its path relative to --dir without the extension
+(e.g. versions/resume_general_mike-murphy). The run stops before writing
+anything if two files would share a source or chunk_id.
+
 Author: Mike Murphy
 Project: CV-RAG
 """
 
 import os
+import sys
 import json
+import time
+import bisect
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from functools import lru_cache
+from typing import Iterator, List, Dict, Optional
+
+from fast_splitter import FastRecursiveSplitter
+from token_chunker import DEFAULT_MAX_TOKENS, FENCE, HEADING, RULE, TokenCounter, chunk_markdown, load_tokenizer
+
+# Separators: Try paragraphs first, then newlines, then sentences, then words
+SEPARATORS = ("\n\n", "\n", ". ", " ", "")
+
+DEFAULT_TOKENIZER = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
 
 def load_document(file_path: str) -> str:
@@ -41,6 +76,26 @@ def load_document(file_path: str) -> str:
     return content
 
 
+@lru_cache(maxsize=8)
+def get_splitter(chunk_size: int, chunk_overlap: int) -> FastRecursiveSplitter:
+    """
+    Build (once per configuration) the splitter used by chunk_document.
+
+    FastRecursiveSplitter produces the same chunks as LangChain's
+    RecursiveCharacterTextSplitter with these settings (see
+    benchmark_splitter.py), without its per-call setup and string copies.
+
+    Args:
+        chunk_size: Target size for each chunk in characters
+        chunk_overlap: Number of characters to overlap between chunks
+
+    Returns:
+        Shared splitter instance
+    """
+    return FastRecursiveSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                 separators=list(SEPARATORS))
+
+
 def chunk_document(content: str, source: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[Dict]:
     """
     Split document into chunks using recursive character splitting.
@@ -57,14 +112,8 @@ def chunk_document(content: str, source: str, chunk_size: int = 500, chunk_overl
     Returns:
         List of dictionaries with chunk content and metadata
     """
-    # Initialize the text splitter
-    # Separators: Try paragraphs first, then newlines, then sentences, then words
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ". ", " ", ""],
-        length_function=len,
-    )
+    # Get the (cached) text splitter
+    text_splitter = get_splitter(chunk_size, chunk_overlap)
 
     # Split the text
     chunks = text_splitter.split_text(content)
@@ -83,10 +132,336 @@ def chunk_document(content: str, source: str, chunk_size: int = 500, chunk_overl
     return chunk_data
 
 
+@lru_cache(maxsize=4)
+def get_token_counter(tokenizer: str) -> TokenCounter:
+    """
+    Load (once per process) a cached token counter for a tokenizer.
+
+    Args:
+        tokenizer: Tokenizer name or path (see token_chunker.load_tokenizer)
+
+    Returns:
+        Shared TokenCounter
+    """
+    return TokenCounter(load_tokenizer(tokenizer))
+
+
+def heading_trails(content: str) -> List[tuple]:
+    """
+    Offsets where the Markdown heading trail changes.
+
+    Args:
+        content: Document text
+
+    Returns:
+        Sorted [(offset, "Title > Section > Subsection")] (code fences skipped)
+    """
+    trails = []
+    stack = []
+    in_fence = False
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        if FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING.match(line)
+            if match:
+                level = len(match.group(1))
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, line[match.end():].strip().strip("#").strip()))
+                trails.append((offset, " > ".join(title for _, title in stack)))
+        offset += len(line)
+    return trails
+
+
+def assign_sections(content: str, chunks: List[Dict]) -> List[Dict]:
+    """
+    Set each chunk's 'section' to the heading trail its body falls under.
+
+    A chunk is located by its first line that is neither a heading (token
+    chunks may start with repeated heading context) nor a horizontal rule; chunks are searched in order so
+    repeated lines resolve to the right occurrence.
+
+    Args:
+        content: Document the chunks came from
+        chunks: Chunks in document order
+
+    Returns:
+        The same chunks, updated in place
+    """
+    trails = heading_trails(content)
+    offsets = [offset for offset, _ in trails]
+    cursor = 0
+    for chunk in chunks:
+        lines = [line for line in chunk['content'].splitlines() if line.strip()]
+        body = next((line for line in lines if not HEADING.match(line) and not RULE.match(line)),
+                    lines[0] if lines else "")
+        position = content.find(body, cursor)
+        if position < 0:
+            position = content.find(body)
+        if position >= 0:
+            cursor = position
+        i = bisect.bisect_right(offsets, max(position, 0)) - 1
+        chunk['section'] = trails[i][1] if i >= 0 else None
+    return chunks
+
+
+def document_version(file_path: Path) -> Optional[str]:
+    """
+    Resume variant of a file under docs/versions.
+
+    Files there are named <type>_<role>_<name>.md, e.g.
+    resume_openai_mike-murphy_ops.md -> "openai".
+
+    Args:
+        file_path: Document path
+
+    Returns:
+        Role part of the name, or None for other documents
+    """
+    if "versions" not in file_path.parts:
+        return None
+    parts = file_path.stem.split("_")
+    return parts[1][:50] if len(parts) >= 3 else None
+
+
+def chunk_text(content: str, source: str, mode: str = "chars", max_tokens: int = DEFAULT_MAX_TOKENS,
+               tokenizer: str = DEFAULT_TOKENIZER, version: str = None) -> List[Dict]:
+    """
+    Chunk a document with the selected strategy.
+
+    Args:
+        content: Document text
+        source: Source identifier
+        mode: "chars" (chunk_document) or "tokens" (token_chunker.chunk_markdown)
+        max_tokens: Token budget per chunk (tokens mode)
+        tokenizer: Tokenizer of the embedding model (tokens mode)
+        version: Resume variant recorded on each chunk (see document_version)
+
+    Returns:
+        List of chunk dictionaries with 'version' and 'section' metadata
+    """
+    if mode == "tokens":
+        chunks = chunk_markdown(content, source, get_token_counter(tokenizer), max_tokens)
+    else:
+        chunks = chunk_document(content, source)
+
+    for chunk in chunks:
+        chunk['version'] = version
+    return assign_sections(content, chunks)
+
+
+def find_documents(root: Path, patterns=("*.md", "*.txt")) -> Iterator[Path]:
+    """
+    Walk a directory for text documents, in a stable order.
+
+    Args:
+        root: Directory to search (recursively)
+        patterns: Glob patterns of files to include
+
+    Yields:
+        Paths of matching files
+    """
+    for pattern in patterns:
+        yield from sorted(p for p in root.rglob(pattern) if p.is_file())
+
+
+def source_name(file_path: Path, root: Path = None) -> str:
+    """
+    Derive the cv_chunks 'source' value for a file.
+
+    Args:
+        file_path: Document path
+        root: Directory being chunked (None: use the file stem alone)
+
+    Returns:
+        Path relative to root without its extension, e.g.
+        versions/resume_general_mike-murphy, trimmed to fit the
+        VARCHAR(50) source column
+    """
+    relative = file_path.relative_to(root) if root else Path(file_path.name)
+    return relative.with_suffix("").as_posix()[:50]
+
+
+def directory_sources(paths: List[Path], root: Path) -> Dict[Path, str]:
+    """
+    Assign each file its source, refusing names that collide.
+
+    Chunk ids are "<source>_<n>", so two files with the same source (e.g.
+    x.md and x.txt, or names cut at 50 characters) would overwrite each
+    other's chunks.
+
+    Args:
+        paths: Documents found under root
+        root: Directory being chunked
+
+    Returns:
+        Mapping of path -> source
+
+    Raises:
+        ValueError: If two files map to the same source
+    """
+    sources = {}
+    owners = {}
+    for path in paths:
+        source = source_name(path, root)
+        if source in owners:
+            raise ValueError(f"{owners[source]} and {path} would both be ingested as source '{source}'")
+        owners[source] = path
+        sources[path] = source
+    return sources
+
+
+def chunk_file(file_path: str, mode: str = "chars", max_tokens: int = DEFAULT_MAX_TOKENS,
+               tokenizer: str = DEFAULT_TOKENIZER, source: str = None) -> List[Dict]:
+    """
+    Load and chunk one file (runs inside a worker process).
+
+    Args:
+        file_path: Path to the document
+        mode: Chunking strategy (see chunk_text)
+        max_tokens: Token budget per chunk (tokens mode)
+        tokenizer: Tokenizer of the embedding model (tokens mode)
+        source: cv_chunks source (default: source_name of the file)
+
+    Returns:
+        List of chunk dictionaries for the file
+    """
+    path = Path(file_path)
+    return chunk_text(load_document(path), source or source_name(path), mode, max_tokens, tokenizer,
+                      document_version(path))
+
+
+def chunk_directory(root: Path, output_file: Path, workers: int = None, mode: str = "chars",
+                    max_tokens: int = DEFAULT_MAX_TOKENS, tokenizer: str = DEFAULT_TOKENIZER) -> Dict:
+    """
+    Chunk every document under a directory into a JSON Lines file.
+
+    Files are chunked in a process pool. At most a few documents per worker
+    are in flight, and each document's chunks are written as soon as its
+    turn comes (in file order), so memory does not grow with the corpus.
+    Output goes to a temporary file that replaces output_file only when
+    every chunk_id was unique.
+
+    Args:
+        root: Directory containing the documents
+        output_file: Destination .jsonl file
+        workers: Worker processes (default: CPU count)
+        mode: Chunking strategy (see chunk_text)
+        max_tokens: Token budget per chunk (tokens mode)
+        tokenizer: Tokenizer of the embedding model (tokens mode)
+
+    Returns:
+        Run statistics: docs, chunks, chars, tokens (tokens mode), seconds
+
+    Raises:
+        ValueError: If two files share a source or two chunks a chunk_id
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    stats = {'docs': 0, 'chunks': 0, 'chars': 0, 'tokens': 0, 'seconds': 0.0}
+
+    start = time.perf_counter()
+    sources = directory_sources(list(find_documents(root)), root)
+    output_file = Path(output_file)
+    partial_file = output_file.with_name(output_file.name + ".partial")
+    chunk_ids = set()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool, \
+                open(partial_file, 'w', encoding='utf-8') as out:
+            in_flight = deque()
+
+            def drain_one():
+                path, future = in_flight.popleft()
+                chunks = future.result()
+                for chunk in chunks:
+                    if chunk['chunk_id'] in chunk_ids:
+                        raise ValueError(f"Duplicate chunk_id '{chunk['chunk_id']}' (from {path})")
+                    chunk_ids.add(chunk['chunk_id'])
+                    out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                    stats['chars'] += len(chunk['content'])
+                    stats['tokens'] += chunk.get('tokens', 0)
+                stats['docs'] += 1
+                stats['chunks'] += len(chunks)
+
+            for path, source in sources.items():
+                if len(in_flight) >= max_in_flight:
+                    drain_one()
+                in_flight.append((path, pool.submit(chunk_file, str(path), mode, max_tokens, tokenizer, source)))
+
+            while in_flight:
+                drain_one()
+    except BaseException:
+        partial_file.unlink(missing_ok=True)
+        raise
+
+    os.replace(partial_file, output_file)
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main_directory(args):
+    """
+    Directory mode: parallel chunking streamed to JSON Lines.
+
+    Args:
+        args: Parsed command-line arguments
+    """
+    root = Path(args.dir)
+    output_file = Path(args.output) if args.output else Path(__file__).parent.parent / "data" / "chunks.jsonl"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 60)
+    print("CV-RAG Document Chunker (directory mode)")
+    print("=" * 60)
+    print(f"\nScanning: {root}")
+
+    try:
+        stats = chunk_directory(root, output_file, args.workers, args.mode, args.max_tokens, args.tokenizer)
+    except ValueError as e:
+        print(f"\nError: {e}")
+        print(f"{output_file} was not changed")
+        sys.exit(1)
+    seconds = max(stats['seconds'], 1e-9)
+
+    print(f"\n{'=' * 60}")
+    print(f" Success! Created {stats['chunks']} chunks from {stats['docs']} documents")
+    print(f" Saved to: {output_file}")
+    print(f"{'=' * 60}\n")
+
+    print("Chunk Statistics:")
+    print(f"  Elapsed: {stats['seconds']:.2f}s")
+    print(f"  Throughput: {stats['docs'] / seconds:.1f} docs/sec, {stats['chunks'] / seconds:.1f} chunks/sec")
+    if stats['chunks']:
+        print(f"  Average chunk size: {stats['chars'] // stats['chunks']} characters")
+        if stats['tokens']:
+            print(f"  Average chunk fill: {stats['tokens'] / stats['chunks']:.0f}/{args.max_tokens} tokens")
+    print()
+
+
 def main():
     """
     Main function to chunk CV documents.
     """
+    parser = argparse.ArgumentParser(description="Chunk CV-RAG documents")
+    parser.add_argument("--dir", help="Chunk every *.md/*.txt under this directory (JSON Lines output)")
+    parser.add_argument("--output", help="Output file (directory mode)")
+    parser.add_argument("--workers", type=int, help="Worker processes (directory mode)")
+    parser.add_argument("--mode", choices=["chars", "tokens"], default="chars",
+                        help="chars: 500-character windows; tokens: Markdown blocks packed to a token budget")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                        help="Token budget per chunk (tokens mode)")
+    parser.add_argument("--tokenizer", default=DEFAULT_TOKENIZER,
+                        help="Embedding model tokenizer: model name, HF repo id or tokenizer.json (tokens mode)")
+    args = parser.parse_args()
+
+    if args.dir:
+        main_directory(args)
+        return
+
     # Set up paths
     project_root = Path(__file__).parent.parent
     docs_dir = project_root / "docs"
@@ -121,7 +496,7 @@ def main():
         print(f"   Loaded {len(content)} characters")
 
         # Chunk document
-        chunks = chunk_document(content, source)
+        chunks = chunk_text(content, source, args.mode, args.max_tokens, args.tokenizer)
         print(f"   Created {len(chunks)} chunks")
 
         # Add to all chunks
@@ -149,6 +524,8 @@ def main():
     print(f"  Resume chunks: {sum(1 for c in all_chunks if c['source'] == 'resume')}")
     print(f"  Supplemental chunks: {sum(1 for c in all_chunks if c['source'] == 'supplemental')}")
     print(f"  Average chunk size: {sum(len(c['content']) for c in all_chunks) // len(all_chunks)} characters")
+    if args.mode == "tokens":
+        print(f"  Average chunk fill: {sum(c['tokens'] for c in all_chunks) / len(all_chunks):.0f}/{args.max_tokens} tokens")
     print()
 
 
@@ -18,88 +18,201 @@ This file is kept for reference only.
 
 For the current implementation, see: n8n/README.md
 
+Usage:
+    python embedder.py                               # incremental sync of the newest chunks file
+    python embedder.py --chunks ../data/chunks.jsonl # sync a specific chunks file
+    python embedder.py --full                        # rebuild cv_chunks and swap it in
+    python embedder.py --no-warm                     # skip refreshing the app's warm answers
+
+The chunks file defines the whole corpus: incremental sync deletes rows
+whose chunk_id is not in it. Without --chunks, the newer of
+data/chunks.json (chunker.py) and data/chunks.jsonl (chunker.py --dir) is
+used, and the choice is printed. Ingestion ends by running
+streamlit/warm_answers.py, so the precomputed sample answers always match
+the new corpus.
+
 Author: Mike Murphy
 Project: CV-RAG
 """
 
 import os
+import sys
 import json
+import hashlib
+import argparse
+import subprocess
 from pathlib import Path
 from typing import List, Dict
 import psycopg2
-from sentence_transformers import SentenceTransformer
+from psycopg2 import sql
 from dotenv import load_dotenv
 
+from bulk_loader import bulk_load_chunks
+from embedding_cache import EmbeddingCache
+from hybrid_retriever import FTS_INDEX_SQL
+from index_tuner import DEFAULT_INDEX, index_sql
+from metadata_filters import create_partial_indexes
+from quantization import create_quantized_index
+
+# Precomputes the Streamlit app's sample answers (last ingest step)
+WARM_ANSWERS_SCRIPT = Path(__file__).resolve().parent.parent.parent / "streamlit" / "warm_answers.py"
+
 
 def load_chunks(chunks_file: str) -> List[Dict]:
     """
-    Load chunks from JSON file created by chunker.py
+    Load chunks from the JSON or JSON Lines file created by chunker.py
 
     Args:
-        chunks_file: Path to chunks.json
+        chunks_file: Path to chunks.json or chunks.jsonl
 
     Returns:
         List of chunk dictionaries
     """
     with open(chunks_file, 'r', encoding='utf-8') as f:
+        if str(chunks_file).endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
         chunks = json.load(f)
     return chunks
 
 
-def generate_embeddings(chunks: List[Dict], model_name: str = "all-MiniLM-L6-v2") -> List[Dict]:
+def default_chunks_file(data_dir: Path) -> Path:
+    """
+    Pick the chunks file chunker.py wrote most recently.
+
+    Args:
+        data_dir: Directory holding chunks.json / chunks.jsonl
+
+    Returns:
+        The newer existing file, or None if neither exists
+    """
+    candidates = [path for path in (data_dir / "chunks.json", data_dir / "chunks.jsonl") if path.exists()]
+    return max(candidates, key=lambda path: path.stat().st_mtime) if candidates else None
+
+
+def generate_embeddings(chunks: List[Dict], model_name: str = "all-MiniLM-L6-v2",
+                        cache: EmbeddingCache = None) -> List[Dict]:
     """
     Generate vector embeddings for each chunk using sentence-transformers.
 
+    When a cache is given, chunks whose normalized text was already embedded
+    with the same model are served from disk, and only the misses are sent
+    to the model (which is not even loaded if everything hits).
+
     Args:
         chunks: List of chunk dictionaries with 'content' field
         model_name: Name of the sentence-transformers model to use
+        cache: Optional EmbeddingCache for previously computed embeddings
 
     Returns:
         Chunks with added 'embedding' field (list of floats)
     """
-    print(f"\nLoading embedding model: {model_name}")
-    model = SentenceTransformer(model_name)
-
-    print(f"Generating embeddings for {len(chunks)} chunks...")
-
     # Extract just the content for embedding
     texts = [chunk['content'] for chunk in chunks]
 
-    # Generate embeddings in batch (more efficient)
-    embeddings = model.encode(texts, show_progress_bar=True)
+    if cache is not None:
+        embeddings = cache.get_many(texts)
+    else:
+        embeddings = [None] * len(texts)
+
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    if missing:
+        # Imported here: torch takes seconds to import and is not needed
+        # when every chunk is cached or unchanged
+        from sentence_transformers import SentenceTransformer
+
+        print(f"\nLoading embedding model: {model_name}")
+        model = SentenceTransformer(model_name)
+
+        print(f"Generating embeddings for {len(missing)} chunks...")
+
+        # Generate embeddings in batch (more efficient)
+        missing_texts = [texts[i] for i in missing]
+        new_embeddings = model.encode(missing_texts, show_progress_bar=True)
+
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+
+        if cache is not None:
+            cache.add_many(missing_texts, new_embeddings)
 
     # Add embeddings to chunks
     for i, chunk in enumerate(chunks):
         chunk['embedding'] = embeddings[i].tolist()
 
-    print(f"Generated {len(embeddings)} embeddings")
+    print(f"Generated {len(missing)} embeddings ({len(embeddings)} total)")
     print(f"Embedding dimension: {len(embeddings[0])}")
+    if cache is not None:
+        print(f"Embedding cache: {cache.hits} hits, {cache.misses} misses")
 
     return chunks
 
 
-def create_database_schema(conn):
+def chunk_hash(chunk: Dict, model_name: str) -> str:
     """
-    Create the cv_chunks table with pgvector extension.
+    Hash everything stored for a chunk, so any change marks its row as stale.
+
+    Unlike the embedding cache key (embedding_cache.content_hash), the text
+    is hashed as-is: a whitespace-only edit reuses the cached embedding but
+    still rewrites the row's content.
+
+    Args:
+        chunk: Chunk dictionary from chunker.py
+        model_name: Embedding model (a model change invalidates every row)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    fingerprint = (f"{chunk['source']}|{chunk['chunk_index']}|{chunk['total_chunks']}|"
+                   f"{chunk.get('version')}|{chunk.get('section')}|{chunk['content']}")
+    return hashlib.sha256(f"{model_name}\0{fingerprint}".encode("utf-8")).hexdigest()
+
+
+def create_vector_index(conn):
+    """
+    Create the HNSW similarity index on cv_chunks.embedding.
+
+    An existing index (e.g. one chosen by index_tuner.py) is kept. On a full
+    re-ingest this runs after the bulk load, which builds the graph faster
+    than inserting into it row by row; re-run index_tuner.py afterwards to
+    re-tune for the new corpus size.
+
+    A partial index per resume version is added so version-filtered
+    searches only walk that variant's rows (see metadata_filters.py).
+
+    With VECTOR_QUANTIZATION=halfvec|binary the reduced-precision index used
+    by the Retriever's first pass is created as well (pgvector >= 0.7).
 
     Args:
         conn: psycopg2 connection object
     """
     cursor = conn.cursor()
+    cursor.execute(index_sql(DEFAULT_INDEX))
+    print("  Created vector similarity index")
+    conn.commit()
+    cursor.close()
 
-    print("\nSetting up database schema...")
+    versions = create_partial_indexes(conn, "version")
+    if versions:
+        print(f"  Created {len(versions)} per-version partial index(es)")
 
-    # Enable pgvector extension
-    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-    print("  Enabled pgvector extension")
+    quantization = os.getenv("VECTOR_QUANTIZATION")
+    if quantization:
+        create_quantized_index(conn, quantization)
+        print(f"  Created {quantization} first-pass index")
 
-    # Drop table if exists (for development - remove in production!)
-    cursor.execute("DROP TABLE IF EXISTS cv_chunks;")
 
-    # Create table
+def create_chunks_table(cursor, table: str = "cv_chunks"):
+    """
+    Create a chunks table (cv_chunks, or the staging table of a full re-ingest).
+
+    Args:
+        cursor: psycopg2 cursor
+        table: Table name
+    """
     # Note: VECTOR(384) matches all-MiniLM-L6-v2 embedding dimension
-    cursor.execute("""
-        CREATE TABLE cv_chunks (
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
             id SERIAL PRIMARY KEY,
             chunk_id VARCHAR(100) UNIQUE NOT NULL,
             content TEXT NOT NULL,
@@ -107,61 +220,252 @@ def create_database_schema(conn):
             chunk_index INTEGER,
             total_chunks INTEGER,
             embedding VECTOR(384),
+            content_hash VARCHAR(64),
+            version VARCHAR(50),
+            section TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
-    """)
+    """).format(sql.Identifier(table)))
+
+
+def swap_in_table(conn, staging: str):
+    """
+    Replace cv_chunks with a fully loaded staging table.
+
+    The old table serves queries until this one short transaction drops it
+    and renames the staging table (with its key, constraint and sequence)
+    to cv_chunks, so a full re-ingest never exposes a missing or empty
+    table.
+
+    Args:
+        conn: psycopg2 connection object
+        staging: Staging table created by create_chunks_table
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS cv_chunks;")
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO cv_chunks").format(sql.Identifier(staging)))
+        for suffix, kind in (("pkey", "INDEX"), ("chunk_id_key", "INDEX"), ("id_seq", "SEQUENCE")):
+            cursor.execute(sql.SQL("ALTER {} {} RENAME TO {}").format(
+                sql.SQL(kind), sql.Identifier(f"{staging}_{suffix}"), sql.Identifier(f"cv_chunks_{suffix}")))
+    conn.commit()
+
+
+def create_database_schema(conn, create_index: bool = True):
+    """
+    Create the cv_chunks table with pgvector extension.
+
+    Args:
+        conn: psycopg2 connection object
+        create_index: Also create the vector index
+    """
+    cursor = conn.cursor()
+
+    print("\nSetting up database schema...")
+
+    # Enable pgvector extension
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    print("  Enabled pgvector extension")
+
+    # Create table
+    create_chunks_table(cursor)
+    # Tables created before incremental ingest have no content_hash column
+    cursor.execute("ALTER TABLE cv_chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);")
+    # ...and tables created before metadata filtering no version/section
+    cursor.execute("ALTER TABLE cv_chunks ADD COLUMN IF NOT EXISTS version VARCHAR(50);")
+    cursor.execute("ALTER TABLE cv_chunks ADD COLUMN IF NOT EXISTS section TEXT;")
     print("  Created cv_chunks table")
 
-    # Create index for vector similarity search
-    cursor.execute("""
-        CREATE INDEX ON cv_chunks USING ivfflat (embedding vector_cosine_ops)
-        WITH (lists = 10);
-    """)
-    print("  Created vector similarity index")
+    # Full-text index for the keyword leg of hybrid search
+    cursor.execute(FTS_INDEX_SQL)
+    print("  Created full-text search index")
 
     conn.commit()
     cursor.close()
 
+    # Create index for vector similarity search
+    if create_index:
+        create_vector_index(conn)
+
 
-def store_embeddings(chunks: List[Dict], connection_string: str):
+def fetch_stored_hashes(conn) -> Dict[str, str]:
     """
-    Store chunks and their embeddings in Neon Postgres.
+    Read the chunk_id -> content_hash map currently in cv_chunks.
 
     Args:
-        chunks: List of chunks with embeddings
+        conn: psycopg2 connection object
+
+    Returns:
+        Dictionary of stored hashes (None for rows ingested before hashing)
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT chunk_id, content_hash FROM cv_chunks;")
+    stored = dict(cursor.fetchall())
+    cursor.close()
+    return stored
+
+
+def diff_chunks(chunks: List[Dict], stored: Dict[str, str], model_name: str) -> Dict[str, List]:
+    """
+    Compare the new chunk set against what is stored in the database.
+
+    Args:
+        chunks: New chunks from chunker.py
+        stored: chunk_id -> content_hash map from fetch_stored_hashes
+        model_name: Embedding model used for the new chunks
+
+    Returns:
+        Dictionary with 'insert' and 'update' (chunk lists), 'delete'
+        (chunk_ids no longer present) and 'unchanged' (count)
+    """
+    diff = {'insert': [], 'update': [], 'delete': [], 'unchanged': 0}
+    seen = set()
+
+    for chunk in chunks:
+        chunk['content_hash'] = chunk_hash(chunk, model_name)
+        seen.add(chunk['chunk_id'])
+
+        if chunk['chunk_id'] not in stored:
+            diff['insert'].append(chunk)
+        elif stored[chunk['chunk_id']] != chunk['content_hash']:
+            diff['update'].append(chunk)
+        else:
+            diff['unchanged'] += 1
+
+    diff['delete'] = [chunk_id for chunk_id in stored if chunk_id not in seen]
+    return diff
+
+
+def apply_chunk_diff(conn, diff: Dict[str, List]):
+    """
+    Apply an ingest diff in a single transaction.
+
+    Readers keep seeing the old rows until the commit, so the live query
+    path never observes an empty or half-written table.
+
+    Args:
+        conn: psycopg2 connection object
+        diff: Output of diff_chunks, with embeddings on inserted/updated chunks
+    """
+    # "with conn" commits on success and rolls back on any error
+    with conn:
+        with conn.cursor() as cursor:
+            if diff['delete']:
+                cursor.execute("DELETE FROM cv_chunks WHERE chunk_id = ANY(%s);", (diff['delete'],))
+
+            if diff['update']:
+                cursor.executemany("""
+                    UPDATE cv_chunks
+                    SET content = %s, source = %s, chunk_index = %s,
+                        total_chunks = %s, embedding = %s, content_hash = %s,
+                        version = %s, section = %s
+                    WHERE chunk_id = %s
+                """, [(
+                    chunk['content'],
+                    chunk['source'],
+                    chunk['chunk_index'],
+                    chunk['total_chunks'],
+                    chunk['embedding'],
+                    chunk['content_hash'],
+                    chunk.get('version'),
+                    chunk.get('section'),
+                    chunk['chunk_id']
+                ) for chunk in diff['update']])
+
+        if diff['insert']:
+            bulk_load_chunks(conn, diff['insert'])
+
+
+def sync_embeddings(chunks: List[Dict], connection_string: str, model_name: str,
+                    cache: EmbeddingCache = None):
+    """
+    Incrementally ingest chunks: only changed rows are embedded and written.
+
+    Args:
+        chunks: List of chunks from chunker.py (without embeddings)
         connection_string: PostgreSQL connection string
+        model_name: Name of the sentence-transformers model to use
+        cache: Optional EmbeddingCache for previously computed embeddings
     """
     print(f"\nConnecting to database...")
-
-    # Connect to database
     conn = psycopg2.connect(connection_string)
     print("  Connected to Neon Postgres")
 
-    # Create schema
     create_database_schema(conn)
 
-    # Insert chunks
+    diff = diff_chunks(chunks, fetch_stored_hashes(conn), model_name)
+    print(f"\nIncremental ingest diff:")
+    print(f"  Insert: {len(diff['insert'])}")
+    print(f"  Update: {len(diff['update'])}")
+    print(f"  Delete: {len(diff['delete'])}")
+    print(f"  Unchanged: {diff['unchanged']}")
+
+    changed = diff['insert'] + diff['update']
+    if changed:
+        generate_embeddings(changed, model_name, cache)
+
+    if changed or diff['delete']:
+        apply_chunk_diff(conn, diff)
+        print("  Changes committed in one transaction")
+        # New resume versions get their partial index (existing ones are kept)
+        create_partial_indexes(conn, "version")
+    else:
+        print("  Database already up to date")
+
     cursor = conn.cursor()
-    print(f"\nInserting {len(chunks)} chunks into database...")
+    cursor.execute("SELECT COUNT(*) FROM cv_chunks;")
+    count = cursor.fetchone()[0]
+    print(f"\nDatabase contains {count} chunks")
 
-    for i, chunk in enumerate(chunks):
-        cursor.execute("""
-            INSERT INTO cv_chunks (chunk_id, content, source, chunk_index, total_chunks, embedding)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            chunk['chunk_id'],
-            chunk['content'],
-            chunk['source'],
-            chunk['chunk_index'],
-            chunk['total_chunks'],
-            chunk['embedding']
-        ))
-
-        if (i + 1) % 10 == 0:
-            print(f"  Inserted {i + 1}/{len(chunks)} chunks")
+    cursor.close()
+    conn.close()
+    print("  Database connection closed")
+
+
+def store_embeddings(chunks: List[Dict], connection_string: str, model_name: str = "all-MiniLM-L6-v2"):
+    """
+    Store chunks and their embeddings in Neon Postgres (full re-ingest).
+
+    This rebuilds cv_chunks from scratch; prefer sync_embeddings for routine
+    re-ingests. The rows are loaded into a staging table while queries keep
+    reading the old one, which is then swapped out in one short
+    transaction (see swap_in_table). The indexes are built on the new table
+    after the swap.
+
+    Args:
+        chunks: List of chunks with embeddings
+        connection_string: PostgreSQL connection string
+        model_name: Embedding model used (recorded in each row's content_hash)
+    """
+    print(f"\nConnecting to database...")
+
+    # Connect to database
+    conn = psycopg2.connect(connection_string)
+    print("  Connected to Neon Postgres")
+
+    # Staging table without secondary indexes (built after the swap)
+    staging = "cv_chunks_new"
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging)))
+        create_chunks_table(cursor, staging)
+    conn.commit()
+
+    # Bulk load chunks (binary COPY, falling back to execute_values)
+    print(f"\nLoading {len(chunks)} chunks into {staging}...")
+    for chunk in chunks:
+        chunk['content_hash'] = chunk_hash(chunk, model_name)
 
+    method = bulk_load_chunks(conn, chunks, table=staging)
     conn.commit()
-    print(f"  All chunks inserted successfully!")
+    print(f"  All chunks loaded successfully! (method: {method})")
+
+    swap_in_table(conn, staging)
+    print(f"  Swapped {staging} in as cv_chunks")
+
+    # Full-text, vector, per-version and quantized indexes on the new table
+    create_database_schema(conn)
+
+    cursor = conn.cursor()
 
     # Verify data
     cursor.execute("SELECT COUNT(*) FROM cv_chunks;")
@@ -173,10 +477,43 @@ def store_embeddings(chunks: List[Dict], connection_string: str):
     print("  Database connection closed")
 
 
+def refresh_warm_answers() -> bool:
+    """
+    Precompute the app's sample answers against the corpus just written.
+
+    Runs streamlit/warm_answers.py, which tags its artifact with the version
+    of cv_chunks and does nothing if the artifact already matches it.
+
+    Returns:
+        True if the warm answers are up to date
+    """
+    if not os.getenv("N8N_WEBHOOK_URL"):
+        print("\nSkipping warm answers: N8N_WEBHOOK_URL not set")
+        return False
+
+    print("\nRefreshing warm answers for the new corpus...")
+    sys.stdout.flush()
+    result = subprocess.run([sys.executable, str(WARM_ANSWERS_SCRIPT)], cwd=WARM_ANSWERS_SCRIPT.parent)
+    if result.returncode != 0:
+        print("  Warning: warm answers were not refreshed; the app will skip the stale ones")
+        return False
+    return True
+
+
 def main():
     """
     Main function to generate embeddings and store in database.
+
+    By default only changed chunks are re-embedded and written (incremental
+    ingest). Pass --full to rebuild cv_chunks and swap it in. The last
+    step refreshes the app's warm answers (skip with --no-warm).
     """
+    parser = argparse.ArgumentParser(description="Embed chunks and store them in cv_chunks")
+    parser.add_argument("--chunks", help="Chunks file (default: newer of data/chunks.json and data/chunks.jsonl)")
+    parser.add_argument("--full", action="store_true", help="Rebuild cv_chunks and swap it in instead of syncing")
+    parser.add_argument("--no-warm", action="store_true", help="Do not refresh the app's warm answers")
+    args = parser.parse_args()
+
     # Load environment variables
     load_dotenv()
 
@@ -195,23 +532,41 @@ def main():
 
     # Set up paths
     project_root = Path(__file__).parent.parent
-    chunks_file = project_root / "data" / "chunks.json"
-
-    if not chunks_file.exists():
-        print(f"\nError: chunks.json not found at {chunks_file}")
-        print("Please run chunker.py first to create chunks")
-        return
+    data_dir = project_root / "data"
+    if args.chunks:
+        chunks_file = Path(args.chunks)
+        if not chunks_file.exists():
+            print(f"\nError: {chunks_file} not found")
+            return
+    else:
+        chunks_file = default_chunks_file(data_dir)
+        if chunks_file is None:
+            print(f"\nError: chunks.json / chunks.jsonl not found in {data_dir}")
+            print("Please run chunker.py first to create chunks")
+            return
+        others = [name for name in ("chunks.json", "chunks.jsonl") if name != chunks_file.name
+                  and (data_dir / name).exists()]
+        if others:
+            print(f"\nUsing {chunks_file.name} (newer than {others[0]}; pass --chunks to choose)")
 
     # Load chunks
     print(f"\nLoading chunks from {chunks_file}")
     chunks = load_chunks(chunks_file)
     print(f"  Loaded {len(chunks)} chunks")
 
-    # Generate embeddings
-    chunks_with_embeddings = generate_embeddings(chunks, embedding_model)
+    # Embedding cache reuses vectors for chunks whose text did not change
+    cache = EmbeddingCache(project_root / "data" / "embedding_cache", embedding_model)
+
+    if args.full:
+        # Full re-ingest: embed everything, load a new table and swap it in
+        chunks_with_embeddings = generate_embeddings(chunks, embedding_model, cache)
+        store_embeddings(chunks_with_embeddings, connection_string, embedding_model)
+    else:
+        # Incremental ingest: only INSERT/UPDATE/DELETE what changed
+        sync_embeddings(chunks, connection_string, embedding_model, cache)
 
-    # Store in database
-    store_embeddings(chunks_with_embeddings, connection_string)
+    if not args.no_warm:
+        refresh_warm_answers()
 
     print("\n" + "=" * 60)
     print("Embedding pipeline complete!")
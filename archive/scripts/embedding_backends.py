@@ -0,0 +1,152 @@
+"""
+CV-RAG Embedding Backends
+=========================
+Interchangeable CPU backends for the all-MiniLM-L6-v2 embedding model.
+
+    torch       - sentence-transformers on PyTorch, float32 (the reference)
+    torch-int8  - PyTorch with dynamic int8 quantization of the Linear layers
+    onnx        - ONNX Runtime, float32 (onnx/model.onnx)
+    onnx-int8   - ONNX Runtime with int8 weights (onnx/model_quint8_avx2.onnx,
+                  or onnx/model_qint8_arm64.onnx on ARM)
+
+The all-MiniLM-L6-v2 repository on the Hugging Face Hub already ships these
+ONNX files, so the ONNX backends only need
+`pip install sentence-transformers[onnx]`. For a model without them, write
+them next to a local copy once and point EMBED_MODEL at it:
+
+    python embedding_backends.py export all-MiniLM-L6-v2 ../data/minilm-onnx
+
+Every backend has to reproduce the torch embeddings: TOLERANCES is the
+lowest cosine similarity to the torch embedding of the same text that a
+backend may return (see compare_embeddings and benchmark_embedding.py).
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import os
+import platform
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Minimum cosine similarity to the torch float32 embedding
+TOLERANCES = {
+    "torch": 0.9999,
+    "onnx": 0.9999,
+    "torch-int8": 0.99,
+    "onnx-int8": 0.99,
+}
+
+
+def is_arm() -> bool:
+    """True on ARM CPUs (Apple Silicon, Graviton), which use the arm64 int8 kernels."""
+    return platform.machine().lower() in ("arm64", "aarch64")
+
+
+def quantized_onnx_file() -> str:
+    """
+    Quantized ONNX file for this CPU, named as in the all-MiniLM-L6-v2 repo.
+
+    Returns:
+        Path within the model repo (EMBED_ONNX_FILE overrides it)
+    """
+    if os.getenv("EMBED_ONNX_FILE"):
+        return os.getenv("EMBED_ONNX_FILE")
+    return "onnx/model_qint8_arm64.onnx" if is_arm() else "onnx/model_quint8_avx2.onnx"
+
+
+def load_model(backend: str = "torch", model_name: str = DEFAULT_MODEL, threads: Optional[int] = None):
+    """
+    Load the embedding model on the CPU with the given backend.
+
+    Args:
+        backend: One of BACKENDS
+        model_name: Hub name or local path of a sentence-transformers model
+        threads: Intra-op threads (None keeps the library default)
+
+    Returns:
+        SentenceTransformer whose encode() matches the torch backend
+
+    Raises:
+        ValueError: For an unknown backend
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    if backend.startswith("onnx"):
+        model_kwargs = {
+            "file_name": "onnx/model.onnx" if backend == "onnx" else quantized_onnx_file(),
+            "provider": "CPUExecutionProvider",
+        }
+        if threads:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            model_kwargs["session_options"] = options
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if backend == "torch-int8":
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> Dict:
+    """
+    Cosine similarity between two backends' embeddings of the same texts.
+
+    Args:
+        reference: (n, dim) embeddings from the torch backend
+        candidate: (n, dim) embeddings from the backend under test
+
+    Returns:
+        Dictionary with 'min_cosine' and 'mean_cosine'
+    """
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    similarities = np.sum(reference * candidate, axis=1)
+    return {
+        'min_cosine': round(float(similarities.min()), 6),
+        'mean_cosine': round(float(similarities.mean()), 6)
+    }
+
+
+def export_onnx(model_name: str, output_dir: str):
+    """
+    Save a model with its float32 and int8 ONNX exports to a directory.
+
+    Args:
+        model_name: Hub name or local path of a sentence-transformers model
+        output_dir: Directory to write (loadable by load_model afterwards)
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+    model.save(output_dir)
+    export_dynamic_quantized_onnx_model(model, "arm64" if is_arm() else "avx2", output_dir)
+
+
+def main():
+    """Export ONNX files for a model."""
+    if len(sys.argv) != 4 or sys.argv[1] != "export":
+        print("Usage: python embedding_backends.py export <model> <output_dir>")
+        return
+
+    print(f"📦 Exporting {sys.argv[2]} to ONNX (float32 + int8)...")
+    export_onnx(sys.argv[2], sys.argv[3])
+    print(f"✅ Saved to {sys.argv[3]} (set EMBED_MODEL={sys.argv[3]})")
+
+
+if __name__ == "__main__":
+    main()
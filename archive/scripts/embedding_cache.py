@@ -0,0 +1,177 @@
+"""
+CV-RAG Embedding Cache
+======================
+Persistent, content-addressed cache for chunk embeddings.
+
+Embeddings are keyed by (model name, hash of the normalized chunk text), so
+re-ingesting an unchanged corpus does zero model calls and a small edit only
+re-embeds the chunks whose text actually changed.
+
+On-disk layout (one directory per model):
+    data/embedding_cache/<model>/embeddings.f32   - float32 matrix, one row per text
+    data/embedding_cache/<model>/index.json       - {"model", "dimension", "rows": {hash: row}}
+
+The matrix is opened with numpy.memmap, so lookups only page in the rows
+that are actually read. New rows are appended to the end of the file and the
+sidecar index is rewritten atomically afterwards.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize chunk text before hashing.
+
+    Unicode is NFC-normalized and runs of whitespace collapse to a single
+    space, so cosmetic re-wrapping of a paragraph does not invalidate it.
+
+    Args:
+        text: Raw chunk text
+
+    Returns:
+        Normalized text
+    """
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def content_hash(text: str, model_name: str) -> str:
+    """
+    Build the cache key for a chunk.
+
+    Args:
+        text: Raw chunk text
+        model_name: Embedding model name
+
+    Returns:
+        Hex SHA-256 digest of model name + normalized text
+    """
+    payload = f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Memory-mapped float32 embedding store with a JSON sidecar index.
+
+    Args:
+        cache_dir: Root cache directory (a subdirectory is used per model)
+        model_name: Embedding model the cached vectors belong to
+    """
+
+    def __init__(self, cache_dir, model_name: str):
+        self.model_name = model_name
+        self.directory = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.matrix_path = self.directory / "embeddings.f32"
+        self.index_path = self.directory / "index.json"
+
+        self.dimension: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._matrix = None
+
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.dimension = index.get("dimension")
+            self.rows = index.get("rows", {})
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _open_matrix(self):
+        """Memory-map the embedding matrix (read-only)."""
+        if self._matrix is None and self.dimension and self.matrix_path.exists():
+            row_bytes = self.dimension * 4
+            n_rows = self.matrix_path.stat().st_size // row_bytes
+            if n_rows:
+                self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r',
+                                         shape=(n_rows, self.dimension))
+        return self._matrix
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings and update hit/miss counters.
+
+        Args:
+            texts: Chunk texts to look up
+
+        Returns:
+            List aligned with texts: the cached vector, or None on a miss
+        """
+        matrix = self._open_matrix()
+        results = []
+
+        for text in texts:
+            row = self.rows.get(content_hash(text, self.model_name))
+            if row is not None and matrix is not None and row < matrix.shape[0]:
+                results.append(np.array(matrix[row]))
+                self.hits += 1
+            else:
+                results.append(None)
+                self.misses += 1
+
+        return results
+
+    def add_many(self, texts: List[str], embeddings) -> None:
+        """
+        Append new embeddings to the matrix and persist the sidecar index.
+
+        Args:
+            texts: Chunk texts that were embedded
+            embeddings: 2D array-like of vectors aligned with texts
+        """
+        new_rows = {}
+        vectors = []
+        for text, embedding in zip(texts, embeddings):
+            key = content_hash(text, self.model_name)
+            if key in self.rows or key in new_rows:
+                continue
+            new_rows[key] = len(self.rows) + len(new_rows)
+            vectors.append(embedding)
+
+        if not vectors:
+            return
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = matrix.shape[1]
+        elif matrix.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match "
+                             f"cache dimension {self.dimension}")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Drop any rows left behind by an interrupted run before appending
+        expected_bytes = len(self.rows) * self.dimension * 4
+        self._matrix = None
+        with open(self.matrix_path, 'ab') as f:
+            f.truncate(expected_bytes)
+            f.write(np.ascontiguousarray(matrix).tobytes())
+
+        self.rows.update(new_rows)
+        self._write_index()
+
+    def _write_index(self):
+        """Atomically rewrite the sidecar index."""
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "model": self.model_name,
+                "dimension": self.dimension,
+                "rows": self.rows
+            }, f)
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,71 @@
+"""
+CV-RAG Embedding Client
+=======================
+HTTP client for embedding_service.py using the binary wire format.
+
+EmbeddingClient.encode() has the same shape as SentenceTransformer.encode()
+for a single text or a list of texts, so it can stand in for the model in
+Retriever, LocalVectorIndex and query.py (set EMBEDDING_SERVICE_URL). It
+asks for raw float32 bytes (`Accept: application/octet-stream`, see
+embedding_wire.py) over a keep-alive session, and still accepts JSON
+from a service that ignores the Accept header.
+
+Usage:
+    client = EmbeddingClient("http://localhost:8000")
+    vector = client.encode("What programming languages does Mike know?")
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+from typing import List, Union
+
+import numpy as np
+import requests
+
+from embedding_wire import OCTET_STREAM, from_bytes
+
+
+class EmbeddingClient:
+    """
+    Fetch embeddings from embedding_service.py as raw bytes.
+
+    Args:
+        base_url: Service root, e.g. http://localhost:8000
+        dtype: "float32" (exact) or "float16" (half the bytes)
+        timeout: Seconds to wait for a response
+    """
+
+    def __init__(self, base_url: str, dtype: str = "float32", timeout: float = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Accept"] = f"{OCTET_STREAM}; dtype={dtype}, application/json;q=0.5"
+
+    def _post(self, path: str, body: dict) -> requests.Response:
+        response = self.session.post(f"{self.base_url}{path}", json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def encode(self, texts: Union[str, List[str]], **kwargs) -> np.ndarray:
+        """
+        Embed one text or a list of texts.
+
+        Args:
+            texts: Text, or list of texts
+            **kwargs: Accepted for SentenceTransformer compatibility (ignored)
+
+        Returns:
+            float32 vector for a text, (n, dim) matrix for a list
+        """
+        if isinstance(texts, str):
+            response = self._post("/embed", {'text': texts})
+            if response.headers.get("Content-Type", "").startswith(OCTET_STREAM):
+                return from_bytes(response.content, response.headers["X-Embedding-Dtype"])
+            return np.asarray(response.json()['embedding'], dtype=np.float32)
+
+        response = self._post("/embed_batch", {'texts': list(texts)})
+        if response.headers.get("Content-Type", "").startswith(OCTET_STREAM):
+            return from_bytes(response.content, response.headers["X-Embedding-Dtype"],
+                              int(response.headers["X-Embedding-Dimension"]))
+        return np.asarray(response.json()['embeddings'], dtype=np.float32)
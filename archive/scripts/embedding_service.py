@@ -4,12 +4,12 @@
 Embedding Service for CV-RAG
 ============================
 
-Flask HTTP server that generates 384-dimensional embeddings using
-the sentence-transformers 'all-MiniLM-L6-v2' model.
+ASGI (Starlette + uvicorn) HTTP server that generates 384-dimensional
+embeddings using the sentence-transformers 'all-MiniLM-L6-v2' model.
 
 DEPRECATION NOTICE:
 -------------------
-This Flask service is no longer needed. The n8n-native approach uses:
+This service is no longer needed. The n8n-native approach uses:
 - Ollama's nomic-embed-text model (768-dim embeddings)
 - n8n "Embeddings Ollama" node (calls Ollama API directly)
 
@@ -27,10 +27,49 @@ Usage:
 
 The service will start on http://localhost:8000
 
-Endpoint:
+Endpoints:
     POST /embed
     Body: {"text": "your query here"}
-    Response: {"embedding": [...], "dimension": 384, "model": "all-MiniLM-L6-v2"}
+    Response: {"embedding": [...], "dimension": 384, "model": "all-MiniLM-L6-v2",
+               "timings": {"embed_ms": 4.2}}
+
+    POST /embed_batch
+    Body: {"texts": ["first text", "second text"]}
+    Response: {"embeddings": [[...], [...]], "count": 2, "dimension": 384, "model": "all-MiniLM-L6-v2"}
+
+    GET /stats
+    Response: batch-size histogram and request counts from the micro-batcher
+
+    GET /health
+    Response: 200 {"status": "healthy", ...} once the model is loaded,
+              503 {"status": "loading"} before that (or "error" if it failed)
+
+The server starts listening immediately and loads the model in a
+background thread, so a container is reachable (and reports its state
+on /health) within a fraction of a second. /embed, /embed_batch and
+/stats answer 503 with a Retry-After header until the model is ready.
+
+Compact responses (see embedding_wire.py):
+    Accept: application/octet-stream[; dtype=float16]
+        Raw little-endian float32/float16 bytes; shape in X-Embedding-* headers
+    Body field "encoding_format": "base64" (and optional "dtype": "float16")
+        JSON with the same bytes base64-encoded in 'embedding' / 'embeddings'
+
+Concurrent /embed requests are coalesced by a micro-batcher (see
+micro_batcher.py) into a single model.encode() call. Tune it with:
+    EMBED_MAX_BATCH_SIZE - Largest batch sent to the model (default 32)
+    EMBED_MAX_WAIT_MS    - How long to wait for a batch to fill (default 5)
+
+Serving (each uvicorn worker is a separate process with its own model, so
+requests are not serialized behind one GIL):
+    EMBED_BACKEND - torch (default), torch-int8, onnx or onnx-int8
+                    (see embedding_backends.py)
+    EMBED_WORKERS - uvicorn worker processes (default 1)
+    EMBED_THREADS - Model intra-op threads per worker (default: CPUs / workers)
+    EMBED_MODEL   - Model name or local path (default all-MiniLM-L6-v2)
+    EMBED_PORT    - Port to listen on (default 8000)
+
+benchmark_embedding.py measures req/s for each backend.
 
 Example:
     curl -X POST http://localhost:8000/embed \
@@ -38,9 +77,21 @@ Example:
       -d '{"text": "What programming languages does Mike know?"}'
 """
 
-from flask import Flask, request, jsonify
-from sentence_transformers import SentenceTransformer
+import asyncio
 import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from embedding_backends import DEFAULT_MODEL, load_model
+from embedding_wire import DTYPES, ENCODING_FORMATS, OCTET_STREAM, negotiate, server_timing, to_base64, to_bytes
+from micro_batcher import MicroBatcher
+from tracing import StageTimer
 
 # Configure logging
 logging.basicConfig(
@@ -49,26 +100,136 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+MODEL_NAME = os.getenv("EMBED_MODEL", DEFAULT_MODEL)
+BACKEND = os.getenv("EMBED_BACKEND", "torch")
+WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+THREADS = int(os.getenv("EMBED_THREADS", "0")) or max(1, (os.cpu_count() or 1) // WORKERS)
+PORT = int(os.getenv("EMBED_PORT", "8000"))
+
+# Coalesce concurrent requests into batched encode() calls
+MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+REQUEST_TIMEOUT = 30
+
+# Seconds a client should wait before retrying while the model loads
+RETRY_AFTER = 2
+
+# Set per worker process by load() once the model is ready
+batcher = None
+dimension = None
+load_error = None
 
-# Load the embedding model (happens once at startup)
-logger.info("Loading sentence-transformers model: all-MiniLM-L6-v2")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-logger.info("Model loaded successfully. Embedding dimension: 384")
 
+def load():
+    """Import the model libraries and load the model (runs in a background thread)."""
+    global batcher, dimension, load_error
+
+    try:
+        logger.info(f"Loading sentence-transformers model: {MODEL_NAME} (backend={BACKEND}, threads={THREADS})")
+        model = load_model(BACKEND, MODEL_NAME, THREADS)
+        model_dimension = model.get_sentence_embedding_dimension()
+        logger.info(f"Model loaded successfully. Embedding dimension: {model_dimension}")
+
+        # Publish dimension before batcher: handlers treat batcher as "ready"
+        dimension = model_dimension
+        batcher = MicroBatcher(
+            lambda texts: model.encode(texts, batch_size=MAX_BATCH_SIZE),
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=MAX_WAIT_MS
+        )
+        logger.info(f"Micro-batching enabled: max_batch_size={MAX_BATCH_SIZE}, max_wait_ms={MAX_WAIT_MS}")
+    except Exception as e:
+        load_error = str(e)
+        logger.error(f"Failed to load model: {load_error}", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start loading the model once per worker process, without delaying startup."""
+    threading.Thread(target=load, name="model-loader", daemon=True).start()
+    yield
+
+
+def not_ready(**extra) -> JSONResponse:
+    """503 response while the model is loading (or failed to load)."""
+    if load_error:
+        return JSONResponse({'status': 'error', 'error': f'Model failed to load: {load_error}', **extra},
+                            status_code=503)
+    return JSONResponse({'status': 'loading', 'error': 'Model is loading', **extra},
+                        status_code=503, headers={'Retry-After': str(RETRY_AFTER)})
+
+
+async def encode(texts):
+    """Embed texts on the micro-batcher without blocking the event loop."""
+    futures = [asyncio.wrap_future(batcher.submit(text)) for text in texts]
+    return await asyncio.wait_for(asyncio.gather(*futures), timeout=REQUEST_TIMEOUT)
+
+
+async def read_json(request: Request):
+    """Parse the request body, or None if it is not a JSON object."""
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
 
-@app.route('/health', methods=['GET'])
-def health():
-    """Health check endpoint"""
-    return jsonify({
+
+def response_format(request: Request, data: dict):
+    """
+    Resolve the requested wire format.
+
+    Args:
+        request: Incoming request (Accept header)
+        data: Parsed JSON body (encoding_format / dtype fields)
+
+    Returns:
+        (media type, encoding_format, dtype)
+
+    Raises:
+        ValueError: For an unsupported format or dtype
+    """
+    media_type, dtype = negotiate(request.headers.get('accept'))
+    if media_type == OCTET_STREAM:
+        return media_type, "binary", dtype
+
+    encoding_format = data.get('encoding_format', 'float')
+    if encoding_format not in ENCODING_FORMATS:
+        raise ValueError(f"encoding_format must be one of {ENCODING_FORMATS}")
+    dtype = data.get('dtype', 'float32')
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {tuple(DTYPES)}")
+    return media_type, encoding_format, dtype
+
+
+def binary_response(embeddings, dtype: str, timings: dict = None) -> Response:
+    """Raw embedding bytes with their shape and metadata in headers."""
+    count = len(embeddings) if isinstance(embeddings, list) else None
+    dim = len(embeddings[0]) if count else len(embeddings)
+    headers = {
+        'X-Embedding-Dimension': str(dim),
+        'X-Embedding-Dtype': dtype,
+        'X-Embedding-Model': MODEL_NAME
+    }
+    if count is not None:
+        headers['X-Embedding-Count'] = str(count)
+    if timings:
+        headers['Server-Timing'] = server_timing(timings)
+    return Response(to_bytes(embeddings, dtype), media_type=OCTET_STREAM, headers=headers)
+
+
+async def health(request: Request):
+    """Health check endpoint (503 until the model is loaded)"""
+    if batcher is None:
+        return not_ready(model=MODEL_NAME, backend=BACKEND)
+    return JSONResponse({
         'status': 'healthy',
-        'model': 'all-MiniLM-L6-v2',
-        'dimension': 384
-    }), 200
+        'model': MODEL_NAME,
+        'dimension': dimension,
+        'backend': BACKEND
+    }, status_code=200)
 
 
-@app.route('/embed', methods=['POST'])
-def embed():
+async def embed(request: Request):
     """
     Generate embedding for input text
 
@@ -81,65 +242,181 @@ def embed():
     {
         "embedding": [0.123, -0.456, ...],
         "dimension": 384,
-        "model": "all-MiniLM-L6-v2"
+        "model": "all-MiniLM-L6-v2",
+        "timings": {"embed_ms": 4.2}
     }
+    or the compact formats described in the module docstring
     """
+    if batcher is None:
+        return not_ready()
+
     try:
-        data = request.json
+        data = await read_json(request)
 
         if not data:
-            return jsonify({'error': 'Invalid JSON body'}), 400
+            return JSONResponse({'error': 'Invalid JSON body'}, status_code=400)
 
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided in request body'}), 400
+            return JSONResponse({'error': 'No text provided in request body'}, status_code=400)
 
         if not isinstance(text, str):
-            return jsonify({'error': 'Text must be a string'}), 400
+            return JSONResponse({'error': 'Text must be a string'}, status_code=400)
+
+        try:
+            media_type, encoding_format, dtype = response_format(request, data)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        logger.debug(f"Generating embedding for text: {text[:100]}...")
 
-        logger.info(f"Generating embedding for text: {text[:100]}...")
+        # Generate embedding (batched with any concurrent requests)
+        timer = StageTimer()
+        with timer.stage("embed", model=MODEL_NAME, backend=BACKEND):
+            embedding = (await encode([text]))[0]
 
-        # Generate embedding
-        embedding = model.encode(text)
+        if media_type == OCTET_STREAM:
+            return binary_response(embedding, dtype, timer.timings)
+
+        if encoding_format == 'base64':
+            return JSONResponse({
+                'embedding': to_base64(embedding, dtype),
+                'encoding_format': 'base64',
+                'dtype': dtype,
+                'dimension': len(embedding),
+                'model': MODEL_NAME,
+                'timings': timer.timings
+            }, status_code=200)
 
         # Convert numpy array to list for JSON serialization
         embedding_list = embedding.tolist()
 
-        logger.info(f"Embedding generated successfully. Dimension: {len(embedding_list)}")
-
-        return jsonify({
+        return JSONResponse({
             'embedding': embedding_list,
             'dimension': len(embedding_list),
-            'model': 'all-MiniLM-L6-v2'
-        }), 200
+            'model': MODEL_NAME,
+            'timings': timer.timings
+        }, status_code=200)
 
     except Exception as e:
         logger.error(f"Error generating embedding: {str(e)}", exc_info=True)
-        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+        return JSONResponse({'error': f'Internal server error: {str(e)}'}, status_code=500)
 
 
-@app.route('/', methods=['GET'])
-def index():
+async def embed_batch(request: Request):
+    """
+    Generate embeddings for a list of texts
+
+    Expected JSON body:
+    {
+        "texts": ["first text", "second text"]
+    }
+
+    Returns:
+    {
+        "embeddings": [[0.123, ...], [-0.456, ...]],
+        "count": 2,
+        "dimension": 384,
+        "model": "all-MiniLM-L6-v2"
+    }
+    """
+    if batcher is None:
+        return not_ready()
+
+    try:
+        data = await read_json(request)
+
+        if not data:
+            return JSONResponse({'error': 'Invalid JSON body'}, status_code=400)
+
+        texts = data.get('texts')
+
+        if not texts:
+            return JSONResponse({'error': 'No texts provided in request body'}, status_code=400)
+
+        if not isinstance(texts, list) or not all(isinstance(t, str) and t for t in texts):
+            return JSONResponse({'error': 'Texts must be a list of non-empty strings'}, status_code=400)
+
+        try:
+            media_type, encoding_format, dtype = response_format(request, data)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        logger.info(f"Generating embeddings for {len(texts)} texts")
+
+        embeddings = await encode(texts)
+
+        if media_type == OCTET_STREAM:
+            return binary_response(embeddings, dtype)
+
+        if encoding_format == 'base64':
+            return JSONResponse({
+                'embeddings': to_base64(embeddings, dtype),
+                'encoding_format': 'base64',
+                'dtype': dtype,
+                'count': len(embeddings),
+                'dimension': len(embeddings[0]),
+                'model': MODEL_NAME
+            }, status_code=200)
+
+        embedding_lists = [embedding.tolist() for embedding in embeddings]
+
+        return JSONResponse({
+            'embeddings': embedding_lists,
+            'count': len(embedding_lists),
+            'dimension': len(embedding_lists[0]),
+            'model': MODEL_NAME
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"Error generating batch embeddings: {str(e)}", exc_info=True)
+        return JSONResponse({'error': f'Internal server error: {str(e)}'}, status_code=500)
+
+
+async def stats(request: Request):
+    """Micro-batching statistics (batch-size histogram) for this worker"""
+    if batcher is None:
+        return not_ready()
+    return JSONResponse({**batcher.stats(), 'worker_pid': os.getpid()}, status_code=200)
+
+
+async def index(request: Request):
     """Root endpoint with usage instructions"""
-    return jsonify({
+    return JSONResponse({
         'service': 'CV-RAG Embedding Service',
-        'model': 'all-MiniLM-L6-v2',
-        'dimension': 384,
+        'model': MODEL_NAME,
+        'dimension': dimension,
         'endpoints': {
             'health': 'GET /health - Health check',
-            'embed': 'POST /embed - Generate embedding from text'
+            'embed': 'POST /embed - Generate embedding from text',
+            'embed_batch': 'POST /embed_batch - Generate embeddings for a list of texts',
+            'stats': 'GET /stats - Micro-batching statistics'
         },
         'example': {
-            'url': 'http://localhost:8000/embed',
+            'url': f'http://localhost:{PORT}/embed',
             'method': 'POST',
             'body': {
                 'text': 'What programming languages does Mike know?'
             }
         }
-    }), 200
+    }, status_code=200)
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/embed', embed, methods=['POST']),
+        Route('/embed_batch', embed_batch, methods=['POST']),
+        Route('/stats', stats, methods=['GET']),
+        Route('/', index, methods=['GET']),
+    ],
+    lifespan=lifespan
+)
 
 
 if __name__ == '__main__':
-    logger.info("Starting CV-RAG Embedding Service on http://0.0.0.0:8000")
-    app.run(host='0.0.0.0', port=8000, debug=False)
+    import uvicorn
+
+    logger.info(f"Starting CV-RAG Embedding Service on http://0.0.0.0:{PORT} ({WORKERS} worker(s))")
+    uvicorn.run("embedding_service:app", host='0.0.0.0', port=PORT, workers=WORKERS, log_level="warning")
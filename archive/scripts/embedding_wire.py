@@ -0,0 +1,179 @@
+"""
+CV-RAG Embedding Wire Formats
+=============================
+Compact encodings for /embed responses, chosen by content negotiation.
+
+A JSON list of 384 floats is ~8 KB of decimal text that has to be
+formatted by the service and parsed again by every client. Instead a
+client can ask for the raw vector:
+
+    Accept: application/octet-stream                 -> little-endian float32 bytes
+    Accept: application/octet-stream; dtype=float16  -> little-endian float16 bytes
+
+with the shape and metadata in headers (X-Embedding-Dimension,
+X-Embedding-Count, X-Embedding-Dtype, X-Embedding-Model) and the stage
+timings in a standard Server-Timing header. Clients that need JSON (e.g.
+n8n) can send `"encoding_format": "base64"` (and optionally
+`"dtype": "float16"`) in the request body, as with OpenAI's embeddings
+API, and get the same bytes base64-encoded in the 'embedding' field.
+Without either, responses are the original JSON lists.
+
+Usage:
+    python embedding_wire.py      # payload size and encode+decode time per format
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import base64
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+OCTET_STREAM = "application/octet-stream"
+DTYPES = {"float32": "<f4", "float16": "<f2"}
+ENCODING_FORMATS = ("float", "base64")
+
+
+def negotiate(accept: Optional[str]) -> Tuple[str, str]:
+    """
+    Pick the response format from an Accept header.
+
+    Args:
+        accept: Accept header value (may be None)
+
+    Returns:
+        (media type, dtype): (OCTET_STREAM, "float32"|"float16") when the
+        client accepts raw bytes, otherwise ("application/json", "float32")
+
+    Raises:
+        ValueError: For an unsupported dtype parameter
+    """
+    for media_range in (accept or "").split(","):
+        media, *params = [part.strip() for part in media_range.split(";")]
+        if media.lower() != OCTET_STREAM:
+            continue
+        options = dict(param.split("=", 1) for param in params if "=" in param)
+        if options.get("q", "1").strip() in ("0", "0.0"):
+            continue
+        dtype = options.get("dtype", "float32").strip().lower()
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}, expected one of {tuple(DTYPES)}")
+        return OCTET_STREAM, dtype
+    return "application/json", "float32"
+
+
+def to_bytes(embeddings, dtype: str = "float32") -> bytes:
+    """
+    Serialize one embedding or a (count, dim) matrix as little-endian bytes.
+
+    Args:
+        embeddings: Vector or matrix
+        dtype: "float32" or "float16"
+
+    Returns:
+        Row-major bytes
+    """
+    return np.ascontiguousarray(embeddings, dtype=DTYPES[dtype]).tobytes()
+
+
+def from_bytes(data: bytes, dtype: str = "float32", dimension: int = None) -> np.ndarray:
+    """
+    Parse bytes written by to_bytes.
+
+    Args:
+        data: Raw payload
+        dtype: "float32" or "float16"
+        dimension: Reshape to (-1, dimension) when given
+
+    Returns:
+        float32 array (a vector, or a matrix if dimension is given)
+    """
+    array = np.frombuffer(data, dtype=DTYPES[dtype]).astype(np.float32)
+    return array.reshape(-1, dimension) if dimension else array
+
+
+def to_base64(embeddings, dtype: str = "float32") -> str:
+    """Base64 of to_bytes(), for JSON responses."""
+    return base64.b64encode(to_bytes(embeddings, dtype)).decode("ascii")
+
+
+def from_base64(text: str, dtype: str = "float32", dimension: int = None) -> np.ndarray:
+    """Inverse of to_base64."""
+    return from_bytes(base64.b64decode(text), dtype, dimension)
+
+
+def server_timing(timings: Dict) -> str:
+    """
+    Server-Timing header value for StageTimer timings.
+
+    Args:
+        timings: Mapping of '<stage>_ms' -> milliseconds
+
+    Returns:
+        e.g. "embed;dur=4.2"
+    """
+    return ", ".join(f"{key[:-3]};dur={value}" for key, value in timings.items() if key.endswith("_ms"))
+
+
+def measure_formats(embedding: np.ndarray, repeats: int = 2000) -> Dict:
+    """
+    Payload size and serialize + parse time of one embedding per format.
+
+    Args:
+        embedding: float32 vector
+        repeats: Timed round trips per format
+
+    Returns:
+        Mapping of format -> {'bytes', 'us_per_call', 'max_abs_error'}
+    """
+    formats = {
+        'json': (lambda: json.dumps({'embedding': embedding.tolist()}).encode(),
+                 lambda data: np.asarray(json.loads(data)['embedding'], dtype=np.float32)),
+        'base64-float32': (lambda: json.dumps({'embedding': to_base64(embedding)}).encode(),
+                           lambda data: from_base64(json.loads(data)['embedding'])),
+        'base64-float16': (lambda: json.dumps({'embedding': to_base64(embedding, "float16")}).encode(),
+                           lambda data: from_base64(json.loads(data)['embedding'], "float16")),
+        'binary-float32': (lambda: to_bytes(embedding), lambda data: from_bytes(data)),
+        'binary-float16': (lambda: to_bytes(embedding, "float16"), lambda data: from_bytes(data, "float16")),
+    }
+
+    results = {}
+    for name, (encode, decode) in formats.items():
+        payload = encode()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            decode(encode())
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'bytes': len(payload),
+            'us_per_call': round(elapsed / repeats * 1e6, 2),
+            'max_abs_error': float(np.max(np.abs(decode(payload) - embedding)))
+        }
+    return results
+
+
+def print_formats(results: Dict):
+    """Print measure_formats() as a table relative to JSON."""
+    baseline = results['json']
+    print(f"{'format':<16}{'bytes':>8}{'size':>8}{'µs/call':>10}{'speedup':>9}{'max err':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['bytes']:>8}{baseline['bytes'] / result['bytes']:>7.1f}x"
+              f"{result['us_per_call']:>10.2f}{baseline['us_per_call'] / result['us_per_call']:>8.1f}x"
+              f"{result['max_abs_error']:>10.1e}")
+
+
+def main():
+    """Compare the wire formats on a random unit vector of MiniLM's size."""
+    rng = np.random.default_rng(0)
+    embedding = rng.standard_normal(384).astype(np.float32)
+    embedding /= np.linalg.norm(embedding)
+
+    print("Serialize + parse one 384-dim embedding:\n")
+    print_formats(measure_formats(embedding))
+
+
+if __name__ == "__main__":
+    main()
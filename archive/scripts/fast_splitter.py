@@ -0,0 +1,145 @@
+"""
+CV-RAG Fast Text Splitter
+=========================
+Self-contained replacement for LangChain's RecursiveCharacterTextSplitter,
+as configured by chunker.chunk_document (keep_separator=True, literal
+separators, character lengths, whitespace stripping).
+
+It produces exactly the same chunks, but works on (start, end) offsets into
+the original document instead of building new strings:
+
+- separators are located with one precompiled literal scan per span
+  (LangChain re-escapes and re-splits a new substring at every level)
+- pieces are spans, so their length is `end - start` (no len() calls)
+- a merged chunk is a single slice of the original text, because pieces
+  kept with their leading separator are contiguous
+
+benchmark_splitter.py checks equivalence against LangChain on docs/ and
+reports the speedup.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import List, Tuple
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+Span = Tuple[int, int]
+
+
+@lru_cache(maxsize=None)
+def _literal(separator: str) -> "re.Pattern":
+    """Compiled pattern matching the separator literally."""
+    return re.compile(re.escape(separator))
+
+
+class FastRecursiveSplitter:
+    """
+    Recursive character splitter operating on offsets.
+
+    Args:
+        chunk_size: Maximum chunk size in characters
+        chunk_overlap: Characters of overlap between consecutive chunks
+        separators: Separators to try in order (literal strings)
+    """
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, separators: List[str] = None):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+        if chunk_overlap < 0:
+            raise ValueError(f"chunk_overlap must be >= 0, got {chunk_overlap}")
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                             f"({chunk_size}), should be smaller.")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators) if separators else list(DEFAULT_SEPARATORS)
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split text into chunks identical to RecursiveCharacterTextSplitter's.
+
+        Args:
+            text: Document text
+
+        Returns:
+            List of chunk strings
+        """
+        return self._split(text, (0, len(text)), 0)
+
+    def _split(self, text: str, span: Span, first: int) -> List[str]:
+        """Recursive step: split a span with separators[first:] and merge pieces."""
+        start, end = span
+
+        # Pick the first separator that occurs in this span
+        separator = self.separators[-1]
+        next_index = len(self.separators)
+        for i in range(first, len(self.separators)):
+            candidate = self.separators[i]
+            if not candidate:
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                next_index = i + 1
+                break
+
+        # Split into pieces, each keeping its leading separator
+        if separator:
+            # Non-overlapping matches scanned from the span start, as re.split does
+            cuts = [m.start() for m in _literal(separator).finditer(text, start, end)]
+            bounds = [start] + cuts + [end]
+            pieces = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)
+                      if bounds[i + 1] > bounds[i]]
+        else:
+            pieces = [(i, i + 1) for i in range(start, end)]
+
+        has_more = next_index < len(self.separators)
+        chunks = []
+        good = []
+        for piece in pieces:
+            if piece[1] - piece[0] < self.chunk_size:
+                good.append(piece)
+                continue
+
+            if good:
+                chunks.extend(self._merge(text, good))
+                good = []
+            if has_more:
+                chunks.extend(self._split(text, piece, next_index))
+            else:
+                chunks.append(text[piece[0]:piece[1]])
+
+        if good:
+            chunks.extend(self._merge(text, good))
+        return chunks
+
+    def _merge(self, text: str, pieces: List[Span]) -> List[str]:
+        """Pack contiguous pieces into chunks with overlap (LangChain _merge_splits)."""
+        chunk_size, chunk_overlap = self.chunk_size, self.chunk_overlap
+
+        docs = []
+        current = deque()
+        total = 0
+        for piece in pieces:
+            length = piece[1] - piece[0]
+            if total + length > chunk_size and current:
+                doc = text[current[0][0]:current[-1][1]].strip()
+                if doc:
+                    docs.append(doc)
+                while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                    head = current.popleft()
+                    total -= head[1] - head[0]
+            current.append(piece)
+            total += length
+
+        if current:
+            doc = text[current[0][0]:current[-1][1]].strip()
+            if doc:
+                docs.append(doc)
+        return docs
@@ -0,0 +1,295 @@
+"""
+CV-RAG Hybrid Retriever
+=======================
+Keyword (BM25 / Postgres full-text) + vector retrieval, fused with
+Reciprocal Rank Fusion (RRF).
+
+Dense similarity alone often misses questions about exact tool names
+("n8n", "Streamlit", "pgvector"): the embedding of a short question is
+dominated by its phrasing, not the one rare term that matters. A keyword
+leg ranks chunks containing those terms first, and RRF merges the two
+rankings without having to calibrate BM25 scores against cosine
+similarities:
+
+    rrf(chunk) = sum over legs of 1 / (rrf_k + rank in that leg)
+
+The keyword leg needs only the query text, so it starts immediately on a
+worker thread while the calling thread embeds the query and runs the
+vector search. A hybrid query costs max(keyword, embed + vector) rather
+than their sum.
+
+Backends:
+    HybridRetriever.from_retriever(retriever)  - pgvector + Postgres tsvector
+                                                 (GIN index cv_chunks_content_fts_idx)
+    HybridRetriever.from_local_index(index)    - LocalVectorIndex + in-memory BM25
+
+Metadata filters (metadata_filters.py) are applied to both legs before
+fusion, so a filtered query never fuses in chunks from another version.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from metadata_filters import filter_clause, matches, validate_filters
+from tracing import StageTimer
+
+DEFAULT_RRF_K = 60
+DEFAULT_CANDIDATES = 20
+
+# Postgres full-text search. plainto_tsquery ANDs every term, which drops
+# chunks missing any word of a conversational question; '|' turns it into
+# an OR query and ts_rank_cd still favours chunks matching more terms.
+FTS_CONFIG = "english"
+FTS_INDEX_SQL = f"""
+    CREATE INDEX IF NOT EXISTS cv_chunks_content_fts_idx
+    ON cv_chunks USING gin (to_tsvector('{FTS_CONFIG}', content));
+"""
+KEYWORD_SQL = f"""
+    WITH q AS (
+        SELECT replace(plainto_tsquery('{FTS_CONFIG}', %(query)s)::text, '&', '|')::tsquery AS query
+    )
+    SELECT chunk_id, content, source, ts_rank_cd(to_tsvector('{FTS_CONFIG}', content), q.query) AS rank
+    FROM cv_chunks, q
+    WHERE q.query::text <> '' AND to_tsvector('{FTS_CONFIG}', content) @@ q.query {{filters}}
+    ORDER BY rank DESC
+    LIMIT %(limit)s
+"""
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._+-][a-z0-9]+)*")
+# TOKEN_PATTERN splits contractions ("mike's" -> "mike", "s"), so the
+# fragments are listed rather than the whole words
+STOPWORDS = frozenset("""
+    a an and are as at be by did do does for from had has have he his how i in is it its
+    me mike murphy my of on or s she t tell than that the their them there they this
+    to was were what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens for BM25, keeping names like 'n8n' and 'node.js'.
+
+    Args:
+        text: Query or chunk text
+
+    Returns:
+        Tokens without stopwords
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict]], top_k: int, rrf_k: int = DEFAULT_RRF_K) -> List[Dict]:
+    """
+    Merge ranked result lists with Reciprocal Rank Fusion.
+
+    Args:
+        rankings: Result lists (best first), each item with a 'chunk_id'
+        top_k: Number of fused results
+        rrf_k: Rank damping constant (60 in the original RRF paper)
+
+    Returns:
+        Fused results, best first, each with 'rrf_score' and the first
+        leg's fields (vector results keep their 'similarity')
+    """
+    scores = defaultdict(float)
+    items = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item['chunk_id']] += 1.0 / (rrf_k + rank)
+            items.setdefault(item['chunk_id'], item)
+
+    fused = sorted(scores, key=lambda chunk_id: -scores[chunk_id])[:top_k]
+    return [{**items[chunk_id], 'rrf_score': round(scores[chunk_id], 6)} for chunk_id in fused]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 inverted index over chunk contents.
+
+    Args:
+        chunks: Chunk dictionaries with 'chunk_id', 'content' and 'source'
+        k1: Term-frequency saturation
+        b: Document-length normalization
+    """
+
+    def __init__(self, chunks: List[Dict], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        # term -> [(chunk position, term frequency)]
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for position, chunk in enumerate(chunks):
+            tokens = tokenize(chunk['content'])
+            self.lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((position, frequency))
+
+        n = len(chunks)
+        self.average_length = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for term, posting in self.postings.items()}
+
+    def search(self, query_text: str, top_k: int = DEFAULT_CANDIDATES, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Rank chunks by BM25 score for the query terms.
+
+        Args:
+            query_text: The question to ask
+            top_k: Number of chunks to return
+            filters: Optional metadata filters (source / version / section)
+
+        Returns:
+            Matching chunks with a 'bm25' score, best first
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query_text)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.average_length or 1))
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        filters = validate_filters(filters)
+        if filters:
+            scores = {p: score for p, score in scores.items() if matches(self.chunks[p], filters)}
+
+        best = sorted(scores, key=lambda position: (-scores[position], position))[:top_k]
+        return [{
+            'chunk_id': self.chunks[p]['chunk_id'],
+            'content': self.chunks[p]['content'],
+            'source': self.chunks[p]['source'],
+            'bm25': round(scores[p], 4)
+        } for p in best]
+
+
+def postgres_keyword_search(retriever, query_text: str, limit: int = DEFAULT_CANDIDATES,
+                            filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Full-text keyword leg over cv_chunks, using a pooled connection.
+
+    Args:
+        retriever: retriever.Retriever whose pool to borrow
+        query_text: The question to ask
+        limit: Number of chunks to return
+        filters: Optional metadata filters (source / version / section)
+
+    Returns:
+        Matching chunks with a 'keyword_rank', best first
+    """
+    conditions, params = filter_clause(filters)
+    statement = KEYWORD_SQL.format(filters=f"AND {conditions}" if conditions else "")
+
+    conn = retriever.pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            # Same terms as the BM25 leg (stopwords such as "mike" would match every chunk)
+            cursor.execute(statement, {'query': " ".join(tokenize(query_text)), 'limit': limit, **params})
+            rows = cursor.fetchall()
+        conn.rollback()
+    except Exception:
+        retriever.pool.putconn(conn, close=True)
+        raise
+    else:
+        retriever.pool.putconn(conn)
+
+    return [{
+        'chunk_id': row[0],
+        'content': row[1],
+        'source': row[2],
+        'keyword_rank': float(row[3])
+    } for row in rows]
+
+
+class HybridRetriever:
+    """
+    Runs a vector leg and a keyword leg concurrently and fuses them with RRF.
+
+    Args:
+        dense_fn: (query_text, limit, filters) -> ranked results (vector search)
+        keyword_fn: (query_text, limit, filters) -> ranked results (keyword search)
+        candidates: Results taken from each leg before fusion
+        rrf_k: RRF damping constant
+    """
+
+    def __init__(self, dense_fn: Callable[[str, int, Optional[Dict]], List[Dict]],
+                 keyword_fn: Callable[[str, int, Optional[Dict]], List[Dict]],
+                 candidates: int = DEFAULT_CANDIDATES, rrf_k: int = DEFAULT_RRF_K):
+        self.dense_fn = dense_fn
+        self.keyword_fn = keyword_fn
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-keyword")
+
+    @classmethod
+    def from_retriever(cls, retriever, **kwargs) -> "HybridRetriever":
+        """
+        Hybrid search over cv_chunks: pgvector + Postgres full-text.
+
+        Both legs share the retriever's connection pool. Create the
+        retriever with min_connections=2: the pool closes idle connections
+        beyond min_connections, so with one the second leg would open a
+        new connection on every query.
+
+        Args:
+            retriever: retriever.Retriever
+            **kwargs: candidates / rrf_k
+
+        Returns:
+            HybridRetriever
+        """
+        return cls(retriever.query,
+                   lambda query_text, limit, filters: postgres_keyword_search(retriever, query_text, limit, filters),
+                   **kwargs)
+
+    @classmethod
+    def from_local_index(cls, index, **kwargs) -> "HybridRetriever":
+        """
+        Hybrid search in-process: LocalVectorIndex + in-memory BM25.
+
+        Args:
+            index: local_index.LocalVectorIndex with an encode_fn
+            **kwargs: candidates / rrf_k
+
+        Returns:
+            HybridRetriever
+        """
+        bm25 = BM25Index(index.chunks)
+        return cls(index.query, bm25.search, **kwargs)
+
+    def close(self):
+        """Stop the keyword worker threads."""
+        self._executor.shutdown(wait=False)
+
+    def query(self, query_text: str, top_k: int = 3, filters: Optional[Dict] = None,
+              timer: Optional[StageTimer] = None) -> List[Dict]:
+        """
+        Retrieve the top_k chunks by fused keyword + vector rank.
+
+        Args:
+            query_text: The question to ask
+            top_k: Number of chunks to return
+            filters: Optional metadata filters applied to both legs
+            timer: Optional StageTimer; records "retrieve" (both legs,
+                including the query embedding) and "rerank" (the fusion)
+
+        Returns:
+            Fused chunks, best first, with 'rrf_score' (and 'similarity'
+            when the vector leg found them)
+        """
+        timer = timer or StageTimer()
+        limit = max(top_k, self.candidates)
+        with timer.stage("retrieve", candidates=limit):
+            keyword_future = self._executor.submit(self.keyword_fn, query_text, limit, filters)
+            dense = self.dense_fn(query_text, limit, filters)
+            keyword = keyword_future.result()
+        with timer.stage("rerank", method="rrf"):
+            return reciprocal_rank_fusion([dense, keyword], top_k, self.rrf_k)
@@ -0,0 +1,399 @@
+"""
+CV-RAG Vector Index Tuner
+=========================
+Benchmarks pgvector index types and parameters on the actual cv_chunks data
+and applies the best one.
+
+The schema used to hard-code `ivfflat ... WITH (lists = 10)` and never set
+`ivfflat.probes` (default 1), so recall silently dropped as the corpus grew.
+This tool:
+
+1. copies the embeddings into a scratch table (production is untouched
+   until the final swap)
+2. holds out a sample of rows as queries and computes their exact top-k
+   with a sequential scan (the recall ground truth)
+3. builds each candidate index - ivfflat (lists x probes) and HNSW
+   (m x ef_construction x ef_search) - and measures recall@k, p50/p99
+   latency, build time and index size; an exact scan is a candidate too,
+   since it wins on small corpora
+4. picks the fastest candidate (by p99) whose recall meets --target-recall
+5. rebuilds cv_chunks_embedding_idx with it and stores the search
+   parameter (probes / ef_search) as a database default
+
+Usage:
+    python index_tuner.py [--k 3] [--queries 50] [--target-recall 0.95]
+                          [--report tuning.json] [--dry-run]
+
+Environment:
+    NEON_CONNECTION_STRING - Postgres connection string (from .env)
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+from dotenv import load_dotenv
+
+INDEX_NAME = "cv_chunks_embedding_idx"
+SCRATCH_TABLE = "cv_chunks_index_tune"
+
+# Index built when nothing has been tuned yet: HNSW needs no training data,
+# so (unlike ivfflat) it is equally good when created on an empty table
+DEFAULT_INDEX = {'method': 'hnsw', 'build': {'m': 16, 'ef_construction': 64}, 'search': {}}
+
+SEARCH_SETTINGS = {'ivfflat': 'ivfflat.probes', 'hnsw': 'hnsw.ef_search'}
+
+
+def index_sql(config: Dict, table: str = "cv_chunks", name: str = INDEX_NAME,
+              where: Optional[sql.Composable] = None) -> sql.Composed:
+    """
+    CREATE INDEX statement for an index configuration.
+
+    Args:
+        config: {'method': 'ivfflat' | 'hnsw', 'build': {param: value}}
+        table: Table holding the embedding column
+        name: Index name
+        where: Predicate for a partial index (see metadata_filters.py)
+
+    Returns:
+        Composed SQL statement
+    """
+    options = sql.SQL(", ").join(
+        sql.SQL("{} = {}").format(sql.Identifier(param), sql.Literal(int(value)))
+        for param, value in config['build'].items()
+    )
+    statement = sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} USING {} (embedding vector_cosine_ops) WITH ({})").format(
+        sql.Identifier(name), sql.Identifier(table), sql.SQL(config['method']), options
+    )
+    if where is not None:
+        statement = sql.SQL("{} WHERE {}").format(statement, where)
+    return statement
+
+
+def describe(config: Dict) -> str:
+    """Short label such as 'hnsw m=16 ef_construction=64 ef_search=40'."""
+    params = {**config.get('build', {}),
+              **{setting.split('.')[-1]: value for setting, value in config.get('search', {}).items()}}
+    return " ".join([config['method']] + [f"{key}={value}" for key, value in params.items()])
+
+
+def candidate_configs(n_rows: int, k: int) -> List[Dict]:
+    """
+    Index configurations worth trying for a corpus size.
+
+    Args:
+        n_rows: Rows in cv_chunks
+        k: Results per query
+
+    Returns:
+        List of configurations; each build appears once with its search
+        parameter values listed under 'search_values'
+    """
+    builds = []
+
+    # pgvector guidance: lists = rows / 1000 up to 1M rows, sqrt(rows) beyond
+    lists_options = {10, max(1, n_rows // 1000), max(1, int(math.sqrt(n_rows)))}
+    for lists in sorted(l for l in lists_options if l <= max(1, n_rows // 10)):
+        probes = sorted({p for p in (1, 2, 4, 8, 16, 32, int(math.sqrt(lists)), lists) if 1 <= p <= lists})
+        builds.append({'method': 'ivfflat', 'build': {'lists': lists}, 'search_values': probes})
+
+    # ef_search below the LIMIT would return fewer than k rows
+    ef_search = sorted({max(ef, k + 1) for ef in (10, 20, 40, 80, 160, 320)})
+    for m in (8, 16, 32):
+        for ef_construction in (64, 128):
+            builds.append({'method': 'hnsw', 'build': {'m': m, 'ef_construction': ef_construction},
+                           'search_values': ef_search})
+    return builds
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def count_rows(conn, table: str = "cv_chunks") -> int:
+    """Number of rows with an embedding."""
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SELECT COUNT(*) FROM {} WHERE embedding IS NOT NULL").format(sql.Identifier(table)))
+        return cursor.fetchone()[0]
+
+
+def create_scratch_table(conn, source: str = "cv_chunks", table: str = SCRATCH_TABLE):
+    """Copy ids and embeddings into an unindexed scratch table."""
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+        cursor.execute(sql.SQL("CREATE TABLE {} AS SELECT id, embedding FROM {} WHERE embedding IS NOT NULL").format(
+            sql.Identifier(table), sql.Identifier(source)))
+        cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table)))
+    conn.commit()
+
+
+def sample_queries(conn, n_queries: int, table: str = SCRATCH_TABLE, seed: int = 42) -> List[tuple]:
+    """
+    Hold out a random sample of rows to use as queries.
+
+    Args:
+        conn: psycopg2 connection
+        n_queries: Sample size
+        table: Table to sample from
+        seed: Random seed (same sample for every candidate)
+
+    Returns:
+        List of (row id, vector literal)
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SELECT id, embedding::text FROM {} ORDER BY id").format(sql.Identifier(table)))
+        rows = cursor.fetchall()
+    conn.rollback()
+    return random.Random(seed).sample(rows, min(n_queries, len(rows)))
+
+
+def run_queries(conn, queries: List[tuple], k: int, settings: Dict = None,
+                table: str = SCRATCH_TABLE, exact: bool = False, statement: str = None) -> Dict:
+    """
+    Run every held-out query and time it.
+
+    The query row itself is requested as an extra result and dropped, so a
+    held-out row never counts as its own neighbour.
+
+    Args:
+        conn: psycopg2 connection
+        queries: Output of sample_queries
+        k: Results per query
+        settings: Search parameters to SET LOCAL (e.g. {'hnsw.ef_search': 40})
+        table: Table to search
+        exact: Disable index scans (sequential scan ground truth)
+        statement: Query returning ids, with %(embedding)s and %(limit)s
+            parameters (default: plain cosine ORDER BY ... LIMIT)
+
+    Returns:
+        {'results': [[ids], ...], 'latencies_ms': [...]}
+    """
+    if statement is None:
+        statement = sql.SQL("SELECT id FROM {} ORDER BY embedding <=> %(embedding)s::vector LIMIT %(limit)s").format(
+            sql.Identifier(table))
+    results, latencies = [], []
+
+    with conn.cursor() as cursor:
+        if exact:
+            cursor.execute("SET LOCAL enable_indexscan = off")
+        for setting, value in (settings or {}).items():
+            cursor.execute(sql.SQL("SET LOCAL {} = {}").format(sql.SQL(setting), sql.Literal(int(value))))
+
+        # Warm-up so the first timed query does not pay for loading the index
+        cursor.execute(statement, {'embedding': queries[0][1], 'limit': k + 1})
+        cursor.fetchall()
+
+        for row_id, embedding in queries:
+            start = time.perf_counter()
+            cursor.execute(statement, {'embedding': embedding, 'limit': k + 1})
+            ids = [r[0] for r in cursor.fetchall()]
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([i for i in ids if i != row_id][:k])
+    conn.rollback()
+
+    return {'results': results, 'latencies_ms': latencies}
+
+
+def score(run: Dict, truth: List[List[int]], k: int) -> Dict:
+    """Recall@k and latency percentiles of a run against the exact results."""
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(run['results'], truth))
+    total = sum(min(k, len(expected)) for expected in truth) or 1
+    latencies = run['latencies_ms']
+    return {
+        'recall': round(hits / total, 4),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'qps': round(len(latencies) / (sum(latencies) / 1000), 1)
+    }
+
+
+def benchmark(conn, k: int = 3, n_queries: int = 50, source: str = "cv_chunks") -> Dict:
+    """
+    Measure every candidate index on a scratch copy of the table.
+
+    Args:
+        conn: psycopg2 connection
+        k: Results per query
+        n_queries: Held-out queries
+        source: Table to tune
+
+    Returns:
+        Report with the row count and one entry per candidate
+    """
+    create_scratch_table(conn, source)
+    n_rows = count_rows(conn, SCRATCH_TABLE)
+    queries = sample_queries(conn, n_queries)
+    candidates = []
+
+    try:
+        print(f"\n  Exact scan ({n_rows} rows, {len(queries)} held-out queries, k={k})")
+        exact_run = run_queries(conn, queries, k, exact=True)
+        truth = exact_run['results']
+        exact = {'method': 'exact', 'build': {}, 'search': {}, **score(exact_run, truth, k),
+                 'build_s': 0.0, 'index_mb': 0.0}
+        candidates.append(exact)
+        print(f"    {'exact':<45} recall 1.000  p50 {exact['p50_ms']:7.3f} ms  p99 {exact['p99_ms']:7.3f} ms")
+
+        for build in candidate_configs(n_rows, k):
+            tune_index = f"{SCRATCH_TABLE}_idx"
+            start = time.perf_counter()
+            with conn.cursor() as cursor:
+                cursor.execute(index_sql(build, SCRATCH_TABLE, tune_index))
+                conn.commit()
+                build_s = time.perf_counter() - start
+                cursor.execute("SELECT pg_relation_size(%s::regclass)", (tune_index,))
+                index_mb = cursor.fetchone()[0] / 1024 / 1024
+            conn.rollback()
+
+            setting = SEARCH_SETTINGS[build['method']]
+            for value in build['search_values']:
+                config = {'method': build['method'], 'build': build['build'], 'search': {setting: value}}
+                result = {**config, **score(run_queries(conn, queries, k, config['search']), truth, k),
+                          'build_s': round(build_s, 3), 'index_mb': round(index_mb, 2)}
+                candidates.append(result)
+                print(f"    {describe(config):<45} recall {result['recall']:.3f}  "
+                      f"p50 {result['p50_ms']:7.3f} ms  p99 {result['p99_ms']:7.3f} ms")
+
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(tune_index)))
+            conn.commit()
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(SCRATCH_TABLE)))
+        conn.commit()
+
+    return {'rows': n_rows, 'queries': len(queries), 'k': k, 'candidates': candidates}
+
+
+def choose(candidates: List[Dict], target_recall: float) -> Dict:
+    """
+    Pick the candidate to deploy.
+
+    Args:
+        candidates: Benchmark results
+        target_recall: Minimum acceptable recall@k
+
+    Returns:
+        Fastest (p99, then p50) candidate meeting the target, or the
+        most accurate one if none does
+    """
+    eligible = [c for c in candidates if c['recall'] >= target_recall]
+    if eligible:
+        return min(eligible, key=lambda c: (c['p99_ms'], c['p50_ms'], c['index_mb']))
+    return max(candidates, key=lambda c: (c['recall'], -c['p99_ms']))
+
+
+def apply_index(conn, config: Dict, table: str = "cv_chunks"):
+    """
+    Replace the table's embedding index (cv_chunks_embedding_idx) with the
+    chosen configuration.
+
+    The new index is built under a temporary name first, so searches keep
+    using the old one until a short DROP + RENAME transaction. Search
+    parameters are stored as database defaults (ALTER DATABASE ... SET),
+    so every new session - n8n's included - picks them up.
+
+    Args:
+        conn: psycopg2 connection
+        config: Chosen candidate
+        table: Table holding the embedding column
+    """
+    index_name = f"{table}_embedding_idx"
+    new_index = f"{index_name}_new"
+    with conn.cursor() as cursor:
+        if config['method'] != 'exact':
+            cursor.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(new_index)))
+            cursor.execute(index_sql(config, table, new_index))
+            conn.commit()
+
+        cursor.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(index_name)))
+        if config['method'] != 'exact':
+            cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(new_index), sql.Identifier(index_name)))
+        conn.commit()
+
+        cursor.execute("SELECT current_database()")
+        database = cursor.fetchone()[0]
+        for setting in SEARCH_SETTINGS.values():
+            value = config['search'].get(setting)
+            try:
+                if value is None:
+                    cursor.execute(sql.SQL("ALTER DATABASE {} RESET {}").format(
+                        sql.Identifier(database), sql.SQL(setting)))
+                else:
+                    cursor.execute(sql.SQL("ALTER DATABASE {} SET {} = {}").format(
+                        sql.Identifier(database), sql.SQL(setting), sql.Literal(int(value))))
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                if value is not None:
+                    print(f"  ⚠️  Could not set {setting} as a database default ({e.pgerror or e}).")
+                    print(f"     Run `SET {setting} = {value};` per session instead.")
+
+
+def main():
+    """Benchmark index candidates on cv_chunks and apply the best one."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Benchmark and tune the cv_chunks vector index")
+    parser.add_argument("--k", type=int, default=3, help="Results per query (recall@k)")
+    parser.add_argument("--queries", type=int, default=50, help="Held-out queries")
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Minimum recall@k to accept")
+    parser.add_argument("--table", default="cv_chunks", help="Table to tune")
+    parser.add_argument("--report", help="Write the full results as JSON")
+    parser.add_argument("--dry-run", action="store_true", help="Benchmark only; do not change the index")
+    args = parser.parse_args()
+
+    connection_string = os.getenv("NEON_CONNECTION_STRING")
+    if not connection_string:
+        print("❌ Error: NEON_CONNECTION_STRING not found in .env file")
+        return
+
+    print("=" * 60)
+    print("CV-RAG Vector Index Tuner")
+    print("=" * 60)
+
+    conn = psycopg2.connect(connection_string)
+    try:
+        if count_rows(conn, args.table) < 2:
+            print("❌ Not enough rows to tune; run the embedder first.")
+            return
+
+        report = benchmark(conn, args.k, args.queries, args.table)
+        best = choose(report['candidates'], args.target_recall)
+        report['target_recall'] = args.target_recall
+        report['chosen'] = best
+
+        print(f"\n✅ Best for {report['rows']} rows: {describe(best)}")
+        print(f"   recall@{args.k} {best['recall']:.3f}, p50 {best['p50_ms']:.3f} ms, p99 {best['p99_ms']:.3f} ms")
+
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"   Report saved to {args.report}")
+
+        if args.dry_run:
+            print("\n(dry run - index unchanged)")
+            return
+
+        print(f"\nApplying to {args.table}...")
+        apply_index(conn, best, args.table)
+        print(f"✨ {args.table}_embedding_idx is now: {describe(best)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
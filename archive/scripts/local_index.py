@@ -0,0 +1,297 @@
+"""
+CV-RAG Local Vector Index
+=========================
+In-process exact cosine search over the cv_chunks embeddings.
+
+For a corpus the size of the resume + supplemental docs (a few hundred
+chunks), a Postgres round trip costs far more than the ranking itself. This
+module exports cv_chunks once to disk and answers queries from a NumPy
+matrix instead, with no database on the query hot path.
+
+Files written by export_index():
+    data/local_index/embeddings.npy  - float32 matrix of L2-normalized vectors
+    data/local_index/chunks.json     - [{"chunk_id", "content", "source", "version", "section"}, ...]
+
+The matrix is loaded memory-mapped. Because rows are pre-normalized, cosine
+similarity is a single matrix-vector product, and the top_k rows are picked
+with argpartition (O(n)) before sorting just those k.
+
+With quantization="int8" or "binary" the index keeps only reduced-precision
+codes in memory (4x / 32x smaller) for a first pass, and re-ranks the best
+`top_k * rerank` candidates against the memory-mapped float32 rows (see
+quantization.py).
+
+search()/query() take the same metadata filters as the pgvector retriever
+(metadata_filters.py); matching rows are resolved once per filter and
+cached, and only those rows are scored.
+
+Usage:
+    python local_index.py export    # dump cv_chunks to data/local_index/
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from metadata_filters import matches, validate_filters
+from quantization import (DEFAULT_RERANK, LOCAL_MODES, hamming_distances, int8_scores, pack_bits,
+                          quantize_int8, top_indices)
+
+DEFAULT_INDEX_DIR = Path(__file__).parent.parent / "data" / "local_index"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize each row (zero rows are left as zeros).
+
+    Args:
+        matrix: 2D float array
+
+    Returns:
+        float32 matrix with unit-length rows
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def export_index(connection_string: str, index_dir=DEFAULT_INDEX_DIR) -> int:
+    """
+    Export cv_chunks to a normalized .npy matrix plus chunk metadata.
+
+    Args:
+        connection_string: PostgreSQL connection string
+        index_dir: Output directory
+
+    Returns:
+        Number of chunks exported
+
+    Raises:
+        ValueError: If cv_chunks has no embedded rows
+    """
+    import psycopg2
+
+    conn = psycopg2.connect(connection_string)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT chunk_id, content, source, version, section, embedding::text
+        FROM cv_chunks
+        WHERE embedding IS NOT NULL
+        ORDER BY id;
+    """)
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    if not rows:
+        raise ValueError("Nothing to export: cv_chunks has no embeddings, run embedder.py first")
+
+    # pgvector's text format '[x,y,...]' is valid JSON
+    matrix = normalize_rows([json.loads(row[5]) for row in rows])
+    chunks = [{'chunk_id': row[0], 'content': row[1], 'source': row[2], 'version': row[3], 'section': row[4]}
+              for row in rows]
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    np.save(index_dir / "embeddings.npy", matrix)
+    with open(index_dir / "chunks.json", 'w', encoding='utf-8') as f:
+        json.dump(chunks, f, ensure_ascii=False)
+
+    return len(chunks)
+
+
+class LocalVectorIndex:
+    """
+    Exact cosine top-k search over pre-normalized embeddings.
+
+    Args:
+        embeddings: 2D array of chunk embeddings (normalized on load if needed)
+        chunks: Chunk metadata aligned with the embedding rows
+        encode_fn: Optional function mapping query text to an embedding,
+            required only for query()
+        quantization: None (exact float32), "int8" or "binary" first pass
+        rerank: Candidates per result re-scored in float32 (quantized modes)
+    """
+
+    def __init__(self, embeddings: np.ndarray, chunks: List[Dict],
+                 encode_fn: Callable[[str], np.ndarray] = None,
+                 quantization: str = None, rerank: int = DEFAULT_RERANK):
+        if len(embeddings) != len(chunks):
+            raise ValueError(f"{len(embeddings)} embeddings but {len(chunks)} chunks")
+        if quantization not in (None,) + LOCAL_MODES:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {LOCAL_MODES}")
+
+        self.embeddings = embeddings
+        self.chunks = chunks
+        self.encode_fn = encode_fn
+        self.quantization = quantization
+        self.rerank = rerank
+
+        self.codes = self.scale = self.bits = None
+        if quantization == "int8":
+            self.codes, self.scale = quantize_int8(embeddings)
+        elif quantization == "binary":
+            self.bits = pack_bits(embeddings)
+
+        # Filter key -> positions of the matching rows
+        self._filter_rows = {}
+
+    @classmethod
+    def load(cls, index_dir=DEFAULT_INDEX_DIR, encode_fn: Callable[[str], np.ndarray] = None,
+             mmap: bool = True, quantization: str = None, rerank: int = DEFAULT_RERANK) -> "LocalVectorIndex":
+        """
+        Load an index written by export_index().
+
+        Args:
+            index_dir: Directory containing embeddings.npy and chunks.json
+            encode_fn: Optional query encoder (see __init__)
+            mmap: Memory-map the matrix instead of reading it into RAM
+            quantization: None, "int8" or "binary" (see __init__)
+            rerank: Candidates per result for the float32 rerank
+
+        Returns:
+            LocalVectorIndex
+        """
+        index_dir = Path(index_dir)
+        embeddings = np.load(index_dir / "embeddings.npy", mmap_mode='r' if mmap else None)
+        with open(index_dir / "chunks.json", 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+        return cls(embeddings, chunks, encode_fn, quantization, rerank)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def quantized_nbytes(self) -> int:
+        """Bytes held in memory for the first pass (the full matrix if exact)."""
+        if self.quantization == "int8":
+            return self.codes.nbytes + self.scale.nbytes
+        if self.quantization == "binary":
+            return self.bits.nbytes
+        return self.embeddings.nbytes
+
+    def filter_rows(self, filters: Dict) -> np.ndarray:
+        """
+        Row positions matching metadata filters (cached per filter).
+
+        Args:
+            filters: Output of metadata_filters.validate_filters
+
+        Returns:
+            Sorted int array of row positions
+        """
+        key = repr(sorted(filters.items()))
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.array([i for i, chunk in enumerate(self.chunks) if matches(chunk, filters)], dtype=np.int64)
+            self._filter_rows[key] = rows
+        return rows
+
+    def search(self, query_embedding, top_k: int = 3, candidates: int = None,
+               filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Find the top_k chunks most similar to a query embedding.
+
+        Args:
+            query_embedding: Query vector (any length-matching array-like)
+            top_k: Number of chunks to return
+            candidates: First-pass candidates to re-rank in quantized modes
+                (default top_k * rerank)
+            filters: Optional metadata filters (source / version / section)
+
+        Returns:
+            List of chunks with similarity scores, best first (same shape as
+            query.query_database_direct results)
+        """
+        filters = validate_filters(filters)
+        rows = self.filter_rows(filters) if filters else None
+        n = len(self.chunks) if rows is None else len(rows)
+        if n == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if self.quantization is None:
+            # argpartition finds the k best in O(n); only those k get sorted
+            scores = (self.embeddings if rows is None else self.embeddings[rows]) @ query
+            top = top_indices(scores, top_k)
+            similarities = scores[top]
+            if rows is not None:
+                top = rows[top]
+        else:
+            n_candidates = max(top_k, candidates or top_k * self.rerank)
+            if self.quantization == "int8":
+                codes = self.codes if rows is None else self.codes[rows]
+                shortlist = top_indices(int8_scores(codes, self.scale, query), n_candidates)
+            else:
+                bits = self.bits if rows is None else self.bits[rows]
+                shortlist = top_indices(hamming_distances(bits, pack_bits(query)), n_candidates, largest=False)
+            if rows is not None:
+                shortlist = rows[shortlist]
+
+            # Exact float32 rerank, reading only the candidate rows (in file order)
+            shortlist = np.sort(shortlist)
+            exact = self.embeddings[shortlist] @ query
+            best = top_indices(exact, top_k)
+            top, similarities = shortlist[best], exact[best]
+
+        return [{
+            'chunk_id': self.chunks[i]['chunk_id'],
+            'content': self.chunks[i]['content'],
+            'source': self.chunks[i]['source'],
+            'similarity': float(similarity)
+        } for i, similarity in zip(top, similarities)]
+
+    def query(self, query_text: str, top_k: int = 3, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Embed query text and search the index.
+
+        Args:
+            query_text: The question to ask
+            top_k: Number of chunks to return
+            filters: Optional metadata filters (source / version / section)
+
+        Returns:
+            List of chunks with similarity scores, best first
+        """
+        if self.encode_fn is None:
+            raise ValueError("LocalVectorIndex.query() needs an encode_fn")
+        return self.search(self.encode_fn(query_text), top_k, filters=filters)
+
+
+def main():
+    """Export cv_chunks to the local index directory."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print("Usage: python local_index.py export")
+        return
+
+    connection_string = os.getenv("NEON_CONNECTION_STRING")
+    if not connection_string:
+        print("Error: NEON_CONNECTION_STRING not found in .env file")
+        return
+
+    index_dir = Path(os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR))
+    try:
+        count = export_index(connection_string, index_dir)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Exported {count} chunks to {index_dir}")
+
+
+if __name__ == "__main__":
+    main()
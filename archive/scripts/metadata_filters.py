@@ -0,0 +1,233 @@
+"""
+CV-RAG Metadata Filters
+=======================
+Restrict retrieval to a document source, resume version or section.
+
+Every chunk row carries:
+    source   - document the chunk came from (e.g. "resume", "supplemental")
+    version  - per-role resume variant, from docs/versions/<type>_<role>_*.md
+               (e.g. "general", "openai"); NULL for the base documents
+    section  - Markdown heading trail, e.g. "Michael J. Murphy > 💼 Experience"
+
+Filters are a dict, e.g. {"version": "openai"} or {"source": ["resume",
+"supplemental"], "section": "experience"}. source and version match
+exactly (a list means any of); section matches case-insensitively as a
+literal substring of the heading trail (% and _ are not wildcards).
+
+A plain WHERE clause on top of an HNSW/ivfflat scan filters *after* the
+index returns its ef_search candidates, so a selective filter returns
+fewer than top_k rows. Two fixes are used:
+
+- partial indexes: one HNSW index per source / version value
+  (`... WHERE version = 'openai'`). Filter values are sent as literals, so
+  the planner can match the partial index and searches only that
+  variant's rows; adding variants does not slow the others down.
+- iterative index scans (pgvector >= 0.8): `hnsw.iterative_scan` keeps
+  scanning the index until enough filtered rows are found.
+
+Usage:
+    python metadata_filters.py index version     # partial index per version value
+    python metadata_filters.py index source      # partial index per source value
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import hashlib
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+FILTER_COLUMNS = ("source", "version", "section")
+PARTIAL_INDEX_COLUMNS = ("source", "version")
+
+FILTER_TOKEN = re.compile(r"^(source|version|section)=(\S+)$")
+
+
+def validate_filters(filters: Optional[Dict]) -> Dict:
+    """
+    Drop empty filters and reject unknown columns.
+
+    Args:
+        filters: Mapping of column -> value or list of values
+
+    Returns:
+        Cleaned filters (possibly empty)
+
+    Raises:
+        ValueError: For a column that cannot be filtered on
+    """
+    if not filters:
+        return {}
+    unknown = set(filters) - set(FILTER_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s) {sorted(unknown)}, expected {FILTER_COLUMNS}")
+    return {column: value for column, value in filters.items() if value not in (None, "", [], ())}
+
+
+def like_pattern(value) -> str:
+    """ILIKE pattern matching value as a literal substring (\\, % and _ escaped)."""
+    escaped = str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def filter_clause(filters: Optional[Dict]) -> Tuple[str, Dict]:
+    """
+    SQL conditions for filters, with psycopg2 named parameters.
+
+    Args:
+        filters: See module docstring
+
+    Returns:
+        ("cond AND cond", params); ("", {}) without filters
+    """
+    conditions = []
+    params = {}
+    for column, value in validate_filters(filters).items():
+        key = f"filter_{column}"
+        if column == "section":
+            conditions.append(f"section ILIKE %({key})s ESCAPE '\\'")
+            params[key] = like_pattern(value)
+        elif isinstance(value, (list, tuple, set)):
+            conditions.append(f"{column} = ANY(%({key})s)")
+            params[key] = list(value)
+        else:
+            conditions.append(f"{column} = %({key})s")
+            params[key] = value
+    return " AND ".join(conditions), params
+
+
+def matches(chunk: Dict, filters: Dict) -> bool:
+    """
+    Python equivalent of filter_clause, for in-process indexes.
+
+    Args:
+        chunk: Chunk metadata
+        filters: Output of validate_filters
+
+    Returns:
+        True if the chunk passes every filter
+    """
+    for column, value in filters.items():
+        actual = chunk.get(column)
+        if column == "section":
+            if actual is None or str(value).lower() not in actual.lower():
+                return False
+        elif isinstance(value, (list, tuple, set)):
+            if actual not in value:
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+def parse_filters(text: str) -> Tuple[Dict, str]:
+    """
+    Split leading `column=value` tokens off an interactive query.
+
+    Example: "version=openai section=experience What did Mike do?"
+
+    Args:
+        text: Raw input line
+
+    Returns:
+        (filters, remaining question)
+    """
+    filters = {}
+    words = text.split()
+    while words:
+        match = FILTER_TOKEN.match(words[0])
+        if not match:
+            break
+        filters[match.group(1)] = match.group(2)
+        words.pop(0)
+    return filters, " ".join(words)
+
+
+def pgvector_version(conn) -> Tuple[int, ...]:
+    """
+    Installed pgvector version, e.g. (0, 8, 0).
+
+    Args:
+        conn: psycopg2 connection
+
+    Returns:
+        Version tuple ((0,) if the extension is missing)
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+    conn.rollback()
+    if not row:
+        return (0,)
+    return tuple(int(part) for part in re.findall(r"\d+", row[0]))
+
+
+def partial_index_name(table: str, column: str, value: str) -> str:
+    """Index name for one filter value, unique and within Postgres' 63 chars."""
+    slug = re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")[:24]
+    digest = hashlib.sha1(value.encode("utf-8")).hexdigest()[:8]
+    return f"{table}_emb_{column}_{slug}_{digest}_idx"
+
+
+def create_partial_indexes(conn, column: str, table: str = "cv_chunks") -> List[str]:
+    """
+    Create one partial HNSW index per distinct value of a column.
+
+    Args:
+        conn: psycopg2 connection
+        column: "source" or "version"
+        table: Table holding the embeddings
+
+    Returns:
+        Names of the indexes (existing ones are kept)
+    """
+    from psycopg2 import sql
+    from index_tuner import DEFAULT_INDEX, index_sql
+
+    if column not in PARTIAL_INDEX_COLUMNS:
+        raise ValueError(f"Partial indexes are built on {PARTIAL_INDEX_COLUMNS}, not {column!r}")
+
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("SELECT DISTINCT {} FROM {} WHERE {} IS NOT NULL").format(
+            sql.Identifier(column), sql.Identifier(table), sql.Identifier(column)))
+        values = sorted(row[0] for row in cursor.fetchall())
+
+        names = []
+        for value in values:
+            name = partial_index_name(table, column, value)
+            where = sql.SQL("{} = {}").format(sql.Identifier(column), sql.Literal(value))
+            cursor.execute(index_sql(DEFAULT_INDEX, table, name, where=where))
+            names.append(name)
+    conn.commit()
+    return names
+
+
+def main():
+    """Build partial indexes for a filter column."""
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+
+    if len(sys.argv) != 3 or sys.argv[1] != "index" or sys.argv[2] not in PARTIAL_INDEX_COLUMNS:
+        print("Usage: python metadata_filters.py index source|version")
+        return
+
+    connection_string = os.getenv("NEON_CONNECTION_STRING")
+    if not connection_string:
+        print("❌ Error: NEON_CONNECTION_STRING not found in .env file")
+        return
+
+    conn = psycopg2.connect(connection_string)
+    names = create_partial_indexes(conn, sys.argv[2])
+    conn.close()
+
+    print(f"✅ {len(names)} partial index(es) on {sys.argv[2]}:")
+    for name in names:
+        print(f"   {name}")
+
+
+if __name__ == "__main__":
+    main()
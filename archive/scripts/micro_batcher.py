@@ -0,0 +1,154 @@
+"""
+CV-RAG Micro-Batcher
+====================
+Coalesces concurrent single-text embedding requests into one model call.
+
+Each HTTP request to /embed used to run its own `model.encode(text)`, so
+concurrent traffic paid a full forward pass per query. The MicroBatcher
+queues incoming texts, waits a few milliseconds for more to arrive (or
+until the batch is full), then runs them through the model together and
+hands each caller its own row of the result.
+
+Configuration (environment variables read by embedding_service.py):
+    EMBED_MAX_BATCH_SIZE - Largest batch sent to the model (default 32)
+    EMBED_MAX_WAIT_MS    - How long to hold the first request (default 5)
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+
+
+class MicroBatcher:
+    """
+    Background worker that groups queued texts into batched encode() calls.
+
+    Args:
+        encode_fn: Function that takes a list of texts and returns a 2D
+            array-like of embeddings (one row per text)
+        max_batch_size: Maximum number of texts per encode() call
+        max_wait_ms: Maximum time to wait for a batch to fill up
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], Sequence],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._histogram = Counter()
+        self._requests = 0
+
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a single text for embedding.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Future that resolves to the embedding for this text
+        """
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: float = None):
+        """
+        Embed a single text, blocking until its batch has been processed.
+
+        Args:
+            text: Text to embed
+            timeout: Seconds to wait for the result (None waits forever)
+
+        Returns:
+            Embedding vector for the text
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def encode_many(self, texts: List[str], timeout: float = None) -> List:
+        """
+        Embed several texts, sharing batches with any concurrent requests.
+
+        Args:
+            texts: Texts to embed
+            timeout: Seconds to wait for all results (None waits forever)
+
+        Returns:
+            List of embedding vectors in the same order as texts
+        """
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def stats(self) -> Dict:
+        """
+        Report batching statistics.
+
+        Returns:
+            Dictionary with request/batch counts and a batch-size histogram
+        """
+        with self._lock:
+            histogram = dict(sorted(self._histogram.items()))
+            requests_seen = self._requests
+
+        batches = sum(histogram.values())
+        return {
+            'requests': requests_seen,
+            'batches': batches,
+            'mean_batch_size': round(requests_seen / batches, 2) if batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batch_size_histogram': {str(size): count for size, count in histogram.items()}
+        }
+
+    def _collect_batch(self) -> List:
+        """Block for the first item, then gather more until full or timed out."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Past the deadline: still take anything already queued
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, encode it, resolve the futures."""
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+
+            with self._lock:
+                self._histogram[len(batch)] += 1
+                self._requests += len(batch)
+
+            try:
+                embeddings = self.encode_fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
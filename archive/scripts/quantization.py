@@ -0,0 +1,407 @@
+"""
+CV-RAG Reduced-Precision Vector Search
+======================================
+Two-stage search: a cheap first pass over reduced-precision vectors picks
+`top_k * rerank` candidates, then only those are re-scored against the
+full float32 embeddings.
+
+Postgres (pgvector >= 0.7):
+    halfvec  - HNSW index on embedding::halfvec(N) (2 bytes/dim, half size)
+    binary   - HNSW index on binary_quantize(embedding)::bit(N) with Hamming
+               distance (1 bit/dim, 32x smaller)
+    The float32 `embedding` column is kept for the rerank, so the schema
+    does not change - only the index (the part that must stay in memory
+    to be fast) shrinks.
+
+In-process (local_index.LocalVectorIndex):
+    int8     - per-dimension symmetric scaling to [-127, 127] (4x smaller)
+    binary   - sign bits packed with np.packbits (32x smaller)
+    The float32 matrix stays memory-mapped on disk and only the candidate
+    rows are read for the rerank.
+
+Usage:
+    python quantization.py report [--k 3] [--rerank 4]   # memory + recall vs float32
+    python quantization.py create halfvec|binary          # build the pgvector index
+
+Environment:
+    NEON_CONNECTION_STRING - Postgres connection string (create / SQL report)
+    VECTOR_QUANTIZATION    - halfvec | binary, used by the Retriever and embedder
+    LOCAL_INDEX_DIR        - local index to report on (default data/local_index)
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import argparse
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SQL_MODES = ("halfvec", "binary")
+LOCAL_MODES = ("int8", "binary")
+DEFAULT_RERANK = 4
+DEFAULT_DIMENSION = 384
+
+# First-stage expression and distance per mode (must match the index exactly)
+FIRST_STAGE = {
+    'halfvec': ("embedding::halfvec({dim})", "$1::halfvec({dim})", "<=>", "halfvec_cosine_ops"),
+    'binary': ("binary_quantize(embedding)::bit({dim})", "binary_quantize($1)", "<~>", "bit_hamming_ops"),
+}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# ---------------------------------------------------------------------------
+# pgvector
+# ---------------------------------------------------------------------------
+
+def quantized_index_sql(mode: str, dimension: int = DEFAULT_DIMENSION, table: str = "cv_chunks") -> str:
+    """
+    CREATE INDEX statement for a reduced-precision HNSW expression index.
+
+    Args:
+        mode: "halfvec" or "binary"
+        dimension: Embedding dimension (384 for all-MiniLM-L6-v2)
+        table: Table holding the embedding column
+
+    Returns:
+        SQL statement
+    """
+    expression, _, _, opclass = FIRST_STAGE[mode]
+    return (f"CREATE INDEX IF NOT EXISTS {table}_embedding_{mode}_idx ON {table} "
+            f"USING hnsw (({expression.format(dim=int(dimension))}) {opclass})")
+
+
+def quantized_search_sql(mode: str, dimension: int = DEFAULT_DIMENSION, table: str = "cv_chunks",
+                         columns: str = "chunk_id, content, source") -> str:
+    """
+    Two-stage similarity query with the same columns as retriever.SIMILARITY_SQL.
+
+    Parameters: $1 query vector, $2 top_k, $3 number of candidates. The
+    inner query uses the quantized index; the outer one re-ranks the
+    candidates with exact float32 cosine distance.
+
+    Args:
+        mode: "halfvec" or "binary"
+        dimension: Embedding dimension
+        table: Table holding the embedding column
+        columns: Columns to return before the similarity
+
+    Returns:
+        SQL text using $1..$3 placeholders
+    """
+    expression, query_expression, operator, _ = FIRST_STAGE[mode]
+    dim = int(dimension)
+    return f"""
+    SELECT
+        {columns},
+        1 - (embedding <=> $1) AS similarity
+    FROM (
+        SELECT {columns}, embedding
+        FROM {table}
+        ORDER BY {expression.format(dim=dim)} {operator} {query_expression.format(dim=dim)}
+        LIMIT $3
+    ) candidates
+    ORDER BY embedding <=> $1
+    LIMIT $2
+"""
+
+
+def create_quantized_index(conn, mode: str, dimension: int = DEFAULT_DIMENSION, table: str = "cv_chunks"):
+    """
+    Build the reduced-precision index (requires pgvector >= 0.7).
+
+    Args:
+        conn: psycopg2 connection
+        mode: "halfvec" or "binary"
+        dimension: Embedding dimension
+        table: Table holding the embedding column
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(quantized_index_sql(mode, dimension, table))
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# NumPy
+# ---------------------------------------------------------------------------
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-dimension int8 quantization.
+
+    Args:
+        matrix: 2D float array
+
+    Returns:
+        (int8 codes, float32 scale per dimension); codes * scale ~ matrix
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scale = np.abs(matrix).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+def pack_bits(matrix: np.ndarray) -> np.ndarray:
+    """
+    Binary quantization: one sign bit per dimension, packed 8 per byte.
+
+    Args:
+        matrix: 1D or 2D float array
+
+    Returns:
+        uint8 array with ceil(dimension / 8) bytes per row
+    """
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+
+def hamming_distances(packed: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """
+    Hamming distance between every packed row and a packed query.
+
+    Args:
+        packed: uint8 matrix from pack_bits
+        query_bits: uint8 vector from pack_bits
+
+    Returns:
+        int array of differing bits per row
+    """
+    xor = np.bitwise_xor(packed, query_bits)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+def int8_scores(codes: np.ndarray, scale: np.ndarray, query: np.ndarray, block: int = 65536) -> np.ndarray:
+    """
+    Approximate dot products against int8 codes.
+
+    Folding the scale into the query keeps the matrix in int8; rows are
+    converted to float32 a block at a time so the temporary stays small.
+
+    Args:
+        codes: int8 matrix from quantize_int8
+        scale: Per-dimension scale from quantize_int8
+        query: float32 query vector
+
+    Returns:
+        float32 scores, one per row
+    """
+    scaled_query = (query * scale).astype(np.float32)
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block):
+        scores[start:start + block] = codes[start:start + block].astype(np.float32) @ scaled_query
+    return scores
+
+
+def top_indices(scores: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """Indices of the k best scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    order = -scores if largest else scores
+    top = np.argpartition(order, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return top[np.argsort(order[top], kind='stable')]
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def recall_at_k(found: List[np.ndarray], truth: List[np.ndarray], k: int) -> float:
+    """Fraction of the exact top-k recovered."""
+    hits = sum(len(set(f[:k].tolist()) & set(t[:k].tolist())) for f, t in zip(found, truth))
+    return hits / max(1, sum(min(k, len(t)) for t in truth))
+
+
+def local_report(embeddings: np.ndarray, k: int = 3, rerank: int = DEFAULT_RERANK,
+                 n_queries: int = 100, seed: int = 42) -> List[Dict]:
+    """
+    Memory and recall@k of the in-process modes against float32.
+
+    Held-out rows (excluded from their own results) are used as queries.
+
+    Args:
+        embeddings: Normalized float32 matrix
+        k: Results per query
+        rerank: Candidates per result for the float32 rerank
+        n_queries: Held-out queries
+        seed: Random seed
+
+    Returns:
+        One row per mode: name, bytes, recall with and without rerank
+    """
+    from local_index import LocalVectorIndex
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    chunks = [{'chunk_id': i, 'content': '', 'source': ''} for i in range(len(embeddings))]
+
+    def ids(index, query, candidates):
+        results = index.search(embeddings[query], top_k=k + 1, candidates=candidates)
+        return np.array([r['chunk_id'] for r in results if r['chunk_id'] != query][:k])
+
+    exact = LocalVectorIndex(embeddings, chunks)
+    truth = [ids(exact, q, None) for q in queries]
+    rows = [{'mode': 'float32', 'bytes': embeddings.nbytes, 'recall': 1.0, 'recall_no_rerank': 1.0}]
+
+    for mode in LOCAL_MODES:
+        index = LocalVectorIndex(embeddings, chunks, quantization=mode, rerank=rerank)
+        first_stage = [ids(index, q, k + 1) for q in queries]
+        reranked = [ids(index, q, (k + 1) * rerank) for q in queries]
+        rows.append({
+            'mode': mode,
+            'bytes': index.quantized_nbytes(),
+            'recall': recall_at_k(reranked, truth, k),
+            'recall_no_rerank': recall_at_k(first_stage, truth, k)
+        })
+    return rows
+
+
+def sql_report(conn, k: int = 3, rerank: int = DEFAULT_RERANK, n_queries: int = 50,
+               dimension: int = DEFAULT_DIMENSION) -> List[Dict]:
+    """
+    Index size and recall@k of the pgvector modes against the float32 index.
+
+    Builds each quantized index on a scratch copy of cv_chunks (see
+    index_tuner.py), so production indexes are untouched.
+
+    Args:
+        conn: psycopg2 connection
+        k: Results per query
+        rerank: Candidates per result for the float32 rerank
+        n_queries: Held-out queries
+        dimension: Embedding dimension
+
+    Returns:
+        One row per mode: name, index bytes, recall, p50/p99 latency
+    """
+    import psycopg2
+    from psycopg2 import sql
+    from index_tuner import (DEFAULT_INDEX, SCRATCH_TABLE, create_scratch_table, index_sql,
+                             run_queries, sample_queries, score)
+
+    create_scratch_table(conn)
+    rows = []
+    try:
+        queries = sample_queries(conn, n_queries)
+        truth = run_queries(conn, queries, k, exact=True)['results']
+        # Candidate count is per query; +1 because the held-out row is dropped
+        candidates = (k + 1) * rerank
+        settings = {'hnsw.ef_search': max(40, candidates)}
+
+        indexes = [('float32', index_sql(DEFAULT_INDEX, SCRATCH_TABLE, f"{SCRATCH_TABLE}_idx"), None)]
+        for mode in SQL_MODES:
+            search = (quantized_search_sql(mode, dimension, SCRATCH_TABLE, columns="id")
+                      .replace("$1", "%(embedding)s::vector").replace("$2", "%(limit)s")
+                      .replace("$3", str(candidates)))
+            indexes.append((mode, quantized_index_sql(mode, dimension, SCRATCH_TABLE),
+                            f"SELECT id FROM ({search}) ranked"))
+
+        for mode, create, statement in indexes:
+            with conn.cursor() as cursor:
+                try:
+                    cursor.execute(create)
+                    conn.commit()
+                except psycopg2.Error as e:
+                    # halfvec / binary_quantize need pgvector >= 0.7
+                    conn.rollback()
+                    print(f"  ⚠️  Skipping {mode}: {str(e).splitlines()[0]}")
+                    continue
+                cursor.execute("""
+                    SELECT COALESCE(SUM(pg_relation_size(indexrelid)), 0) FROM pg_index
+                    WHERE indrelid = %s::regclass AND NOT indisprimary
+                """, (SCRATCH_TABLE,))
+                index_bytes = cursor.fetchone()[0]
+            run = run_queries(conn, queries, k, settings, statement=statement)
+            rows.append({'mode': mode, 'bytes': index_bytes, **score(run, truth, k)})
+
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass
+                """, (SCRATCH_TABLE,))
+                for (name,) in cursor.fetchall():
+                    cursor.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(name)))
+            conn.commit()
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(SCRATCH_TABLE)))
+        conn.commit()
+    return rows
+
+
+def print_report(title: str, rows: List[Dict], k: int):
+    """Print memory saved and recall kept per mode."""
+    baseline = rows[0]['bytes'] or 1
+    print(f"\n{title}")
+    for row in rows:
+        saved = 1 - row['bytes'] / baseline
+        line = f"  {row['mode']:<8} {row['bytes'] / 1024:10.1f} KB  ({saved:6.1%} saved)  recall@{k} {row['recall']:.3f}"
+        if 'recall_no_rerank' in row:
+            line += f"  (first stage only {row['recall_no_rerank']:.3f})"
+        if 'p50_ms' in row:
+            line += f"  p50 {row['p50_ms']:.2f} ms  p99 {row['p99_ms']:.2f} ms"
+        print(line)
+
+
+def main():
+    """Report memory/recall trade-offs or create a quantized pgvector index."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Reduced-precision vector search tools")
+    parser.add_argument("command", choices=["report", "create"])
+    parser.add_argument("mode", nargs="?", choices=SQL_MODES, help="Index to create (create only)")
+    parser.add_argument("--k", type=int, default=3, help="Results per query")
+    parser.add_argument("--rerank", type=int, default=DEFAULT_RERANK, help="Candidates per result")
+    parser.add_argument("--queries", type=int, default=50, help="Held-out queries")
+    parser.add_argument("--dimension", type=int, default=DEFAULT_DIMENSION, help="Embedding dimension")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CV-RAG Reduced-Precision Vectors")
+    print("=" * 60)
+
+    connection_string = os.getenv("NEON_CONNECTION_STRING")
+
+    if args.command == "create":
+        if not args.mode or not connection_string:
+            print("❌ Usage: NEON_CONNECTION_STRING=... python quantization.py create halfvec|binary")
+            return
+        import psycopg2
+
+        conn = psycopg2.connect(connection_string)
+        create_quantized_index(conn, args.mode, args.dimension)
+        conn.close()
+        print(f"✅ Created cv_chunks_embedding_{args.mode}_idx")
+        print(f"   Set VECTOR_QUANTIZATION={args.mode} to search with it")
+        return
+
+    from local_index import DEFAULT_INDEX_DIR
+
+    index_dir = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR)
+    embeddings_file = os.path.join(index_dir, "embeddings.npy")
+    if os.path.exists(embeddings_file):
+        rows = local_report(np.load(embeddings_file), args.k, args.rerank, args.queries)
+        print_report(f"In-process ({embeddings_file})", rows, args.k)
+    else:
+        print(f"\n⚠️  No local index at {index_dir} (run `python local_index.py export`)")
+
+    if connection_string:
+        import psycopg2
+
+        conn = psycopg2.connect(connection_string)
+        try:
+            rows = sql_report(conn, args.k, args.rerank, args.queries, args.dimension)
+            print_report("pgvector (index size)", rows, args.k)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,181 @@
 """
 CV-RAG Query Tester
 ===================
-This script tests the RAG pipeline by querying the database directly
-or through the n8n webhook.
+This script tests the RAG pipeline by querying the database directly,
+through the n8n webhook, or against a local in-process index exported
+from cv_chunks (see local_index.py).
+
+Set HYBRID_SEARCH=1 to fuse keyword and vector results (see
+hybrid_retriever.py) in the direct and local index modes.
+
+Set EMBEDDING_SERVICE_URL (e.g. http://localhost:8000) to embed queries
+with embedding_service.py, fetched as raw float32 bytes (see
+embedding_client.py), instead of loading the model in this process.
+
+In the interactive direct and local modes, prefix a question with
+metadata filters to search one document, resume version or section:
+    version=openai What did Mike build with agents?
 
 Author: Mike Murphy
 Project: CV-RAG
 """
 
 import os
-from typing import List, Dict
-import psycopg2
-from sentence_transformers import SentenceTransformer
+from typing import TYPE_CHECKING, List, Dict
 from dotenv import load_dotenv
 import requests
 
+from embedding_client import EmbeddingClient
+from hybrid_retriever import HybridRetriever
+from local_index import LocalVectorIndex, DEFAULT_INDEX_DIR
+from metadata_filters import parse_filters
+from retriever import Retriever
+from tracing import StageTimer, format_timings
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+# Warm retrievers (model + connection pool), one per connection string
+_retrievers: Dict[str, Retriever] = {}
+_hybrid_retrievers: Dict[str, HybridRetriever] = {}
+_model = None
+
+
+def hybrid_enabled() -> bool:
+    """True when HYBRID_SEARCH=1 asks for keyword + vector fusion."""
+    return os.getenv("HYBRID_SEARCH", "0") == "1"
+
+
+def format_score(chunk: Dict) -> str:
+    """Score line for a result from either the vector or the hybrid path."""
+    if 'rrf_score' in chunk:
+        similarity = chunk.get('similarity')
+        return f"RRF: {chunk['rrf_score']:.4f}" + (f" | Similarity: {similarity:.3f}" if similarity is not None else " | keyword match")
+    return f"Similarity: {chunk['similarity']:.3f}"
+
+
+def get_model() -> "SentenceTransformer":
+    """
+    Load the embedding model once per process.
+
+    sentence-transformers (and torch) are imported here rather than at
+    module level, so the n8n mode starts without them.
 
-def query_database_direct(query_text: str, connection_string: str, top_k: int = 3) -> List[Dict]:
+    Returns:
+        Shared SentenceTransformer instance, or an EmbeddingClient for
+        EMBEDDING_SERVICE_URL
+    """
+    global _model
+    if _model is None:
+        service_url = os.getenv("EMBEDDING_SERVICE_URL")
+        if service_url:
+            print(f"📡 Using embedding service at {service_url}...")
+            _model = EmbeddingClient(service_url)
+        else:
+            from sentence_transformers import SentenceTransformer
+
+            print("📥 Loading embedding model...")
+            _model = SentenceTransformer('all-MiniLM-L6-v2')
+    return _model
+
+
+def get_retriever(connection_string: str) -> Retriever:
+    """
+    Get (or create) the warm retriever for a database.
+
+    Args:
+        connection_string: PostgreSQL connection string
+
+    Returns:
+        Retriever sharing the process-wide embedding model
+    """
+    if connection_string not in _retrievers:
+        model = get_model()
+        print("💾 Opening database connection pool...")
+        # VECTOR_QUANTIZATION=halfvec|binary searches the reduced-precision index
+        quantization = os.getenv("VECTOR_QUANTIZATION") or None
+        # Hybrid search runs both legs at once, each on its own pooled connection
+        _retrievers[connection_string] = Retriever(connection_string, model=model, quantization=quantization,
+                                                   min_connections=2 if hybrid_enabled() else 1)
+    return _retrievers[connection_string]
+
+
+def get_hybrid_retriever(connection_string: str) -> HybridRetriever:
+    """
+    Get (or create) the keyword + vector retriever for a database.
+
+    Args:
+        connection_string: PostgreSQL connection string
+
+    Returns:
+        HybridRetriever sharing the warm retriever's model and pool
+    """
+    if connection_string not in _hybrid_retrievers:
+        _hybrid_retrievers[connection_string] = HybridRetriever.from_retriever(get_retriever(connection_string))
+    return _hybrid_retrievers[connection_string]
+
+
+def query_database_direct(query_text: str, connection_string: str, top_k: int = 3,
+                          hybrid: bool = None, filters: Dict = None) -> List[Dict]:
     """
     Query the database directly without n8n (for testing).
 
+    The model and connection pool are created on the first call and reused
+    afterwards, so only the first query pays their startup cost.
+
     Args:
         query_text: The question to ask
         connection_string: PostgreSQL connection string
         top_k: Number of similar chunks to retrieve
+        hybrid: Fuse full-text and vector results (default: HYBRID_SEARCH)
+        filters: Optional metadata filters, e.g. {'version': 'openai'}
 
     Returns:
-        List of relevant chunks with similarity scores
+        List of relevant chunks with similarity (and, if hybrid, RRF) scores
     """
-    print(f"\n= Query: '{query_text}'")
+    print(f"\n🔍 Query: '{query_text}'")
+    if filters:
+        print(f"   Filters: {filters}")
     print(f"{'=' * 60}")
 
-    # Load embedding model
-    print("= Loading embedding model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-
-    # Generate embedding for query
-    print("= Generating query embedding...")
-    query_embedding = model.encode(query_text).tolist()
-
-    # Connect to database
-    print("= Connecting to database...")
-    conn = psycopg2.connect(connection_string)
-    cursor = conn.cursor()
-
-    # Perform vector similarity search
-    print(f"= Searching for top {top_k} similar chunks...")
-    cursor.execute("""
-        SELECT
-            chunk_id,
-            content,
-            source,
-            1 - (embedding <=> %s::vector) AS similarity
-        FROM cv_chunks
-        ORDER BY embedding <=> %s::vector
-        LIMIT %s;
-    """, (query_embedding, query_embedding, top_k))
-
-    results = cursor.fetchall()
-
-    # Format results
-    chunks = []
-    for row in results:
-        chunks.append({
-            'chunk_id': row[0],
-            'content': row[1],
-            'source': row[2],
-            'similarity': float(row[3])
-        })
-
-    cursor.close()
-    conn.close()
+    if hybrid is None:
+        hybrid = hybrid_enabled()
+
+    with StageTimer("query_database_direct", hybrid=hybrid) as timer:
+        if hybrid:
+            print(f"🔍 Searching for top {top_k} chunks (keyword + vector, RRF)...")
+            chunks = get_hybrid_retriever(connection_string).query(query_text, top_k, filters, timer)
+        else:
+            # Perform vector similarity search
+            print(f"🔍 Searching for top {top_k} similar chunks...")
+            chunks = get_retriever(connection_string).query(query_text, top_k, filters, timer)
+    print(f"⏱️  {format_timings(timer.timings)}")
 
     return chunks
 
 
+def load_local_index(index_dir=DEFAULT_INDEX_DIR) -> LocalVectorIndex:
+    """
+    Load the local index with a warm embedding model for repeated queries.
+
+    Args:
+        index_dir: Directory written by `python local_index.py export`
+
+    Returns:
+        LocalVectorIndex whose query() matches query_database_direct results
+    """
+    model = get_model()
+
+    print(f"📥 Loading local index from {index_dir}...")
+    # LOCAL_INDEX_QUANTIZATION=int8|binary keeps only compact codes in memory
+    quantization = os.getenv("LOCAL_INDEX_QUANTIZATION") or None
+    index = LocalVectorIndex.load(index_dir, encode_fn=model.encode, quantization=quantization)
+    print(f"   {len(index)} chunks loaded" + (f" ({quantization} + float32 rerank)" if quantization else ""))
+
+    return index
+
+
 def query_via_n8n(query_text: str, webhook_url: str) -> Dict:
     """
     Query through the n8n workflow (full RAG pipeline).
@@ -86,10 +187,10 @@ def query_via_n8n(query_text: str, webhook_url: str) -> Dict:
     Returns:
         Response from n8n workflow including LLM-generated answer
     """
-    print(f"\n= Query: '{query_text}'")
+    print(f"\n🔍 Query: '{query_text}'")
     print(f"{'=' * 60}")
 
-    print("= Sending request to n8n webhook...")
+    print("📡 Sending request to n8n webhook...")
     response = requests.post(
         webhook_url,
         json={'query': query_text},
@@ -97,9 +198,12 @@ def query_via_n8n(query_text: str, webhook_url: str) -> Dict:
     )
 
     if response.status_code == 200:
-        return response.json()
+        result = response.json()
+        if result.get('timings'):
+            print(f"⏱️  {format_timings(result['timings'])}")
+        return result
     else:
-        print(f"L Error: {response.status_code}")
+        print(f"❌ Error: {response.status_code}")
         print(response.text)
         return None
 
@@ -112,7 +216,7 @@ def test_direct_query():
 
     connection_string = os.getenv("NEON_CONNECTION_STRING")
     if not connection_string:
-        print("L Error: NEON_CONNECTION_STRING not found in .env file")
+        print("❌ Error: NEON_CONNECTION_STRING not found in .env file")
         return
 
     print("=" * 60)
@@ -130,10 +234,10 @@ def test_direct_query():
     for query in test_queries:
         results = query_database_direct(query, connection_string, top_k=3)
 
-        print(f"\n= Found {len(results)} relevant chunks:\n")
+        print(f"\n📊 Found {len(results)} relevant chunks:\n")
 
         for i, chunk in enumerate(results, 1):
-            print(f"{i}. Source: {chunk['source']} | Similarity: {chunk['similarity']:.3f}")
+            print(f"{i}. Source: {chunk['source']} | {format_score(chunk)}")
             print(f"   {'-' * 56}")
             print(f"   {chunk['content'][:200]}...")
             print(f"   {'-' * 56}\n")
@@ -150,7 +254,7 @@ def test_n8n_query():
 
     webhook_url = os.getenv("N8N_WEBHOOK_URL")
     if not webhook_url:
-        print("L Error: N8N_WEBHOOK_URL not found in .env file")
+        print("❌ Error: N8N_WEBHOOK_URL not found in .env file")
         print("   Please set up your n8n workflow first")
         return
 
@@ -169,13 +273,13 @@ def test_n8n_query():
         response = query_via_n8n(query, webhook_url)
 
         if response:
-            print(f"\n= LLM Response:")
+            print(f"\n📝 LLM Response:")
             print(f"   {'-' * 56}")
             print(f"   {response.get('answer', 'No answer found')}")
             print(f"   {'-' * 56}\n")
 
             if 'sources' in response:
-                print(f"= Sources used: {response['sources']}")
+                print(f"📚 Sources used: {response['sources']}")
 
         print("=" * 60)
         input("\nPress Enter to continue to next query...")
@@ -189,29 +293,32 @@ def interactive_mode():
 
     connection_string = os.getenv("NEON_CONNECTION_STRING")
     webhook_url = os.getenv("N8N_WEBHOOK_URL")
+    index_dir = os.getenv("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR)
 
     print("=" * 60)
     print("CV-RAG Interactive Query Mode")
     print("=" * 60)
 
-    mode = input("\nChoose mode:\n  1. Direct database query (no LLM)\n  2. Full n8n pipeline (with LLM)\n\nEnter 1 or 2: ")
+    mode = input("\nChoose mode:\n  1. Direct database query (no LLM)\n  2. Full n8n pipeline (with LLM)\n  3. Local in-process index (no database, no LLM)\n\nEnter 1, 2 or 3: ")
 
     if mode == "1" and connection_string:
-        print("\n= Direct query mode - Returns similar chunks without LLM generation\n")
+        print("\n💡 Direct query mode - Returns similar chunks without LLM generation\n")
+        print("   Filter with source=/version=/section= prefixes, e.g. 'version=openai <question>'")
         while True:
             query = input("\nEnter your question (or 'quit' to exit): ")
             if query.lower() in ['quit', 'exit', 'q']:
                 break
 
-            results = query_database_direct(query, connection_string, top_k=3)
-            print(f"\n= Found {len(results)} relevant chunks:\n")
+            filters, query = parse_filters(query)
+            results = query_database_direct(query, connection_string, top_k=3, filters=filters)
+            print(f"\n📊 Found {len(results)} relevant chunks:\n")
 
             for i, chunk in enumerate(results, 1):
-                print(f"{i}. Similarity: {chunk['similarity']:.3f}")
+                print(f"{i}. {format_score(chunk)}")
                 print(f"   {chunk['content']}\n")
 
     elif mode == "2" and webhook_url:
-        print("\n= Full RAG mode - Returns LLM-generated answers\n")
+        print("\n💡 Full RAG mode - Returns LLM-generated answers\n")
         while True:
             query = input("\nEnter your question (or 'quit' to exit): ")
             if query.lower() in ['quit', 'exit', 'q']:
@@ -219,9 +326,29 @@ def interactive_mode():
 
             response = query_via_n8n(query, webhook_url)
             if response:
-                print(f"\n= Answer: {response.get('answer', 'No answer found')}\n")
+                print(f"\n📝 Answer: {response.get('answer', 'No answer found')}\n")
+
+    elif mode == "3" and os.path.exists(os.path.join(index_dir, "embeddings.npy")):
+        print("\n💡 Local index mode - Ranks chunks in-process without a database\n")
+        print("   Filter with source=/version=/section= prefixes, e.g. 'version=openai <question>'")
+        index = load_local_index(index_dir)
+        if hybrid_enabled():
+            print("   Hybrid search: BM25 + vector, fused with RRF")
+            index = HybridRetriever.from_local_index(index)
+        while True:
+            query = input("\nEnter your question (or 'quit' to exit): ")
+            if query.lower() in ['quit', 'exit', 'q']:
+                break
+
+            filters, query = parse_filters(query)
+            results = index.query(query, top_k=3, filters=filters)
+            print(f"\n📊 Found {len(results)} relevant chunks:\n")
+
+            for i, chunk in enumerate(results, 1):
+                print(f"{i}. {format_score(chunk)}")
+                print(f"   {chunk['content']}\n")
     else:
-        print("L Configuration missing for selected mode")
+        print("❌ Configuration missing for selected mode")
 
 
 def main():
@@ -0,0 +1,259 @@
+"""
+CV-RAG Retriever
+================
+Reusable pgvector retriever with a warm embedding model and a connection pool.
+
+Building a SentenceTransformer and opening a new psycopg2 connection for
+every query costs seconds. A Retriever loads the model once, keeps a small
+ThreadedConnectionPool open, and runs the similarity search as a prepared
+statement on each pooled connection, so repeated queries only pay for the
+forward pass and one round trip.
+
+With quantization="halfvec" or "binary" the statement searches the
+reduced-precision index first and re-ranks the candidates in float32 (see
+quantization.py); the index must exist (`python quantization.py create`).
+
+search()/query() accept metadata filters ({"version": "openai"}, see
+metadata_filters.py). Filtered queries are sent with literal values so the
+planner can pick a per-version partial index, and use pgvector's iterative
+index scan where available (>= 0.8) so selective filters still fill top_k.
+On older pgvector, a filtered search that comes back short is re-run as an
+exact scan over the matching rows.
+
+Usage:
+    retriever = Retriever(connection_string)
+    chunks = retriever.query("What AI tutorials has Mike created?", top_k=3)
+    retriever.close()
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import weakref
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from metadata_filters import filter_clause, pgvector_version
+from quantization import DEFAULT_DIMENSION, DEFAULT_RERANK, SQL_MODES, quantized_search_sql
+from tracing import StageTimer
+
+SIMILARITY_STATEMENT = "cv_chunks_similarity"
+
+SIMILARITY_SQL = """
+    SELECT
+        chunk_id,
+        content,
+        source,
+        1 - (embedding <=> $1) AS similarity
+    FROM cv_chunks
+    ORDER BY embedding <=> $1
+    LIMIT $2
+"""
+
+# Not prepared: a generic plan cannot match a partial index predicate
+FILTERED_SQL = """
+    SELECT
+        chunk_id,
+        content,
+        source,
+        1 - (embedding <=> %(embedding)s::vector) AS similarity
+    FROM cv_chunks
+    WHERE {conditions}
+    ORDER BY embedding <=> %(embedding)s::vector
+    LIMIT %(top_k)s
+"""
+
+
+def vector_literal(embedding) -> str:
+    """
+    Format an embedding as a pgvector text literal.
+
+    Args:
+        embedding: Sequence of floats
+
+    Returns:
+        String like '[0.1,0.2,...]'
+    """
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+class Retriever:
+    """
+    Warm model + pooled connections for repeated similarity queries.
+
+    Args:
+        connection_string: PostgreSQL connection string
+        model_name: sentence-transformers model used for query embeddings
+        min_connections: Connections opened up front and kept open when idle
+            (the pool closes returned connections beyond this number)
+        max_connections: Upper bound on pooled connections
+        prepare: Use server-side prepared statements (disable behind a
+            transaction-mode pooler such as PgBouncer, which cannot keep them)
+        model: Already-loaded model to reuse instead of loading model_name
+        quantization: None (float32 index), "halfvec" or "binary"
+        rerank: Candidates per result re-ranked in float32 (quantized modes)
+        dimension: Embedding dimension used in the quantized index expression
+    """
+
+    def __init__(self, connection_string: str, model_name: str = "all-MiniLM-L6-v2",
+                 min_connections: int = 1, max_connections: int = 4,
+                 prepare: bool = True, model=None, quantization: str = None,
+                 rerank: int = DEFAULT_RERANK, dimension: int = DEFAULT_DIMENSION):
+        if quantization not in (None,) + SQL_MODES:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {SQL_MODES}")
+
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+
+        self.model = model
+        self.model_name = model_name
+        self.prepare = prepare
+        self.quantization = quantization
+        self.rerank = rerank
+        self.sql = quantized_search_sql(quantization, dimension) if quantization else SIMILARITY_SQL
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, connection_string)
+        # Connections holding the prepared statement (closed ones drop out)
+        self._prepared = weakref.WeakSet()
+        # pgvector >= 0.8 supports iterative index scans (checked on first filtered query)
+        self._iterative_scan = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close every pooled connection."""
+        self.pool.closeall()
+
+    def embed(self, query_text: str) -> List[float]:
+        """
+        Embed a query with the warm model.
+
+        Args:
+            query_text: The question to ask
+
+        Returns:
+            Query embedding as a list of floats
+        """
+        return self.model.encode(query_text).tolist()
+
+    def _prepare(self, conn) -> bool:
+        """Prepare the similarity statement once per pooled connection."""
+        if not self.prepare:
+            return False
+        if conn in self._prepared:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                # $3 (candidates) is only referenced by the quantized query
+                cursor.execute(f"PREPARE {SIMILARITY_STATEMENT} (vector, integer, integer) AS {self.sql};")
+            conn.commit()
+        except psycopg2.Error:
+            # e.g. a pooler that does not support prepared statements
+            conn.rollback()
+            self.prepare = False
+            return False
+
+        self._prepared.add(conn)
+        return True
+
+    def _search_filtered(self, cursor, embedding: str, top_k: int, filters: Dict) -> List[tuple]:
+        """Float32 search restricted by metadata filters (quantized indexes are not partial)."""
+        conditions, params = filter_clause(filters)
+        if self._iterative_scan is None:
+            self._iterative_scan = pgvector_version(cursor.connection) >= (0, 8, 0)
+        if self._iterative_scan:
+            cursor.execute("SET LOCAL hnsw.iterative_scan = relaxed_order;")
+            cursor.execute("SET LOCAL ivfflat.iterative_scan = relaxed_order;")
+
+        statement = FILTERED_SQL.format(conditions=conditions)
+        values = {'embedding': embedding, 'top_k': top_k, **params}
+        cursor.execute(statement, values)
+        rows = cursor.fetchall()
+        if len(rows) < top_k and not self._iterative_scan:
+            # No partial index matched and the ANN scan ran out of candidates
+            # before enough rows passed the filter: rank the filtered rows exactly
+            cursor.execute("SET LOCAL enable_indexscan = off;")
+            cursor.execute(statement, values)
+            rows = cursor.fetchall()
+        # relaxed_order may return rows slightly out of distance order
+        return sorted(rows, key=lambda row: -row[3])
+
+    def search(self, query_embedding, top_k: int = 3, filters: Optional[Dict] = None) -> List[Dict]:
+        """
+        Find the top_k most similar chunks for an embedding.
+
+        Args:
+            query_embedding: Query vector
+            top_k: Number of similar chunks to retrieve
+            filters: Optional metadata filters (source / version / section)
+
+        Returns:
+            List of relevant chunks with similarity scores
+        """
+        embedding = vector_literal(query_embedding)
+        candidates = top_k * self.rerank
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                if filters:
+                    results = self._search_filtered(cursor, embedding, top_k, filters)
+                else:
+                    # Prepare first: its commit would discard the SET LOCAL below
+                    prepared = self._prepare(conn)
+                    if self.quantization and candidates > 40:
+                        # HNSW returns at most ef_search rows (default 40)
+                        cursor.execute("SET LOCAL hnsw.ef_search = %s;", (candidates,))
+                    if prepared:
+                        cursor.execute(f"EXECUTE {SIMILARITY_STATEMENT} (%s, %s, %s);",
+                                       (embedding, top_k, candidates))
+                    else:
+                        cursor.execute(
+                            self.sql.replace("$1", "%(embedding)s::vector").replace("$2", "%(top_k)s")
+                            .replace("$3", "%(candidates)s"),
+                            {'embedding': embedding, 'top_k': top_k, 'candidates': candidates}
+                        )
+                    results = cursor.fetchall()
+            # End the read-only transaction so the connection goes back idle
+            conn.rollback()
+        except psycopg2.Error:
+            self._prepared.discard(conn)
+            self.pool.putconn(conn, close=True)
+            raise
+        else:
+            self.pool.putconn(conn)
+
+        return [{
+            'chunk_id': row[0],
+            'content': row[1],
+            'source': row[2],
+            'similarity': float(row[3])
+        } for row in results]
+
+    def query(self, query_text: str, top_k: int = 3, filters: Optional[Dict] = None,
+              timer: Optional[StageTimer] = None) -> List[Dict]:
+        """
+        Embed query text and retrieve the most similar chunks.
+
+        Args:
+            query_text: The question to ask
+            top_k: Number of similar chunks to retrieve
+            filters: Optional metadata filters (source / version / section)
+            timer: Optional StageTimer; records the "embed" and "retrieve" stages
+
+        Returns:
+            List of relevant chunks with similarity scores
+        """
+        timer = timer or StageTimer()
+        with timer.stage("embed"):
+            query_embedding = self.embed(query_text)
+        with timer.stage("retrieve", top_k=top_k, quantization=self.quantization or "none") as span:
+            chunks = self.search(query_embedding, top_k, filters)
+            span['rows'] = len(chunks)
+        return chunks
@@ -0,0 +1,306 @@
+"""
+CV-RAG Token-Aware Markdown Chunker
+===================================
+Splits Markdown documents along their structure (headings, bullet items,
+paragraphs) and packs the pieces into chunks up to a token budget.
+
+chunk_document() counts characters, but the embedding models truncate by
+tokens (all-MiniLM-L6-v2 stops at 256 word pieces), so long character
+chunks lose their tail silently while short ones waste a forward pass.
+Here every chunk is measured with the embedding model's own tokenizer:
+
+- a new chunk starts at every level 1-2 heading, so sections stay apart
+- a bullet item (with its continuation lines) or paragraph is never split
+  unless it alone exceeds the budget, in which case it is cut on words
+- a chunk that starts inside a section repeats the section's headings, so
+  it still says which job or project it is about
+- token lengths are cached per line: with WordPiece tokenizers (whitespace
+  pre-tokenization) a chunk's length is exactly the sum of its lines',
+  so each line is tokenized once however many packings consider it
+
+Usage (via chunker.py):
+    python chunker.py --mode tokens
+    python chunker.py --dir ../docs --mode tokens --max-tokens 254
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# all-MiniLM-L6-v2 max_seq_length (256) minus the [CLS] and [SEP] tokens
+DEFAULT_MAX_TOKENS = 254
+
+HEADING = re.compile(r"^(#{1,6})\s")
+BULLET = re.compile(r"^([-*+]|\d+[.)])\s")
+RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+# (heading level or 0 for content, lines)
+Block = Tuple[int, List[str]]
+
+
+def load_tokenizer(name: str):
+    """
+    Load the tokenizer of an embedding model.
+
+    Args:
+        name: tokenizer.json path, Hugging Face repo id, or a bare
+            sentence-transformers model name (e.g. all-MiniLM-L6-v2)
+
+    Returns:
+        tokenizers.Tokenizer
+    """
+    from tokenizers import Tokenizer
+
+    if Path(name).is_file():
+        return Tokenizer.from_file(name)
+    repo_id = name if "/" in name else f"sentence-transformers/{name}"
+    return Tokenizer.from_pretrained(repo_id)
+
+
+class TokenCounter:
+    """
+    Token lengths of lines, cached by line text.
+
+    Args:
+        tokenizer: Object whose encode(text, add_special_tokens=False)
+            returns an encoding with .ids (tokenizers.Tokenizer)
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self._lengths: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, line: str) -> int:
+        """
+        Number of tokens in a line (without special tokens).
+
+        Args:
+            line: Text without newlines
+
+        Returns:
+            Token count
+        """
+        length = self._lengths.get(line)
+        if length is None:
+            self.misses += 1
+            length = len(self.tokenizer.encode(line, add_special_tokens=False).ids)
+            self._lengths[line] = length
+        else:
+            self.hits += 1
+        return length
+
+    def count_lines(self, lines: List[str]) -> int:
+        """Token count of lines joined by newlines."""
+        return sum(self.count(line) for line in lines)
+
+
+def markdown_blocks(text: str) -> List[Block]:
+    """
+    Split Markdown into heading, bullet-item and paragraph blocks.
+
+    Blank lines and horizontal rules end a block. Indented lines (nested
+    bullets, wrapped text) stay with the block above them, and a fenced
+    code block is kept whole (its '#' comments are not headings).
+
+    Args:
+        text: Markdown document
+
+    Returns:
+        List of (heading level, lines); level is 0 for content blocks
+    """
+    blocks = []
+    current = []
+    fence = None
+
+    def flush():
+        if current:
+            blocks.append((0, current[:]))
+            current.clear()
+
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+
+        if fence:
+            current.append(line)
+            if stripped.startswith(fence):
+                fence = None
+                flush()
+            continue
+
+        opening = FENCE.match(line)
+        if opening:
+            flush()
+            fence = opening.group(1)
+            current.append(line)
+            continue
+
+        if not stripped or RULE.match(line):
+            flush()
+            continue
+
+        heading = HEADING.match(line)
+        if heading:
+            flush()
+            blocks.append((len(heading.group(1)), [stripped]))
+            continue
+
+        if BULLET.match(line):
+            flush()
+        current.append(line)
+
+    flush()
+    return blocks
+
+
+def split_oversized(lines: List[str], counter: TokenCounter, budget: int) -> List[List[str]]:
+    """
+    Cut a block that does not fit in one chunk on word boundaries.
+
+    Args:
+        lines: Lines of the block
+        counter: Cached token counter
+        budget: Tokens available per piece
+
+    Returns:
+        Pieces of the block, each a list of lines within the budget
+    """
+    pieces = []
+    piece, piece_tokens = [], 0
+    for line in lines:
+        if counter.count(line) <= budget - piece_tokens:
+            piece.append(line)
+            piece_tokens += counter.count(line)
+            continue
+
+        words = []
+        for word in line.split():
+            tokens = counter.count(word)
+            if words and piece_tokens + tokens > budget:
+                piece.append(" ".join(words))
+                pieces.append(piece)
+                piece, piece_tokens, words = [], 0, []
+            elif not words and piece and piece_tokens + tokens > budget:
+                pieces.append(piece)
+                piece, piece_tokens = [], 0
+            words.append(word)
+            piece_tokens += tokens
+        if words:
+            piece.append(" ".join(words))
+
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+
+def pack_blocks(blocks: List[Block], counter: TokenCounter, max_tokens: int = DEFAULT_MAX_TOKENS,
+                break_level: int = 2) -> List[Tuple[str, int]]:
+    """
+    Pack Markdown blocks into chunks of at most max_tokens tokens.
+
+    Args:
+        blocks: Output of markdown_blocks
+        counter: Cached token counter
+        max_tokens: Token budget per chunk
+        break_level: Headings at this level or above always start a chunk
+
+    Returns:
+        List of (chunk text, token count)
+    """
+    chunks = []
+    headings: List[Tuple[int, str]] = []
+    parts: List[List[str]] = []
+    tokens = 0
+    has_content = False
+
+    def flush():
+        nonlocal parts, tokens, has_content
+        if has_content:
+            chunks.append(("\n\n".join("\n".join(part) for part in parts), tokens))
+        parts, tokens, has_content = [], 0, False
+
+    def start(context: List[str]):
+        """Open a chunk with the headings of the section it continues."""
+        nonlocal tokens
+        if context:
+            parts.append(context)
+            tokens = counter.count_lines(context)
+
+    for level, lines in blocks:
+        if level:
+            headings = [h for h in headings if h[0] < level]
+            if level <= break_level:
+                flush()
+            block_tokens = counter.count_lines(lines)
+            if parts and tokens + block_tokens > max_tokens:
+                flush()
+            if not parts:
+                start([h[1] for h in headings])
+            headings.append((level, lines[0]))
+            parts.append(lines)
+            tokens += block_tokens
+            continue
+
+        context = [h[1] for h in headings]
+        block_tokens = counter.count_lines(lines)
+        if parts and tokens + block_tokens > max_tokens:
+            flush()
+        if not parts:
+            start(context)
+
+        if tokens + block_tokens <= max_tokens:
+            parts.append(lines)
+            tokens += block_tokens
+            has_content = True
+            continue
+
+        # The block alone overflows: cut it, repeating the headings per piece
+        budget = max_tokens - counter.count_lines(context)
+        if budget <= 0:
+            context, budget = [], max_tokens
+            parts, tokens = [], 0
+        for i, piece in enumerate(split_oversized(lines, counter, budget)):
+            if i:
+                flush()
+                if context:
+                    start(context)
+            parts.append(piece)
+            tokens += counter.count_lines(piece)
+            has_content = True
+
+    flush()
+    return chunks
+
+
+def chunk_markdown(content: str, source: str, counter: TokenCounter,
+                   max_tokens: int = DEFAULT_MAX_TOKENS) -> List[Dict]:
+    """
+    Token-aware counterpart of chunker.chunk_document.
+
+    Args:
+        content: Markdown document
+        source: Source identifier (e.g., "resume", "supplemental")
+        counter: Cached token counter for the embedding model
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List of chunk dictionaries (chunk_document's fields plus 'tokens')
+    """
+    chunks = pack_blocks(markdown_blocks(content), counter, max_tokens)
+    return [
+        {
+            "chunk_id": f"{source}_{i}",
+            "content": text,
+            "source": source,
+            "chunk_index": i,
+            "total_chunks": len(chunks),
+            "tokens": tokens
+        }
+        for i, (text, tokens) in enumerate(chunks)
+    ]
@@ -0,0 +1,24 @@
+"""
+CV-RAG Stage Tracing
+====================
+Per-stage latency tracing for the retrievers, query.py and the embedding
+service.
+
+The implementation is shared with the Streamlit app and lives in
+streamlit/tracing.py, the one folder the Streamlit image ships. This module
+runs that file under the name "tracing", so `from tracing import
+StageTimer` works here as it does in the app, with a single copy to
+maintain.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SHARED_MODULE = Path(__file__).resolve().parent.parent.parent / "streamlit" / "tracing.py"
+
+_spec = importlib.util.spec_from_file_location(__name__, SHARED_MODULE)
+_spec.loader.exec_module(sys.modules[__name__])
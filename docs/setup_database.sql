@@ -25,16 +25,41 @@ CREATE TABLE IF NOT EXISTS cv_chunks (
     chunk_index INTEGER,
     total_chunks INTEGER,
     embedding VECTOR(384),  -- Matches all-MiniLM-L6-v2 embedding dimension
+    content_hash VARCHAR(64),  -- Used by incremental ingest to skip unchanged chunks
+    version VARCHAR(50),  -- Resume variant (docs/versions/<type>_<role>_*.md), NULL for base docs
+    section TEXT,  -- Markdown heading trail, e.g. 'Michael J. Murphy > 💼 Experience'
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Tables created before incremental ingest need the content_hash column
+ALTER TABLE cv_chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+-- Tables created before metadata filtering need the version/section columns
+ALTER TABLE cv_chunks ADD COLUMN IF NOT EXISTS version VARCHAR(50);
+ALTER TABLE cv_chunks ADD COLUMN IF NOT EXISTS section TEXT;
+
 -- Create index for fast vector similarity search using cosine distance
--- ivfflat is an approximate nearest neighbor (ANN) algorithm
--- lists = 10 is good for small datasets (< 100k rows)
+-- HNSW is an approximate nearest neighbor (ANN) graph index; unlike ivfflat
+-- it needs no training data, so it can be created before any rows exist
+-- To benchmark ivfflat/HNSW settings on your data and apply the best one
+-- (including hnsw.ef_search / ivfflat.probes), run:
+--   python archive/scripts/index_tuner.py
 CREATE INDEX IF NOT EXISTS cv_chunks_embedding_idx
 ON cv_chunks
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 10);
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- Filtered searches (WHERE version = '...') can use a partial HNSW index per
+-- value, so one variant's search never walks the others' rows. Build one per
+-- distinct version (or source) with:
+--   python archive/scripts/metadata_filters.py index version
+
+-- Full-text index for the keyword leg of hybrid search
+-- (archive/scripts/hybrid_retriever.py, HYBRID_SEARCH=1); queries must use
+-- the same to_tsvector('english', content) expression to hit it
+CREATE INDEX IF NOT EXISTS cv_chunks_content_fts_idx
+ON cv_chunks
+USING gin (to_tsvector('english', content));
 
 -- Optional: Create index on source for faster filtering
 CREATE INDEX IF NOT EXISTS cv_chunks_source_idx
@@ -0,0 +1,192 @@
+"""
+Startup Import-Time Benchmark
+=============================
+
+Measures how long each entry-point module takes to import, using
+`python -X importtime`, and checks it against the budgets in
+scripts/startup_budget.json.
+
+Cold start is dominated by imports: sentence-transformers pulls in torch
+(~5s), so anything that only talks to n8n or the embedding service must
+not import it at module level. The budget file lists, per module:
+
+    budget_ms  - maximum median import time
+    forbidden  - packages the module must not import (e.g. torch)
+
+Each module is imported in a fresh interpreter from its own directory
+(so sibling imports resolve as they do when the script runs), once to
+write bytecode and then --runs times; the median is reported together with
+the packages that contributed most to it.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 10 --top 10
+    python scripts/benchmark_startup.py --module archive/scripts/query.py
+
+Exits with status 1 if any module is over budget or imports a forbidden
+package. tests/test_startup_budget.py enforces the same budgets under
+pytest.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET = Path(__file__).resolve().parent / "startup_budget.json"
+
+
+def import_once(path: Path) -> Dict:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        path: Module file; imported by name from its own directory
+
+    Returns:
+        Dictionary with 'import_ms' (cumulative time of the module itself),
+        'wall_ms' (whole interpreter run) and 'self_us' (self time per
+        imported module)
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {path.stem}"],
+                            cwd=path.parent, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"import {path.stem} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # Children are listed before their parent; keep only the lines since the
+    # previous top-level import, i.e. the module's own import tree
+    self_us = {}
+    import_ms = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        self_us[name.strip()] = int(self_time)
+        if not name.startswith("  "):
+            if name.strip() == path.stem:
+                import_ms = int(cumulative) / 1000
+                break
+            self_us = {}
+
+    return {'import_ms': import_ms, 'wall_ms': wall_ms, 'self_us': self_us}
+
+
+def heaviest_packages(self_us: Dict[str, int], top: int) -> List[Dict]:
+    """
+    Sum self times by top-level package.
+
+    Args:
+        self_us: Mapping of module -> self time in microseconds
+        top: Number of packages to return
+
+    Returns:
+        [{'package', 'ms'}] sorted by time, largest first
+    """
+    totals = defaultdict(int)
+    for name, micros in self_us.items():
+        totals[name.split(".")[0]] += micros
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'package': package, 'ms': round(micros / 1000, 1)} for package, micros in ranked]
+
+
+def measure(path: Path, runs: int, top: int) -> Dict:
+    """
+    Median import time of a module over several fresh interpreters.
+
+    Args:
+        path: Module file
+        runs: Timed imports (after one warm-up that writes bytecode)
+        top: Heaviest packages to report
+
+    Returns:
+        Dictionary with median 'import_ms' and 'wall_ms', the set of
+        'modules' imported and the 'heaviest' packages
+    """
+    import_once(path)
+    samples = [import_once(path) for _ in range(runs)]
+    median = sorted(samples, key=lambda sample: sample['import_ms'])[len(samples) // 2]
+    return {
+        'import_ms': round(statistics.median(sample['import_ms'] for sample in samples), 1),
+        'wall_ms': round(statistics.median(sample['wall_ms'] for sample in samples), 1),
+        'modules': set(median['self_us']),
+        'heaviest': heaviest_packages(median['self_us'], top)
+    }
+
+
+def check(path: str, limits: Dict, result: Dict) -> List[str]:
+    """
+    Compare a measurement with its budget.
+
+    Args:
+        path: Module path as written in the budget file
+        limits: {'budget_ms', 'forbidden'} for the module
+        result: Output of measure()
+
+    Returns:
+        Human-readable budget breaches (empty if within budget)
+    """
+    problems = []
+    if result['import_ms'] > limits['budget_ms']:
+        problems.append(f"{path}: {result['import_ms']:.0f} ms > budget {limits['budget_ms']} ms")
+    for package in limits.get('forbidden', []):
+        if any(name == package or name.startswith(package + ".") for name in result['modules']):
+            problems.append(f"{path}: imports forbidden package '{package}'")
+    return problems
+
+
+def main():
+    """Measure every module in the budget file and report breaches."""
+    parser = argparse.ArgumentParser(description="Check module import times against a budget")
+    parser.add_argument("--budget", default=str(DEFAULT_BUDGET), help="Budget JSON file")
+    parser.add_argument("--runs", type=int, default=5, help="Timed imports per module (default 5)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to list (default 5)")
+    parser.add_argument("--module", action="append",
+                        help="Only measure this module (path as in the budget file; repeatable)")
+    args = parser.parse_args()
+
+    with open(args.budget, encoding="utf-8") as f:
+        budgets = json.load(f)['modules']
+    if args.module:
+        budgets = {path: limits for path, limits in budgets.items() if path in args.module}
+
+    print("=" * 60)
+    print("Startup Import-Time Benchmark")
+    print("=" * 60)
+
+    problems = []
+    for path, limits in budgets.items():
+        try:
+            result = measure(REPO_ROOT / path, args.runs, args.top)
+        except RuntimeError as e:
+            print(f"\n⚠️  {path}: {e}")
+            problems.append(f"{path}: import failed")
+            continue
+
+        breaches = check(path, limits, result)
+        problems.extend(breaches)
+        print(f"\n{'❌' if breaches else '✅'} {path}: {result['import_ms']:.0f} ms "
+              f"(budget {limits['budget_ms']} ms, interpreter total {result['wall_ms']:.0f} ms)")
+        print("   " + ", ".join(f"{item['package']} {item['ms']:.0f} ms" for item in result['heaviest']))
+
+    if problems:
+        print("\n❌ Startup budget exceeded:")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+
+    print("\n✅ All modules within their startup budget")
+
+
+if __name__ == "__main__":
+    main()
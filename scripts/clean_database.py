@@ -2,6 +2,10 @@
 """
 Clean the cv_chunks table in Neon database.
 This will DELETE ALL chunks so we can re-ingest cleanly.
+
+Note: the live query path sees an empty table until the re-ingest finishes.
+For routine re-ingests use the incremental mode of archive/scripts/embedder.py
+instead, which only writes the chunks that changed in a single transaction.
 """
 
 import os
@@ -48,6 +52,7 @@ def clean_database():
 
         print(f"\n✨ Successfully deleted {count_before} chunks!")
         print("👉 Now run Workflow 1 in n8n to re-ingest your resume.")
+        print("   (Tip: archive/scripts/embedder.py re-ingests incrementally without emptying the table.)")
 
         return True
 
@@ -7,6 +7,8 @@ and validating responses.
 
 Usage:
     python scripts/test_workflow.py
+    python scripts/test_workflow.py --load --concurrency 20 --duration 60
+    python scripts/test_workflow.py --load --stub --rate 10     # against scripts/webhook_stub.py
 
 This script will:
 1. Test the embedding service is running
@@ -14,6 +16,22 @@ This script will:
 3. Validate response structure and content
 4. Report success/failure for each component
 
+Load mode (--load) skips the checks above and instead drives the webhook
+with many simultaneous simulated users (asyncio + httpx), cycling through
+TEST_QUERIES, and reports throughput, error/timeout rates, latency
+percentiles and a latency histogram:
+
+- Without --rate, each of --concurrency users sends its next query as soon
+  as the previous one returns (closed loop).
+- With --rate N, requests are started at N per second regardless of how
+  fast the webhook answers (open loop), at most --concurrency in flight.
+  Latency is measured from each request's scheduled start, so time spent
+  queued behind slow requests counts against the pipeline.
+
+--stub starts the bundled webhook_stub.py in-process, so the load
+generator itself can be exercised without n8n. Each stub answer takes
+--stub-latency plus --stub-token-delay per generated token.
+
 Prerequisites:
 - Embedding service running (python scripts/embedding_service.py)
 - n8n workflow active at flow.imurph.com
@@ -23,10 +41,16 @@ Prerequisites:
 
 import os
 import sys
+import math
+import time
+import asyncio
+import argparse
+import threading
 import requests
 import json
+from collections import Counter
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 # Load environment variables
 load_dotenv()
@@ -51,6 +75,11 @@ TEST_QUERIES = [
     "Describe Mike's experience with data visualization"
 ]
 
+REQUIRED_FIELDS = ["answer", "query", "chunks_used", "model", "timestamp"]
+
+# Upper bounds (ms) of the load-mode latency histogram buckets
+LATENCY_BUCKETS_MS = [250, 500, 1000, 2000, 5000, 10000, 20000, 30000]
+
 
 def print_status(message: str, status: str = "info"):
     """Print colored status messages"""
@@ -146,10 +175,8 @@ def test_n8n_webhook(query: str) -> Dict[str, Any]:
 def validate_response(response: Dict[str, Any], query: str) -> bool:
     """Validate the structure and content of the n8n response"""
 
-    required_fields = ["answer", "query", "chunks_used", "model", "timestamp"]
-
     # Check all required fields are present
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in response:
             print_status(f"✗ Missing required field: {field}", "error")
             return False
@@ -214,8 +241,284 @@ def run_workflow_tests():
     return failed == 0
 
 
+async def timed_request(client, url: str, query: str, timeout: float, started: float) -> Tuple[str, float, str]:
+    """
+    Send one webhook request for load mode.
+
+    Args:
+        client: Shared httpx.AsyncClient
+        url: Webhook URL
+        query: Question to send
+        timeout: Seconds before the request counts as timed out
+        started: perf_counter() value latency is measured from
+
+    Returns:
+        (outcome, latency_ms, detail); outcome is "ok", "error", "invalid" or "timeout"
+    """
+    import httpx
+
+    try:
+        response = await client.post(url, json={"query": query}, timeout=timeout)
+    except httpx.TimeoutException:
+        return "timeout", (time.perf_counter() - started) * 1000, "timeout"
+    except httpx.HTTPError as e:
+        return "error", (time.perf_counter() - started) * 1000, type(e).__name__
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    if response.status_code != 200:
+        return "error", latency_ms, f"HTTP {response.status_code}"
+    try:
+        data = response.json()
+    except ValueError:
+        return "invalid", latency_ms, "non-JSON body"
+    missing = [field for field in REQUIRED_FIELDS if field not in data]
+    if missing or not data.get("answer"):
+        return "invalid", latency_ms, f"missing {', '.join(missing) or 'answer'}"
+    return "ok", latency_ms, ""
+
+
+async def generate_load(url: str, concurrency: int, rate: float, duration: float,
+                        timeout: float) -> Tuple[List[Tuple[str, float, str]], float]:
+    """
+    Drive the webhook with simulated users for a fixed duration.
+
+    Args:
+        url: Webhook URL
+        concurrency: Maximum requests in flight
+        rate: Requests started per second (0 = closed loop, see module docstring)
+        duration: Seconds to keep starting requests
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        (one (outcome, latency_ms, detail) per request, wall-clock seconds)
+    """
+    import httpx
+
+    results = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        if rate > 0:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def scheduled(query: str, at: float):
+                async with semaphore:
+                    results.append(await timed_request(client, url, query, timeout, at))
+
+            tasks = []
+            sent = 0
+            while start + sent / rate < deadline:
+                at = start + sent / rate
+                await asyncio.sleep(max(0.0, at - time.perf_counter()))
+                tasks.append(asyncio.create_task(scheduled(TEST_QUERIES[sent % len(TEST_QUERIES)], at)))
+                sent += 1
+            await asyncio.gather(*tasks)
+        else:
+            async def user(offset: int):
+                sent = offset
+                while time.perf_counter() < deadline:
+                    query = TEST_QUERIES[sent % len(TEST_QUERIES)]
+                    results.append(await timed_request(client, url, query, timeout, time.perf_counter()))
+                    sent += concurrency
+
+            await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+    return results, time.perf_counter() - start
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def summarize_load(results: List[Tuple[str, float, str]], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Aggregate load-mode results.
+
+    Args:
+        results: Output of generate_load
+        wall_seconds: Elapsed time including in-flight requests draining
+
+    Returns:
+        Summary with counts, rates, throughput, percentiles and histogram
+    """
+    total = len(results)
+    outcomes = Counter(outcome for outcome, _, _ in results)
+    ok_latencies = [latency for outcome, latency, _ in results if outcome == "ok"]
+
+    histogram = Counter()
+    for latency in ok_latencies:
+        bound = next((bound for bound in LATENCY_BUCKETS_MS if latency <= bound), None)
+        histogram[f"<= {bound_label(bound)}" if bound else f"> {bound_label(LATENCY_BUCKETS_MS[-1])}"] += 1
+
+    summary = {
+        "requests": total,
+        "ok": outcomes["ok"],
+        "errors": outcomes["error"],
+        "invalid": outcomes["invalid"],
+        "timeouts": outcomes["timeout"],
+        "error_rate": round((outcomes["error"] + outcomes["invalid"]) / total, 4) if total else 0.0,
+        "timeout_rate": round(outcomes["timeout"] / total, 4) if total else 0.0,
+        "throughput_rps": round(outcomes["ok"] / wall_seconds, 2) if wall_seconds else 0.0,
+        "wall_seconds": round(wall_seconds, 2),
+        "error_details": dict(Counter(detail for outcome, _, detail in results if outcome != "ok")),
+        "histogram": {label: histogram[label] for label in histogram_labels()}
+    }
+    if ok_latencies:
+        summary["latency_ms"] = {
+            "min": round(min(ok_latencies), 1),
+            "p50": round(percentile(ok_latencies, 50), 1),
+            "p90": round(percentile(ok_latencies, 90), 1),
+            "p95": round(percentile(ok_latencies, 95), 1),
+            "p99": round(percentile(ok_latencies, 99), 1),
+            "max": round(max(ok_latencies), 1)
+        }
+    return summary
+
+
+def bound_label(bound_ms: int) -> str:
+    """'250ms' / '2s' label for a histogram bound."""
+    return f"{bound_ms // 1000}s" if bound_ms >= 1000 else f"{bound_ms}ms"
+
+
+def histogram_labels() -> List[str]:
+    """Histogram bucket labels, fastest first."""
+    return [f"<= {bound_label(bound)}" for bound in LATENCY_BUCKETS_MS] + \
+        [f"> {bound_label(LATENCY_BUCKETS_MS[-1])}"]
+
+
+def print_load_report(summary: Dict[str, Any]):
+    """Print the load-mode summary and latency histogram."""
+    print_status("\n=== Load Test Summary ===", "info")
+    print_status(f"Requests: {summary['requests']} in {summary['wall_seconds']}s "
+                 f"({summary['throughput_rps']} successful req/s)", "info")
+    print_status(f"OK: {summary['ok']}", "success" if summary['ok'] == summary['requests'] else "warning")
+    print_status(f"Errors: {summary['errors'] + summary['invalid']} ({summary['error_rate']:.1%})",
+                 "error" if summary['error_rate'] else "info")
+    print_status(f"Timeouts: {summary['timeouts']} ({summary['timeout_rate']:.1%})",
+                 "error" if summary['timeouts'] else "info")
+    for detail, count in summary['error_details'].items():
+        print_status(f"  {detail}: {count}", "warning")
+
+    latency = summary.get("latency_ms")
+    if not latency:
+        print_status("No successful requests, no latency data", "error")
+        return
+
+    print_status("\nLatency of successful requests (ms):", "info")
+    print_status("  " + "  ".join(f"{key} {value}" for key, value in latency.items()), "info")
+
+    print_status("\nLatency histogram:", "info")
+    peak = max(summary['histogram'].values()) or 1
+    for label, count in summary['histogram'].items():
+        bar = "#" * round(40 * count / peak)
+        print(f"  {label:>8} | {bar:<40} {count}")
+
+
+def start_stub(latency: float, token_delay: float, error_rate: float) -> str:
+    """
+    Serve scripts/webhook_stub.py on a free local port in a daemon thread.
+
+    Args:
+        latency: Stub seconds before the answer starts
+        token_delay: Stub seconds per generated token
+        error_rate: Fraction of requests the stub fails with HTTP 500
+
+    Returns:
+        Stub webhook URL
+    """
+    from http.server import ThreadingHTTPServer
+    from webhook_stub import StubHandler
+
+    StubHandler.latency = latency
+    StubHandler.token_delay = token_delay
+    StubHandler.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    # Room for every simulated user's connection to wait in the accept queue
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/webhook/cv-rag-query"
+
+
+def run_load_test(args) -> bool:
+    """
+    Load mode: many simultaneous users against the webhook.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        True if the error + timeout rate stayed within --max-error-rate
+    """
+    print_status("\n=== Load Testing n8n RAG Workflow ===", "info")
+
+    url = args.url or N8N_WEBHOOK_URL
+    if args.stub:
+        url = start_stub(args.stub_latency, args.stub_token_delay, args.stub_error_rate)
+        print_status(f"Started local webhook stub ({args.stub_latency}s latency + "
+                     f"{args.stub_token_delay}s per generated token)", "info")
+    if not url:
+        print_status("✗ N8N_WEBHOOK_URL not configured in .env (or pass --url / --stub)", "error")
+        return False
+
+    mode = f"{args.rate} req/s (open loop)" if args.rate > 0 else "closed loop"
+    print_status(f"Webhook URL: {url}", "info")
+    print_status(f"Concurrency: {args.concurrency}, {mode}, duration {args.duration}s, "
+                 f"timeout {args.timeout}s", "info")
+
+    results, wall_seconds = asyncio.run(
+        generate_load(url, args.concurrency, args.rate, args.duration, args.timeout)
+    )
+    summary = summarize_load(results, wall_seconds)
+    summary["config"] = {"url": url, "concurrency": args.concurrency, "rate": args.rate,
+                         "duration": args.duration, "timeout": args.timeout, "stub": args.stub}
+    print_load_report(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print_status(f"\nSummary saved to {args.json}", "info")
+
+    failure_rate = summary["error_rate"] + summary["timeout_rate"]
+    return summary["requests"] > 0 and failure_rate <= args.max_error_rate
+
+
+def parse_args():
+    """Command-line options (all optional; no flags runs the functional tests)."""
+    parser = argparse.ArgumentParser(description="Test the CV-RAG n8n workflow")
+    parser.add_argument("--load", action="store_true", help="Run the concurrent load test instead")
+    parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous users / max in flight (default 20)")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Requests started per second; 0 = each user waits for its answer (default)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load (default 30)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds (default 30)")
+    parser.add_argument("--url", help="Webhook URL (default N8N_WEBHOOK_URL)")
+    parser.add_argument("--stub", action="store_true", help="Load test the bundled local webhook stub")
+    parser.add_argument("--stub-latency", type=float, default=0.5,
+                        help="Stub seconds before the answer starts (default 0.5)")
+    parser.add_argument("--stub-token-delay", type=float, default=0.03,
+                        help="Stub seconds per generated token (default 0.03)")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Fraction of stub requests failing")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Exit non-zero above this error + timeout rate (default 0.01)")
+    parser.add_argument("--json", help="Also write the load summary to this JSON file")
+    return parser.parse_args()
+
+
 def main():
     """Main test runner"""
+    args = parse_args()
+
+    if args.load:
+        print_status("=" * 60, "info")
+        print_status("CV-RAG Workflow Load Test", "info")
+        print_status("=" * 60, "info")
+        sys.exit(0 if run_load_test(args) else 1)
+
     print_status("=" * 60, "info")
     print_status("CV-RAG Workflow Test Suite", "info")
     print_status("=" * 60, "info")
@@ -0,0 +1,177 @@
+"""
+Local n8n Webhook Stub
+======================
+
+Mimics the CV-RAG n8n query webhooks so the Streamlit app and test scripts
+can run without n8n, Ollama or a database.
+
+Usage:
+    python scripts/webhook_stub.py [--port 5678] [--latency 0.5] [--token-delay 0.03] [--error-rate 0.0]
+
+Then point the app at it:
+    N8N_WEBHOOK_URL=http://localhost:5678/webhook/cv-rag-query
+    N8N_STREAM_WEBHOOK_URL=http://localhost:5678/webhook/cv-rag-query-stream
+
+Endpoints (any POST path works):
+    .../cv-rag-query         JSON response, same shape as "Respond to Webhook":
+                             {"answer", "query", "chunks_used", "model", "timestamp", "sources"},
+                             plus per-stage "timings" ({"embed_ms", "retrieve_ms", "rerank_ms",
+                             "prompt_build_ms", "generate_ms"}) to exercise the app's
+                             stage breakdown (see streamlit/tracing.py); the n8n
+                             workflows return no timings
+    .../cv-rag-query-stream  Streaming response in n8n's format: one JSON
+                             object per line, {"type": "begin"}, then
+                             {"type": "item", "content": "<token>"} per token,
+                             then {"type": "end"}
+
+The request body may use either "chatInput" (Streamlit) or "query"
+(test scripts). With --error-rate, that fraction of JSON requests fails
+with HTTP 500 (for exercising error handling, e.g. test_workflow.py --load).
+--latency is spent in the embed/retrieve/rerank/prompt_build stages (split
+by STAGE_SHARES), and generation takes --token-delay per token.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+MODEL = "llama3.2:latest"
+
+# How the time before the first token is split across the pipeline stages
+STAGE_SHARES = {"embed": 0.15, "retrieve": 0.25, "rerank": 0.1, "prompt_build": 0.5}
+
+
+def make_answer(question: str) -> str:
+    """Build a canned answer that echoes the question."""
+    return (f"This is a stubbed answer to \"{question}\". Mike Murphy is an AI educator "
+            f"who builds RAG systems with n8n, PostgreSQL + pgvector, Ollama and Streamlit, "
+            f"and has published tutorials and courses on AI automation.")
+
+
+def tokenize(text: str) -> list:
+    """Split text into word-sized tokens (keeping the spaces) like a chat model."""
+    words = text.split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def run_stage(timings: dict, stage: str, seconds: float):
+    """Sleep through one simulated stage and record how long it took."""
+    start = time.perf_counter()
+    time.sleep(seconds)
+    timings[f"{stage}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler emulating the n8n webhook nodes."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.5
+    token_delay = 0.03
+    error_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            body = {}
+        question = body.get("chatInput") or body.get("query") or ""
+
+        if "stream" in self.path:
+            self.respond_stream(question)
+        else:
+            self.respond_json(question)
+
+    def run_pipeline(self) -> dict:
+        """Simulate the stages before the first token; returns their timings."""
+        timings = {}
+        for stage, share in STAGE_SHARES.items():
+            run_stage(timings, stage, self.latency * share)
+        return timings
+
+    def respond_json(self, question: str):
+        """Wait for the full 'generation', then answer in one JSON object."""
+        timings = self.run_pipeline()
+        run_stage(timings, "generate", self.token_delay * len(tokenize(make_answer(question))))
+        if random.random() < self.error_rate:
+            payload = json.dumps({"message": "Error in workflow"}).encode("utf-8")
+            self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        payload = json.dumps({
+            "answer": make_answer(question),
+            "query": question,
+            "chunks_used": 3,
+            "model": MODEL,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "sources": ["resume_0", "supplemental_2", "supplemental_5"],
+            "timings": timings
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def respond_stream(self, question: str):
+        """Emit tokens as they are 'generated', using chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        self.run_pipeline()
+        self.write_chunk({"type": "begin", "metadata": {"nodeName": "AI Agent"}})
+        for token in tokenize(make_answer(question)):
+            time.sleep(self.token_delay)
+            self.write_chunk({"type": "item", "content": token, "metadata": {"nodeName": "AI Agent"}})
+        self.write_chunk({"type": "end", "metadata": {"nodeName": "AI Agent"}})
+
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def write_chunk(self, event: dict):
+        """Write one newline-terminated JSON event as an HTTP chunk."""
+        data = (json.dumps(event) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    """Start the stub server."""
+    parser = argparse.ArgumentParser(description="Local stub of the CV-RAG n8n webhooks")
+    parser.add_argument("--port", type=int, default=5678)
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="Seconds before the first token (retrieval + prompt processing)")
+    parser.add_argument("--token-delay", type=float, default=0.03,
+                        help="Seconds between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of JSON requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.token_delay = args.token_delay
+    StubHandler.error_rate = args.error_rate
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"n8n webhook stub listening on http://127.0.0.1:{args.port}/webhook/cv-rag-query")
+    print(f"Streaming endpoint: http://127.0.0.1:{args.port}/webhook/cv-rag-query-stream")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+CV-RAG Semantic Answer Cache
+============================
+Serves repeated (or near-identical) questions without re-running the RAG
+pipeline.
+
+Each answered question is stored with its query embedding. A new question
+whose embedding is within a cosine-similarity threshold of a cached one gets
+the stored answer and sources back instantly. Entries expire after a TTL,
+the least recently used entry is evicted when the cache is full, and the
+whole cache is dropped when the ingested corpus changes.
+
+Query embeddings come from Ollama (the same nomic-embed-text model the n8n
+pipeline uses), so the Streamlit container does not need torch.
+
+Configuration (environment variables read by app.py):
+    ANSWER_CACHE            - set to 0 to disable (default on)
+    ANSWER_CACHE_THRESHOLD  - minimum cosine similarity for a hit (default 0.92)
+    ANSWER_CACHE_TTL        - entry lifetime in seconds (default 3600)
+    ANSWER_CACHE_SIZE       - maximum number of entries (default 256)
+    CORPUS_VERSION          - explicit corpus version (default: hash of the
+                              chunks in cv_chunks, via NEON_CONNECTION_STRING)
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import hashlib
+import importlib.util
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    # numpy is imported on first use so it does not slow down app startup
+    import numpy as np
+
+# psycopg2 is only needed to read the corpus version from the database
+PSYCOPG2_AVAILABLE = importlib.util.find_spec("psycopg2") is not None
+
+
+def ingested_corpus_version(connection_string: str) -> Optional[str]:
+    """
+    Version of the corpus currently in cv_chunks.
+
+    Hashes the stored chunk texts, so the ingest job and the app derive the
+    same version from the database whichever pipeline (n8n or embedder.py)
+    wrote the rows, and any insert, update or delete changes it.
+
+    Args:
+        connection_string: Postgres connection string (NEON_CONNECTION_STRING)
+
+    Returns:
+        Short hex digest, or None if no connection string is set, psycopg2
+        is not installed or the table cannot be read
+    """
+    if not connection_string or not PSYCOPG2_AVAILABLE:
+        return None
+
+    import psycopg2
+
+    conn = None
+    try:
+        conn = psycopg2.connect(connection_string, connect_timeout=5)
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT count(*), coalesce(md5(string_agg(md5(content), '' ORDER BY md5(content))), '')
+                FROM cv_chunks
+            """)
+            count, digest = cursor.fetchone()
+    except psycopg2.Error:
+        return None
+    finally:
+        if conn is not None:
+            conn.close()
+    return hashlib.sha256(f"{count}:{digest}".encode("utf-8")).hexdigest()[:16]
+
+
+def embed_normalized(embed_fn: Callable[[str], List[float]], text: str) -> Optional["np.ndarray"]:
+    """
+    Embed and L2-normalize text.
+
+    Args:
+        embed_fn: Function mapping text to an embedding
+        text: Text to embed
+
+    Returns:
+        Unit vector, or None if the embedding service is unavailable
+    """
+    import numpy as np
+
+    try:
+        vector = np.asarray(embed_fn(text), dtype=np.float32)
+    except Exception:
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+class OllamaEmbedder:
+    """
+    Query embeddings from Ollama's /api/embed endpoint.
+
+    Args:
+        base_url: Ollama API URL, e.g. http://localhost:11434
+        model: Embedding model name
+        timeout: Seconds to wait for an embedding
+    """
+
+    def __init__(self, base_url: str, model: str = "nomic-embed-text:latest", timeout: float = 10):
+        self.url = base_url.rstrip("/") + "/api/embed"
+        self.model = model
+        self.client = httpx.Client(timeout=timeout)
+
+    def __call__(self, text: str) -> List[float]:
+        response = self.client.post(self.url, json={'model': self.model, 'input': text})
+        response.raise_for_status()
+        return response.json()['embeddings'][0]
+
+
+class SemanticAnswerCache:
+    """
+    Embedding-keyed answer cache with TTL, LRU eviction and corpus versioning.
+
+    Args:
+        embed_fn: Function mapping question text to an embedding
+        threshold: Minimum cosine similarity to count as the same question
+        ttl_seconds: Entry lifetime
+        max_entries: LRU capacity
+        corpus_version: Version of the ingested corpus the answers came from
+    """
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], threshold: float = 0.92,
+                 ttl_seconds: float = 3600, max_entries: int = 256, corpus_version: str = None):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.corpus_version = corpus_version
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set_corpus_version(self, version: str):
+        """
+        Record the current corpus version, clearing the cache if it changed.
+
+        Args:
+            version: Corpus version (e.g. from ingested_corpus_version)
+        """
+        with self._lock:
+            if version != self.corpus_version:
+                self._entries.clear()
+                self.corpus_version = version
+
+    def embed(self, question: str) -> Optional["np.ndarray"]:
+        """
+        Embed and L2-normalize a question.
+
+        Args:
+            question: User's question
+
+        Returns:
+            Unit vector, or None if the embedding service is unavailable
+        """
+        return embed_normalized(self.embed_fn, question)
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items()
+                   if now - entry['created_at'] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, question: str, embedding: "np.ndarray" = None) -> Optional[Dict]:
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Args:
+            question: User's question
+            embedding: Precomputed normalized embedding (computed if omitted)
+
+        Returns:
+            Dictionary with 'result', 'question' (the cached one) and
+            'similarity' on a hit, otherwise None
+        """
+        import numpy as np
+
+        if embedding is None:
+            embedding = self.embed(question)
+
+        with self._lock:
+            self._purge_expired(time.time())
+
+            if embedding is None or not self._entries:
+                self.misses += 1
+                return None
+
+            keys = list(self._entries)
+            matrix = np.stack([self._entries[key]['embedding'] for key in keys])
+            scores = matrix @ embedding
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = keys[best]
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved += entry['latency']
+
+            return {
+                'result': entry['result'],
+                'question': entry['question'],
+                'similarity': float(scores[best])
+            }
+
+    def store(self, question: str, result: Dict, latency: float, embedding: "np.ndarray" = None):
+        """
+        Cache a successful answer.
+
+        Args:
+            question: User's question
+            result: Response dictionary ('answer' and optional 'sources')
+            latency: Seconds the pipeline took to answer
+            embedding: Precomputed normalized embedding (computed if omitted)
+        """
+        if result.get('error'):
+            return
+        if embedding is None:
+            embedding = self.embed(question)
+        if embedding is None:
+            return
+
+        with self._lock:
+            self._entries[self._next_id] = {
+                'question': question,
+                'embedding': embedding,
+                'result': result,
+                'latency': latency,
+                'created_at': time.time()
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """
+        Hit rate and latency saved, for the debug panel.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'latency_saved_s': round(self.latency_saved, 1),
+                'threshold': self.threshold,
+                'ttl_seconds': self.ttl_seconds,
+                'corpus_version': self.corpus_version
+            }
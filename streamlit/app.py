@@ -8,14 +8,23 @@ Project: CV-RAG
 """
 
 import os
+import time
 import streamlit as st
-import requests
 from dotenv import load_dotenv
 from pathlib import Path
 
+from answer_cache import OllamaEmbedder, SemanticAnswerCache, embed_normalized, ingested_corpus_version
+from assets import build_manifest, read_asset
+from chat_session import ChatSession, retrieve_chunks
+from tracing import StageTimer
+from warm_answers import WARM_ANSWERS_FILE, load_sample_questions, load_warm_answers, normalize_question
+from webhook_client import WebhookClient
+
 # Load environment variables
 load_dotenv()
 
+DOCS_DIR = Path(__file__).parent.parent / "docs"
+
 # Page configuration
 st.set_page_config(
     page_title="Mike Murphy - AI Resume Chat",
@@ -43,40 +52,485 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def query_resume(question: str, webhook_url: str) -> dict:
+@st.cache_resource
+def get_webhook_client(webhook_url: str, stream_url: str = None) -> WebhookClient:
+    """
+    Create one pooled webhook client per URL, shared across reruns and sessions.
+
+    Args:
+        webhook_url: n8n webhook endpoint
+        stream_url: Optional streaming webhook endpoint
+
+    Returns:
+        WebhookClient with keep-alive (and HTTP/2 when available)
+    """
+    return WebhookClient(webhook_url, timeout=60, stream_url=stream_url)
+
+
+@st.cache_resource
+def get_question_embedder():
+    """
+    Create the Ollama embedder for questions (answer cache and chat topics).
+
+    Returns:
+        OllamaEmbedder, or None if no Ollama URL is configured
+    """
+    ollama_url = os.getenv("OLLAMA_API_URL")
+    if not ollama_url:
+        return None
+    return OllamaEmbedder(ollama_url, os.getenv("EMBEDDING_MODEL", "nomic-embed-text:latest"))
+
+
+def embed_question(question: str):
+    """
+    Normalized question embedding, independent of the answer cache.
+
+    Args:
+        question: User's question
+
+    Returns:
+        Unit vector, or None if embeddings are unavailable
+    """
+    embedder = get_question_embedder()
+    return embed_normalized(embedder, question) if embedder is not None else None
+
+
+@st.cache_resource
+def get_answer_cache():
+    """
+    Create the semantic answer cache shared by all sessions.
+
+    Returns:
+        SemanticAnswerCache, or None if disabled or no Ollama URL is configured
+    """
+    embedder = get_question_embedder()
+    if os.getenv("ANSWER_CACHE", "1") == "0" or embedder is None:
+        return None
+
+    return SemanticAnswerCache(
+        embedder,
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+    )
+
+
+@st.cache_data(ttl=60)
+def current_corpus_version() -> str:
     """
-    Send query to n8n webhook and get AI-generated response.
+    Identify the ingested corpus, re-checked at most once a minute.
+
+    Returns:
+        CORPUS_VERSION if set, otherwise a hash of the chunks in cv_chunks
+        (None if NEON_CONNECTION_STRING is not set or the table is unreachable)
+    """
+    return os.getenv("CORPUS_VERSION") or ingested_corpus_version(os.getenv("NEON_CONNECTION_STRING"))
+
+
+@st.cache_data(ttl=60)
+def get_asset_manifest() -> dict:
+    """
+    List the download assets, re-scanned at most once a minute.
+
+    Returns:
+        Manifest from assets.build_manifest (paths, labels, mtimes)
+    """
+    return build_manifest(DOCS_DIR)
+
+
+@st.cache_data(max_entries=32)
+def get_asset_bytes(path: str, mtime: float) -> bytes:
+    """
+    Load a download asset into memory once per file version.
+
+    Args:
+        path: Asset path from the manifest
+        mtime: Modification time from the manifest, so an edited file is re-read
+
+    Returns:
+        File contents
+    """
+    return read_asset(path)
+
+
+def render_download(asset: dict):
+    """
+    Download button for a manifest entry, served from memory.
+
+    Args:
+        asset: Manifest entry (see assets.describe)
+    """
+    st.download_button(
+        label=asset['label'],
+        data=get_asset_bytes(asset['path'], asset['mtime']),
+        file_name=asset['file_name'],
+        mime=asset['mime'],
+        key=f"download_{asset['key']}",
+        use_container_width=True
+    )
+
+
+@st.cache_data
+def get_sample_questions() -> list:
+    """Load the sidebar sample questions once."""
+    return load_sample_questions()
+
+
+@st.cache_data
+def get_warm_answers(corpus_version: str, artifact_mtime: float) -> dict:
+    """
+    Load precomputed sample answers once per artifact/corpus version.
+
+    Args:
+        corpus_version: Current corpus version (stale artifacts are ignored;
+            None trusts the version the ingest job recorded)
+        artifact_mtime: Artifact modification time, so a re-run job is picked up
+
+    Returns:
+        Mapping of normalized question -> result dictionary
+    """
+    return load_warm_answers(WARM_ANSWERS_FILE, corpus_version)
+
+
+def find_warm_answer(question: str):
+    """
+    Look up a precomputed answer for a question.
+
+    Args:
+        question: User's question
+
+    Returns:
+        Result dictionary, or None if the question was not precomputed
+    """
+    mtime = WARM_ANSWERS_FILE.stat().st_mtime if WARM_ANSWERS_FILE.exists() else 0.0
+    return get_warm_answers(current_corpus_version(), mtime).get(normalize_question(question))
+
+
+def render_result(result: dict):
+    """
+    Display a webhook result (answer and optional sources).
+
+    Args:
+        result: Response dictionary with 'answer' and optional 'sources'
+    """
+    if result.get('error'):
+        st.error(result['answer'])
+        return
+
+    st.success("✅ Here's what I found:")
+    st.markdown(f"**Answer:**\n\n{result.get('answer', 'No answer generated')}")
+
+    # Show sources if available
+    if 'sources' in result:
+        with st.expander("📚 View Sources"):
+            st.write(result['sources'])
+
+
+def render_timings(timings: dict, source: str):
+    """
+    Show the timings recorded for the last question (debug panel).
+
+    These are the app's own stages and the end-to-end webhook round trip;
+    pipeline stages (embed, retrieve, generate) only appear when the
+    pipeline reports them, which the n8n workflows do not.
+
+    Args:
+        timings: Mapping of '<stage>_ms' -> milliseconds from StageTimer
+        source: Where the answer came from ("precomputed", "cache" or "pipeline")
+    """
+    with st.expander("⏱️ Debug: Stage Timings", expanded=True):
+        st.caption(f"Answer source: {source}")
+        st.table([{'stage': key[:-3], 'ms': value} for key, value in timings.items()])
+
+
+def render_streamed_answer(question: str, client: WebhookClient, timer: StageTimer = None):
+    """
+    Render the answer token by token as the streaming webhook produces it.
+
+    Args:
+        question: User's question
+        client: WebhookClient with a stream_url
+        timer: Optional StageTimer to record stage timings into
+
+    Returns:
+        Response dictionary with the full 'answer' (or 'error': True)
+    """
+    st.markdown("**Answer:**")
+    try:
+        return {'answer': st.write_stream(client.stream(question, timer))}
+    except Exception as e:
+        result = client.error_result(e)
+        st.error(result['answer'])
+        return result
+
+
+def wait_for_answer(future, placeholder) -> dict:
+    """
+    Poll an in-flight request, updating a status line while it runs.
+
+    Args:
+        future: Future returned by WebhookClient.submit
+        placeholder: st.empty() slot for the progress message
+
+    Returns:
+        Response dictionary with 'answer' and optional 'sources'
+    """
+    start = time.perf_counter()
+    while not future.done():
+        elapsed = time.perf_counter() - start
+        placeholder.info(f"🤔 AI is searching through Mike's resume and generating an answer... ({elapsed:.0f}s)")
+        time.sleep(0.25)
+    placeholder.empty()
+    return future.result()
+
+
+def answer_question(question: str, webhook_url: str, stream_url: str = None):
+    """
+    Answer a question from the fastest available source and render it.
+
+    Order: precomputed sample answers, the semantic cache, then the live
+    pipeline (streamed when a streaming webhook is configured). Each step
+    is timed; with ?debug=1 the stage timings are shown below the answer.
 
     Args:
         question: User's question
         webhook_url: n8n webhook endpoint
+        stream_url: Optional streaming webhook endpoint
 
     Returns:
         Response dictionary with 'answer' and optional 'sources'
     """
-    try:
-        response = requests.post(
-            webhook_url,
-            json={'chatInput': question},
-            timeout=60
+    with StageTimer("answer_question", streaming=bool(stream_url)) as timer:
+        source, result = serve_answer(question, webhook_url, stream_url, timer)
+
+    if st.query_params.get("debug") == "1":
+        render_timings(timer.timings, source)
+    return result
+
+
+def serve_answer(question: str, webhook_url: str, stream_url: str, timer: StageTimer,
+                 prompt: str = None, embedding=None):
+    """
+    Find and render the answer (for answer_question and answer_chat_turn).
+
+    Args:
+        question: User's question
+        webhook_url: n8n webhook endpoint
+        stream_url: Optional streaming webhook endpoint
+        timer: StageTimer for this question
+        prompt: Text to send instead of the question (a chat follow-up with
+            its conversation window); skips precomputed and cached answers,
+            which only hold for the question on its own
+        embedding: Question embedding already computed by the caller
+
+    Returns:
+        (answer source: "precomputed", "cache" or "pipeline", result dictionary)
+    """
+    if prompt is None:
+        # Precomputed sample answers skip the pipeline entirely
+        warm = find_warm_answer(question)
+        if warm is not None:
+            render_result(warm)
+            st.caption("⚡ Precomputed answer")
+            return "precomputed", warm
+
+    client = get_webhook_client(webhook_url, stream_url)
+
+    # Check the semantic cache before running the pipeline
+    cache = get_answer_cache() if prompt is None else None
+    if cache is not None:
+        corpus_version = current_corpus_version()
+        if corpus_version is not None:
+            # An unknown version (database briefly unreachable) keeps the cache
+            cache.set_corpus_version(corpus_version)
+        if embedding is None:
+            with timer.stage("cache_embed"):
+                embedding = cache.embed(question)
+        with timer.stage("cache_lookup"):
+            cached = cache.lookup(question, embedding)
+        if cached:
+            render_result(cached['result'])
+            st.caption(f"⚡ Instant answer from cache (matched \"{cached['question']}\", "
+                       f"similarity {cached['similarity']:.2f})")
+            return "cache", cached['result']
+
+    start = time.perf_counter()
+    if client.stream_url:
+        # Tokens render as soon as the model produces them
+        result = render_streamed_answer(prompt or question, client, timer)
+    else:
+        # Fire the request on the client's async loop and keep rendering
+        future = client.submit(prompt or question, timer)
+        result = wait_for_answer(future, st.empty())
+        render_result(result)
+
+    if cache is not None:
+        cache.store(question, result, time.perf_counter() - start, embedding)
+    return "pipeline", result
+
+
+def get_chat_session() -> ChatSession:
+    """
+    This browser session's conversation, created on first use.
+
+    Returns:
+        ChatSession stored in st.session_state
+    """
+    if 'chat' not in st.session_state:
+        st.session_state.chat = ChatSession(
+            history_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "1024")),
+            summary_tokens=int(os.getenv("CHAT_SUMMARY_TOKENS", "256")),
+            context_tokens=int(os.getenv("CHAT_CONTEXT_TOKENS", "768")),
+            topic_threshold=float(os.getenv("CHAT_TOPIC_THRESHOLD", "0.75")),
+            retrieve_fn=retrieve_topic_chunks
+        )
+    return st.session_state.chat
+
+
+def retrieve_topic_chunks(embedding) -> list:
+    """
+    Look up a chat topic's chunks the way the pipeline's tool retrieves them.
+
+    Args:
+        embedding: Normalized embedding of the question that opened the topic
+
+    Returns:
+        Chunk texts from cv_chunks (empty without NEON_CONNECTION_STRING)
+    """
+    return retrieve_chunks(os.getenv("NEON_CONNECTION_STRING"), embedding,
+                           int(os.getenv("TOP_K_RESULTS", "5")))
+
+
+def answer_chat_turn(question: str, webhook_url: str, stream_url: str = None):
+    """
+    Answer the next question of a conversation and record the turn.
+
+    Follow-ups are sent with the compacted conversation window (see
+    chat_session.py) and reuse the last retrieved chunks when they stay
+    on topic. The first question is answered like a single question, so
+    precomputed and cached answers still apply.
+
+    Args:
+        question: User's question
+        webhook_url: n8n webhook endpoint
+        stream_url: Optional streaming webhook endpoint
+    """
+    session = get_chat_session()
+
+    with StageTimer("answer_question", streaming=bool(stream_url), chat_turn=len(session.turns)) as timer:
+        with timer.stage("question_embed"):
+            embedding = embed_question(question)
+
+        with timer.stage("chat_window"):
+            prompt, reused = session.build_prompt(question, embedding)
+
+        source, result = serve_answer(question, webhook_url, stream_url, timer,
+                                      prompt=prompt if prompt != question else None, embedding=embedding)
+
+    if reused:
+        st.caption("♻️ Reused the context retrieved for this topic")
+    session.add_turn(question, result, embedding, reused)
+
+    if st.query_params.get("debug") == "1":
+        render_timings(timer.timings, source)
+
+
+def render_chat(webhook_url: str, stream_url: str = None):
+    """
+    Chat mode: the conversation so far, then the answer to a new message.
+
+    Args:
+        webhook_url: n8n webhook endpoint
+        stream_url: Optional streaming webhook endpoint
+    """
+    session = get_chat_session()
+
+    for turn in session.turns:
+        with st.chat_message("user"):
+            st.markdown(turn['question'])
+        with st.chat_message("assistant"):
+            if turn['error']:
+                st.error(turn['answer'])
+            else:
+                st.markdown(turn['answer'])
+                if turn['sources']:
+                    with st.expander("📚 View Sources"):
+                        st.write(turn['sources'])
+
+    # A clicked sample question is sent like a typed message
+    question = st.chat_input("Ask a question about Mike's experience...")
+    question = question or st.session_state.pop('chat_question', None)
+    if question:
+        with st.chat_message("user"):
+            st.markdown(question)
+        with st.chat_message("assistant"):
+            answer_chat_turn(question, webhook_url, stream_url)
+
+    if st.query_params.get("debug") == "1":
+        with st.expander("🛠️ Debug: Chat Window"):
+            st.json(session.stats())
+
+
+def render_question_form(webhook_url: str, stream_url: str = None):
+    """
+    Single-question mode: a form whose answer replaces the previous one.
+
+    Args:
+        webhook_url: n8n webhook endpoint
+        stream_url: Optional streaming webhook endpoint
+    """
+    # Use a form to enable Enter key submission
+    with st.form(key="question_form", clear_on_submit=False):
+        user_question = st.text_input(
+            "Ask a question about Mike's experience:",
+            value=st.session_state.selected_question,
+            placeholder="e.g., What's Mike's experience with AI?",
+            key="user_input"
         )
-        if response.status_code == 200:
-            return response.json()
+
+        # Search button
+        submit_button = st.form_submit_button("🔍 Ask", type="primary", use_container_width=True)
+
+    if submit_button:
+        if user_question:
+            # Clear the session state after capturing the question
+            st.session_state.selected_question = ""
+
+            st.session_state.warm_question = None
+            answer_question(user_question, webhook_url, stream_url)
         else:
-            return {
-                'answer': f"Error: Received status code {response.status_code}",
-                'error': True
-            }
-    except requests.exceptions.Timeout:
-        return {
-            'answer': "Request timed out. Please try again.",
-            'error': True
-        }
-    except Exception as e:
-        return {
-            'answer': f"Error: {str(e)}",
-            'error': True
-        }
+            st.warning("Please enter a question or click a sample question.")
+    elif st.session_state.get('warm_question'):
+        warm = find_warm_answer(st.session_state.warm_question)
+        if warm is not None:
+            render_result(warm)
+            st.caption("⚡ Precomputed answer")
+
+
+def render_downloads():
+    """Download buttons for the resume materials (see get_asset_manifest)."""
+    st.divider()
+    st.subheader("📥 Download Resume Materials")
+
+    # Files are listed and read once (cached), not on every rerun
+    assets = get_asset_manifest()
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if 'resume' in assets['primary']:
+            render_download(assets['primary']['resume'])
+        else:
+            st.info("📄 PDF resume coming soon")
+
+    with col2:
+        if 'cover_letter' in assets['primary']:
+            render_download(assets['primary']['cover_letter'])
+
+    if assets['versions']:
+        with st.expander("🗂️ More versions"):
+            for asset in assets['versions']:
+                render_download(asset)
 
 
 def main():
@@ -89,8 +543,9 @@ def main():
     st.markdown("**Chat with Mike Murphy's Experience Using RAG + LLM**")
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Get webhook URL from environment
+    # Get webhook URLs from environment (streaming endpoint is optional)
     webhook_url = os.getenv("N8N_WEBHOOK_URL")
+    stream_url = os.getenv("N8N_STREAM_WEBHOOK_URL")
 
     if not webhook_url:
         st.error("� Configuration Error: N8N_WEBHOOK_URL not set in .env file")
@@ -117,90 +572,46 @@ def main():
 
         st.divider()
 
+        chat_mode = st.toggle("💬 Chat mode (follow-up questions)", value=os.getenv("CHAT_MODE", "0") == "1",
+                              key="chat_mode")
+        if chat_mode and st.button("🧹 New conversation", key="new_conversation", use_container_width=True):
+            get_chat_session().clear()
+
+        st.divider()
+
         st.header("💡 Sample Questions")
         st.markdown("Click a question below to try it:")
 
-        sample_questions = [
-            "What AI tutorials has Mike created?",
-            "What makes Mike great for tech support roles?",
-            "Tell me about Mike's RAG system experience",
-            "What's Mike's experience with n8n?",
-            "What courses has Mike published?",
-            "Why should I hire Mike as an AI educator?"
-        ]
+        sample_questions = get_sample_questions()
 
         for i, question in enumerate(sample_questions):
             if st.button(f"💬 {question}", key=f"sample_{i}", use_container_width=True):
+                if chat_mode:
+                    st.session_state.chat_question = question
+                    continue
                 st.session_state.selected_question = question
+                # Precomputed answers render right away, no webhook call
+                st.session_state.warm_question = question
 
     # Main chat interface
     st.divider()
 
-    # Use a form to enable Enter key submission
-    with st.form(key="question_form", clear_on_submit=False):
-        user_question = st.text_input(
-            "Ask a question about Mike's experience:",
-            value=st.session_state.selected_question,
-            placeholder="e.g., What's Mike's experience with AI?",
-            key="user_input"
-        )
-
-        # Search button
-        submit_button = st.form_submit_button("🔍 Ask", type="primary", use_container_width=True)
-
-    if submit_button:
-        if user_question:
-            # Clear the session state after capturing the question
-            st.session_state.selected_question = ""
-
-            with st.spinner("🤔 AI is searching through Mike's resume and generating an answer... This may take 20-30 seconds."):
-                result = query_resume(user_question, webhook_url)
-
-                if result.get('error'):
-                    st.error(result['answer'])
-                else:
-                    st.success(" Here's what I found:")
-                    st.markdown(f"**Answer:**\n\n{result.get('answer', 'No answer generated')}")
-
-                    # Show sources if available
-                    if 'sources' in result:
-                        with st.expander("📚 View Sources"):
-                            st.write(result['sources'])
-        else:
-            st.warning("Please enter a question or click a sample question.")
-
-    # Download section
-    st.divider()
-    st.subheader("📥 Download Resume Materials")
+    if chat_mode:
+        render_chat(webhook_url, stream_url)
+    else:
+        render_question_form(webhook_url, stream_url)
 
-    col1, col2 = st.columns(2)
+    render_downloads()
 
-    with col1:
-        # Check if PDF exists
-        resume_pdf_path = Path(__file__).parent.parent / "docs" / "Mike_Murphy_Resume.pdf"
-        if resume_pdf_path.exists():
-            with open(resume_pdf_path, "rb") as pdf_file:
-                st.download_button(
-                    label="📄 Download Resume (PDF)",
-                    data=pdf_file,
-                    file_name="Mike_Murphy_Resume.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-        else:
-            st.info("📄 PDF resume coming soon")
+    # Debug panel (append ?debug=1 to the URL)
+    if st.query_params.get("debug") == "1":
+        with st.expander("🛠️ Debug: Webhook Connection Stats"):
+            st.json(get_webhook_client(webhook_url, stream_url).stats())
 
-    with col2:
-        cover_letter_path = Path(__file__).parent.parent / "docs" / "cover-letter_template.md"
-        if cover_letter_path.exists():
-            with open(cover_letter_path, "r") as cover_file:
-                st.download_button(
-                    label="📝 Download Cover Letter",
-                    data=cover_file.read(),
-                    file_name="Mike_Murphy_Cover_Letter.md",
-                    mime="text/markdown",
-                    use_container_width=True
-                )
+        cache = get_answer_cache()
+        if cache is not None:
+            with st.expander("🛠️ Debug: Answer Cache Stats"):
+                st.json(cache.stats())
 
     # Footer
     st.divider()
@@ -0,0 +1,130 @@
+"""
+CV-RAG Download Assets
+======================
+Manifest of the resume materials offered for download.
+
+Streamlit reruns app.py on every widget click, so the download section
+must not stat and re-read files each time. build_manifest() lists the
+assets once (path, label, MIME type, size and mtime). app.py caches the
+manifest briefly, and each file's bytes keyed by its mtime, so reruns
+serve downloads from memory and an edited file is picked up on the next
+manifest refresh.
+
+Assets:
+    docs/Mike_Murphy_Resume.pdf       - resume (PDF)
+    docs/cover-letter_template.md     - cover letter
+    docs/versions/<kind>_<variant>_mike-murphy[_<focus>].<ext>
+                                      - tailored versions (kind: resume or
+                                        cover-letter), listed under
+                                        "More versions"
+
+A new variant only has to be dropped into docs/versions/ with that naming
+scheme and a .pdf, .md, .docx or .txt extension.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".md": "text/markdown",
+    ".txt": "text/plain",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+# key -> file under docs/, button label and download name
+PRIMARY_ASSETS = {
+    "resume": ("Mike_Murphy_Resume.pdf", "📄 Download Resume (PDF)", "Mike_Murphy_Resume.pdf"),
+    "cover_letter": ("cover-letter_template.md", "📝 Download Cover Letter", "Mike_Murphy_Cover_Letter.md"),
+}
+
+# File name prefix in docs/versions/ -> (icon, label)
+VERSION_KINDS = {
+    "resume": ("📄", "Resume"),
+    "cover-letter": ("📝", "Cover Letter"),
+}
+
+
+def describe(path: Path, key: str, label: str, file_name: str) -> Dict:
+    """
+    Manifest entry for one file.
+
+    Args:
+        path: File on disk
+        key: Unique key (also used for the Streamlit widget key)
+        label: Download button label
+        file_name: Name the browser saves the file as
+
+    Returns:
+        Dictionary with 'key', 'path', 'label', 'file_name', 'mime',
+        'size' and 'mtime'
+    """
+    stat = path.stat()
+    return {
+        'key': key,
+        'path': str(path),
+        'label': label,
+        'file_name': file_name,
+        'mime': MIME_TYPES.get(path.suffix.lower(), "application/octet-stream"),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime
+    }
+
+
+def describe_version(path: Path) -> Optional[Dict]:
+    """
+    Manifest entry for a tailored version in docs/versions/.
+
+    Args:
+        path: e.g. docs/versions/resume_openai_mike-murphy_ops.pdf
+
+    Returns:
+        Entry labelled e.g. "📄 Resume – openai ops (PDF)", or None for
+        files that are not a known kind or format
+    """
+    kind, _, rest = path.stem.partition("_")
+    if kind not in VERSION_KINDS or path.suffix.lower() not in MIME_TYPES:
+        return None
+
+    icon, kind_label = VERSION_KINDS[kind]
+    variant = " ".join(part for part in rest.split("_") if part and part != "mike-murphy")
+    label = f"{icon} {kind_label} – {variant} ({path.suffix[1:].upper()})" if variant \
+        else f"{icon} {kind_label} ({path.suffix[1:].upper()})"
+    return describe(path, f"version_{path.name}", label, path.name)
+
+
+def build_manifest(docs_dir: Path) -> Dict:
+    """
+    List the downloadable assets that exist under docs/.
+
+    Args:
+        docs_dir: Documents directory
+
+    Returns:
+        {'primary': {key: entry} for PRIMARY_ASSETS that exist,
+         'versions': [entry, ...] resumes first, then cover letters}
+    """
+    docs_dir = Path(docs_dir)
+    primary = {}
+    for key, (name, label, file_name) in PRIMARY_ASSETS.items():
+        path = docs_dir / name
+        if path.is_file():
+            primary[key] = describe(path, key, label, file_name)
+
+    versions_dir = docs_dir / "versions"
+    versions = []
+    for kind in VERSION_KINDS:
+        for path in sorted(versions_dir.glob(f"{kind}_*")):
+            entry = describe_version(path) if path.is_file() else None
+            if entry:
+                versions.append(entry)
+
+    return {'primary': primary, 'versions': versions}
+
+
+def read_asset(path: str) -> bytes:
+    """Read an asset's bytes (cached by the caller, keyed by mtime)."""
+    return Path(path).read_bytes()
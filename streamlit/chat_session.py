@@ -0,0 +1,308 @@
+"""
+CV-RAG Chat Session
+===================
+Multi-turn conversation state with a bounded, compacted history window.
+
+Each follow-up question is sent to the pipeline together with a compact
+view of the conversation, so "what about before that?" has something to
+refer to. The window never grows past a fixed token budget:
+
+- The most recent turns are sent verbatim (answers clipped), up to
+  history_tokens.
+- Older turns are folded into a one-line extractive summary each (the
+  question and the first sentence of the answer), capped at
+  summary_tokens. This costs no extra LLM call, so summarizing does not
+  add latency.
+- When a follow-up stays on the topic of the last retrieval (its
+  embedding is within topic_threshold cosine similarity of the question
+  that retrieved), that question's chunks are sent again as context,
+  capped at context_tokens, so the agent can answer without searching
+  the knowledge base again. The n8n workflows answer with text only, so
+  unless the result carries chunk texts in 'sources', the chunks are
+  looked up once per topic with retrieve_chunks(): the same cv_chunks
+  table, embedding model and top-k as the pipeline's Query Data Tool.
+
+The first question of a conversation is sent as-is, so it still gets
+precomputed and cached answers.
+
+Tokens are estimated at ~4 characters each; the budgets are meant to keep
+prompt size (and LLM latency) flat, not to match a tokenizer exactly.
+
+Configuration (environment variables read by app.py):
+    CHAT_MODE             - set to 1 to start in chat mode (default off)
+    CHAT_HISTORY_TOKENS   - budget for verbatim recent turns (default 1024)
+    CHAT_SUMMARY_TOKENS   - budget for the summary of older turns (default 256)
+    CHAT_CONTEXT_TOKENS   - budget for reused retrieved chunks (default 768)
+    CHAT_TOPIC_THRESHOLD  - cosine similarity for "same topic" (default 0.75)
+
+Topic detection needs question embeddings (OLLAMA_API_URL) and chunk
+lookup needs the database (NEON_CONNECTION_STRING); without them every
+follow-up is sent with the conversation window only.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import importlib.util
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+
+# psycopg2 is only needed to look up the chunks of a topic
+PSYCOPG2_AVAILABLE = importlib.util.find_spec("psycopg2") is not None
+
+# Longest summary line for one folded turn
+SUMMARY_LINE_TOKENS = 48
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """
+    Shorten text to about max_tokens, at a word boundary.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget
+
+    Returns:
+        The text, or its start followed by " …"
+    """
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+
+def summarize_turn(question: str, answer: str) -> str:
+    """
+    One-line extractive summary of a turn.
+
+    Args:
+        question: User's question
+        answer: Assistant's answer
+
+    Returns:
+        "<question> → <first sentence of the answer>", clipped
+    """
+    first_sentence = re.split(r"(?<=[.!?])\s+", " ".join(answer.split()), maxsplit=1)[0]
+    return clip(f"{' '.join(question.split())} → {first_sentence}", SUMMARY_LINE_TOKENS)
+
+
+def source_text(source) -> str:
+    """
+    Chunk text of one entry in a result's 'sources'.
+
+    Args:
+        source: Chunk dictionary ('content' or 'text'), text, or an ID
+
+    Returns:
+        The chunk text, or "" for bare chunk IDs such as "resume_0"
+    """
+    if isinstance(source, dict):
+        return str(source.get('content') or source.get('text') or "")
+    if isinstance(source, str) and " " in source.strip():
+        return source.strip()
+    return ""
+
+
+def retrieve_chunks(connection_string: str, embedding, top_k: int = 5) -> List[str]:
+    """
+    Chunks of cv_chunks nearest to a question, as the pipeline retrieves them.
+
+    Args:
+        connection_string: Postgres connection string (NEON_CONNECTION_STRING)
+        embedding: Question embedding from the pipeline's embedding model
+        top_k: Number of chunks (the Query Data Tool uses 5)
+
+    Returns:
+        Chunk texts, nearest first (empty if the database is not configured
+        or the lookup fails)
+    """
+    if not connection_string or embedding is None or not PSYCOPG2_AVAILABLE:
+        return []
+
+    import psycopg2
+
+    vector = "[" + ",".join(str(float(value)) for value in embedding) + "]"
+    conn = None
+    try:
+        conn = psycopg2.connect(connection_string, connect_timeout=5)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT content FROM cv_chunks ORDER BY embedding <=> %s::vector LIMIT %s",
+                           (vector, top_k))
+            return [row[0] for row in cursor.fetchall()]
+    except psycopg2.Error:
+        return []
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+class ChatSession:
+    """
+    Conversation kept in st.session_state, and the window sent per turn.
+
+    Args:
+        history_tokens: Budget for verbatim recent turns
+        summary_tokens: Budget for the summary of older turns
+        context_tokens: Budget for reused retrieved chunks
+        topic_threshold: Minimum cosine similarity for a same-topic follow-up
+        retrieve_fn: Maps a question embedding to its chunk texts, used when
+            the pipeline's result carries none (e.g. retrieve_chunks)
+    """
+
+    def __init__(self, history_tokens: int = 1024, summary_tokens: int = 256,
+                 context_tokens: int = 768, topic_threshold: float = 0.75,
+                 retrieve_fn: Optional[Callable[..., List[str]]] = None):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.context_tokens = context_tokens
+        self.topic_threshold = topic_threshold
+        self.retrieve_fn = retrieve_fn
+        self.clear()
+
+    def clear(self):
+        """Start a new conversation."""
+        self.turns = []         # full transcript, for display
+        self.summary = []       # one line per turn folded out of the window
+        self.summarized = 0     # turns[:summarized] are only in the summary
+        self.dropped = 0        # summary lines dropped to fit summary_tokens
+        self.topic = None       # embedding and chunks of the last retrieval
+        self.last_window = {}
+
+    def format_turn(self, turn: Dict) -> str:
+        """A turn as sent in the window (long answers clipped)."""
+        return f"User: {turn['question']}\nAssistant: {clip(turn['answer'], self.history_tokens // 2)}"
+
+    def _recent(self) -> List[Dict]:
+        return [turn for turn in self.turns[self.summarized:] if not turn['error']]
+
+    def _history_size(self) -> int:
+        return sum(estimate_tokens(self.format_turn(turn)) for turn in self._recent())
+
+    def compact(self):
+        """Fold the oldest turns into the summary until the window fits its budgets."""
+        while self.summarized < len(self.turns) - 1 and self._history_size() > self.history_tokens:
+            turn = self.turns[self.summarized]
+            if not turn['error']:
+                self.summary.append(summarize_turn(turn['question'], turn['answer']))
+            self.summarized += 1
+
+        while len(self.summary) > 1 and estimate_tokens("\n".join(self.summary)) > self.summary_tokens:
+            self.summary.pop(0)
+            self.dropped += 1
+
+    def is_follow_up(self, embedding) -> bool:
+        """
+        Whether a question stays on the topic of the last retrieval.
+
+        Args:
+            embedding: Normalized question embedding (None: unknown)
+
+        Returns:
+            True if its cosine similarity to the retrieving question is at
+            least topic_threshold
+        """
+        if embedding is None or not self.topic:
+            return False
+        similarity = float(sum(a * b for a, b in zip(embedding, self.topic['embedding'])))
+        return similarity >= self.topic_threshold
+
+    def topic_context(self) -> List[str]:
+        """
+        Chunk texts of the current topic, looked up on first use.
+
+        Returns:
+            The chunks from the retrieving answer's 'sources', or else those
+            from retrieve_fn (empty if neither is available)
+        """
+        if self.topic['context'] is None:
+            self.topic['context'] = self.retrieve_fn(self.topic['embedding']) if self.retrieve_fn else []
+        return self.topic['context']
+
+    def build_prompt(self, question: str, embedding=None) -> Tuple[str, bool]:
+        """
+        Text to send to the pipeline for the next question.
+
+        Args:
+            question: User's question
+            embedding: Normalized question embedding, for topic detection
+
+        Returns:
+            (prompt, reused): the bare question when there is no history yet,
+            otherwise the compacted window ending with the question; reused
+            is True if retrieved chunks were carried over
+        """
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(f"- {line}" for line in self.summary))
+
+        recent = [self.format_turn(turn) for turn in self._recent()]
+        if recent:
+            parts.append("Recent conversation:\n" + "\n\n".join(recent))
+
+        reused = self.is_follow_up(embedding) and bool(self.topic_context())
+        if reused:
+            context = clip("\n---\n".join(self.topic['context']), self.context_tokens)
+            parts.append("Context already retrieved for this topic (answer from it, and search the "
+                         f"knowledge base only if it is not enough):\n{context}")
+
+        prompt = "\n\n".join(parts + [f"Current question: {question}"]) if parts else question
+        self.last_window = {
+            'prompt_tokens': estimate_tokens(prompt),
+            'recent_turns': len(recent),
+            'summary_lines': len(self.summary),
+            'reused_context': reused
+        }
+        return prompt, reused
+
+    def add_turn(self, question: str, result: Dict, embedding=None, reused: bool = False):
+        """
+        Record an answered question and compact the history.
+
+        Args:
+            question: User's question
+            result: Response dictionary ('answer', optional 'sources', 'error')
+            embedding: Normalized question embedding (None: unknown)
+            reused: Whether the answer came from carried-over chunks, in which
+                case the topic (and its chunks) stays anchored where it was
+        """
+        error = bool(result.get('error'))
+        self.turns.append({
+            'question': question,
+            'answer': result.get('answer', ''),
+            'sources': result.get('sources'),
+            'error': error
+        })
+
+        if not error and not reused:
+            # None: the answer carried no chunk texts, look them up if a follow-up needs them
+            context = [text for text in map(source_text, result.get('sources') or []) if text] or None
+            self.topic = {'embedding': embedding, 'context': context} if embedding is not None else None
+
+        self.compact()
+
+    def stats(self) -> Dict:
+        """
+        Window size and compaction counters, for the debug panel.
+
+        Returns:
+            Dictionary of chat window statistics
+        """
+        return {
+            'turns': len(self.turns),
+            'summarized_turns': self.summarized,
+            'dropped_summary_lines': self.dropped,
+            'history_tokens': self._history_size(),
+            'summary_tokens': estimate_tokens("\n".join(self.summary)),
+            'topic_chunks': len(self.topic['context'] or []) if self.topic else 0,
+            'last_window': self.last_window,
+            'budgets': {'history': self.history_tokens, 'summary': self.summary_tokens,
+                        'context': self.context_tokens, 'topic_threshold': self.topic_threshold}
+        }
+
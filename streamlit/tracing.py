@@ -0,0 +1,215 @@
+"""
+CV-RAG Stage Tracing
+====================
+Per-stage latency for one question: embed, retrieve, rerank, prompt_build,
+generate and http_transfer.
+
+StageTimer always records wall-clock milliseconds per stage (two
+perf_counter calls, cheap enough to leave on), so the timings can be
+returned in the response payload and shown in the debug panel. When the
+OpenTelemetry SDK is installed (`pip install opentelemetry-sdk`) and
+TRACING is set, every stage is also exported as a span:
+
+    TRACING=console     print finished spans to stdout
+    TRACING=file        append one JSON span per line to TRACING_FILE
+                        (default: traces.jsonl)
+
+Stages that ran in another process come back as "<stage>_ms" fields in
+its response (the embedding service, query.py's retrievers, the local
+webhook stub); StageTimer.record adds them as child spans of the request
+that carried them. The n8n workflows report no stage timings, so for the
+live pipeline only the end-to-end webhook round trip is measured.
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+OTEL_AVAILABLE = (importlib.util.find_spec("opentelemetry") is not None
+                  and importlib.util.find_spec("opentelemetry.sdk") is not None)
+
+# Pipeline stages, in execution order
+STAGES = ("embed", "retrieve", "rerank", "prompt_build", "generate", "http_transfer")
+
+# perf_counter() -> epoch, for spans whose start/end were measured earlier
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """
+    OpenTelemetry tracer for the exporter chosen by TRACING.
+
+    Returns:
+        Tracer, or None when tracing is off or the SDK is not installed
+    """
+    global _tracer
+    exporter_name = os.getenv("TRACING", "").lower()
+    if exporter_name not in ("console", "file") or not OTEL_AVAILABLE:
+        return None
+
+    with _tracer_lock:
+        if _tracer is None:
+            from opentelemetry import trace
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+            if exporter_name == "file":
+                out = open(os.getenv("TRACING_FILE", "traces.jsonl"), "a", encoding="utf-8")
+                exporter = ConsoleSpanExporter(out=out,
+                                               formatter=lambda span: span.to_json(indent=None) + "\n")
+            else:
+                exporter = ConsoleSpanExporter()
+
+            provider = TracerProvider(resource=Resource.create({
+                "service.name": os.getenv("OTEL_SERVICE_NAME", "cv-rag")
+            }))
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+            trace.set_tracer_provider(provider)
+            _tracer = trace.get_tracer("cv-rag")
+    return _tracer
+
+
+def to_ns(perf_time: float) -> int:
+    """Convert a perf_counter() reading to epoch nanoseconds for a span."""
+    return int((perf_time + _EPOCH_OFFSET) * 1e9)
+
+
+class StageTimer:
+    """
+    Time the stages of one request, mirroring each as an OpenTelemetry span.
+
+    Used as a context manager it also opens a root span and records
+    'total_ms'; stages are parented to that root explicitly rather than
+    through the current context, so they may run on other threads (the
+    webhook client's event loop) or inside generators (streaming).
+
+    Example:
+        with StageTimer("answer_question") as timer:
+            with timer.stage("retrieve"):
+                ...
+        timer.timings  # {'retrieve_ms': 12.3, 'total_ms': 13.0}
+
+    Args:
+        name: Root span name
+        **attributes: Root span attributes
+    """
+
+    def __init__(self, name: str = "request", **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.timings: Dict[str, float] = {}
+        self._tracer = get_tracer()
+        self._root = None
+        self._context = None
+        self._start = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        if self._tracer is not None:
+            from opentelemetry import trace
+            self._root = self._tracer.start_span(self.name, attributes=self.attributes)
+            self._context = trace.set_span_in_context(self._root)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.add("total", (time.perf_counter() - self._start) * 1000)
+        if self._root is not None:
+            if exc is not None:
+                self._root.record_exception(exc)
+            self._root.set_attributes({f"timing.{key}": value for key, value in self.timings.items()})
+            self._root.end()
+        return False
+
+    def add(self, stage: str, ms: float):
+        """
+        Add milliseconds to a stage's timing (no span).
+
+        Args:
+            stage: Stage name; stored as '<stage>_ms'
+            ms: Elapsed milliseconds
+        """
+        key = f"{stage}_ms"
+        with self._lock:
+            self.timings[key] = round(self.timings.get(key, 0.0) + ms, 1)
+
+    @contextmanager
+    def stage(self, stage: str, **attributes):
+        """
+        Time a block as one stage.
+
+        Args:
+            stage: Stage name, e.g. "retrieve"
+            **attributes: Span attributes
+
+        Yields:
+            Dict of extra attributes to set on the span when the block ends
+        """
+        span = None
+        if self._tracer is not None:
+            span = self._tracer.start_span(stage, context=self._context, attributes=attributes)
+        extra = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+            if span is not None:
+                if extra:
+                    span.set_attributes(extra)
+                span.end()
+
+    def record(self, timings: Dict, end: float, stages: Iterable[str] = STAGES) -> float:
+        """
+        Add stages timed by another process, e.g. the pipeline's 'timings'.
+
+        Spans are laid end to end, in stage order, finishing at `end` (when
+        the response started arriving), since only durations are reported.
+
+        Args:
+            timings: Mapping of '<stage>_ms' -> milliseconds
+            end: perf_counter() time the remote work finished
+            stages: Stage order
+
+        Returns:
+            Total milliseconds of the reported stages
+        """
+        reported = [(stage, float(timings[f"{stage}_ms"])) for stage in stages
+                    if isinstance(timings.get(f"{stage}_ms"), (int, float))]
+        total = sum(ms for _, ms in reported)
+
+        start = end - total / 1000
+        for stage, ms in reported:
+            self.add(stage, ms)
+            if self._tracer is not None:
+                span = self._tracer.start_span(stage, context=self._context, start_time=to_ns(start),
+                                               attributes={"remote": True})
+                span.end(end_time=to_ns(start + ms / 1000))
+            start += ms / 1000
+        return total
+
+
+def format_timings(timings: Optional[Dict]) -> str:
+    """
+    One-line summary of stage timings, e.g. "embed 12.0 ms | retrieve 3.1 ms".
+
+    Args:
+        timings: Mapping of '<stage>_ms' -> milliseconds
+
+    Returns:
+        Summary string (empty without timings)
+    """
+    if not timings:
+        return ""
+    return " | ".join(f"{key[:-3]} {value:.1f} ms" for key, value in timings.items()
+                      if key.endswith("_ms") and isinstance(value, (int, float)))
@@ -0,0 +1,198 @@
+"""
+CV-RAG Warm Answers
+===================
+Precomputes answers for the canned sample questions after each ingest.
+
+The sidebar sample questions make up a large share of traffic, yet each
+click used to send a 20-30 second request through the full RAG pipeline.
+This job asks the webhook every canned question once (concurrently) and
+writes the answers to a versioned artifact. The app loads it once at
+startup and renders a sample question's answer in milliseconds, without
+any LLM load.
+
+The artifact records the version of the corpus in cv_chunks it was
+generated against (see answer_cache.ingested_corpus_version). The app reads
+the same version from the database and ignores a stale artifact; without a
+database connection it trusts the version recorded here.
+
+This job is the last step of ingestion: archive/scripts/embedder.py runs it
+after writing cv_chunks, and after n8n Workflow 1 it is run by hand. It is
+a no-op when the artifact already matches the corpus.
+
+Usage:
+    python streamlit/warm_answers.py [--questions sample_questions.json] [--output warm_answers.json]
+    python streamlit/warm_answers.py --force    # regenerate even if up to date
+
+Artifact format:
+    {
+        "format": 1,
+        "corpus_version": "...",
+        "generated_at": "2025-11-05T20:36:10+00:00",
+        "answers": {"<question>": {"answer": "...", "sources": [...]}, ...}
+    }
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from answer_cache import ingested_corpus_version
+from webhook_client import WebhookClient
+
+APP_DIR = Path(__file__).parent
+SAMPLE_QUESTIONS_FILE = APP_DIR / "sample_questions.json"
+WARM_ANSWERS_FILE = APP_DIR / "warm_answers.json"
+ARTIFACT_FORMAT = 1
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive key for matching typed questions."""
+    return " ".join(question.lower().split())
+
+
+def load_sample_questions(path=SAMPLE_QUESTIONS_FILE) -> List[str]:
+    """
+    Load the canned sample questions.
+
+    Args:
+        path: JSON file containing a list of questions
+
+    Returns:
+        List of questions
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_artifact(path=WARM_ANSWERS_FILE) -> Optional[Dict]:
+    """
+    Read a warm-answers artifact.
+
+    Args:
+        path: Artifact written by generate_warm_answers
+
+    Returns:
+        Artifact dictionary, or None if it is missing, unreadable or in an
+        older format
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return artifact if artifact.get("format") == ARTIFACT_FORMAT else None
+
+
+def load_warm_answers(path=WARM_ANSWERS_FILE, corpus_version: str = None) -> Dict[str, Dict]:
+    """
+    Load precomputed answers if they match the current corpus.
+
+    Args:
+        path: Artifact written by generate_warm_answers
+        corpus_version: Current corpus version (None trusts the artifact)
+
+    Returns:
+        Mapping of normalized question -> result dictionary (empty if the
+        artifact is missing, unreadable or stale)
+    """
+    artifact = read_artifact(path)
+    if artifact is None:
+        return {}
+    if corpus_version is not None and artifact.get("corpus_version") != corpus_version:
+        return {}
+
+    return {normalize_question(q): result for q, result in artifact.get("answers", {}).items()}
+
+
+def generate_warm_answers(questions: List[str], client: WebhookClient, corpus_version: str) -> Dict:
+    """
+    Ask the pipeline every question concurrently and build the artifact.
+
+    Args:
+        questions: Canned questions to precompute
+        client: WebhookClient pointed at the query webhook
+        corpus_version: Version of the corpus the answers come from
+
+    Returns:
+        Artifact dictionary (questions that failed are left out)
+    """
+    results = client.query_many(questions)
+
+    answers = {}
+    for question, result in zip(questions, results):
+        if result.get('error'):
+            print(f"  ❌ {question}: {result['answer']}")
+            continue
+        answers[question] = {key: value for key, value in result.items() if key in ('answer', 'sources')}
+        print(f"  ✅ {question}")
+
+    return {
+        "format": ARTIFACT_FORMAT,
+        "corpus_version": corpus_version,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "answers": answers
+    }
+
+
+def main():
+    """Precompute warm answers and write the artifact atomically (exit 1 on failure)."""
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Precompute answers for the sample questions")
+    parser.add_argument("--questions", default=SAMPLE_QUESTIONS_FILE, help="JSON list of questions")
+    parser.add_argument("--output", default=WARM_ANSWERS_FILE, help="Artifact path")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the artifact is up to date")
+    args = parser.parse_args()
+
+    webhook_url = os.getenv("N8N_WEBHOOK_URL")
+    if not webhook_url:
+        print("❌ Error: N8N_WEBHOOK_URL not found in .env file")
+        sys.exit(1)
+
+    questions = load_sample_questions(args.questions)
+    corpus_version = os.getenv("CORPUS_VERSION") or ingested_corpus_version(os.getenv("NEON_CONNECTION_STRING"))
+    if corpus_version is None:
+        print("❌ Error: cannot read the corpus version from cv_chunks "
+              "(set NEON_CONNECTION_STRING, or CORPUS_VERSION)")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("CV-RAG Warm Answers")
+    print("=" * 60)
+
+    output = Path(args.output)
+    existing = read_artifact(output)
+    if (not args.force and existing and existing.get("corpus_version") == corpus_version
+            and set(questions) <= set(existing.get("answers", {}))):
+        print(f"✅ {output} is up to date (corpus version {corpus_version})")
+        return
+
+    print(f"Precomputing {len(questions)} answers (corpus version {corpus_version})...")
+
+    start = time.perf_counter()
+    artifact = generate_warm_answers(questions, WebhookClient(webhook_url, timeout=120), corpus_version)
+    if not artifact['answers']:
+        print(f"\n❌ No answers generated; {output} was not changed")
+        sys.exit(1)
+
+    tmp_path = output.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output)
+
+    print(f"\n✨ Saved {len(artifact['answers'])}/{len(questions)} answers to {output} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
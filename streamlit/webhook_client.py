@@ -0,0 +1,345 @@
+"""
+CV-RAG Webhook Client
+=====================
+Pooled HTTP client for the n8n query webhook, shared across Streamlit reruns.
+
+`requests.post` without a session opens a new TCP + TLS connection for
+every question. WebhookClient keeps connections alive (HTTP/2 when the `h2`
+package is installed), and offers both a blocking query() and an async
+path that runs on a background event loop, so several questions can be in
+flight at once while the Streamlit script keeps rendering.
+
+When a streaming webhook URL is configured, stream() yields answer tokens
+as the n8n AI Agent produces them (n8n's newline-delimited JSON events, or
+Server-Sent Events `data:` lines), for rendering with st.write_stream.
+
+Each request is traced with httpx's `trace` extension to record whether a
+new connection had to be opened and the time to first byte (TTFB). Pass a
+tracing.StageTimer to time the round trip as a "webhook" stage, returned
+in result['timings']. The n8n workflows answer without stage timings, so
+against them that end-to-end time is all there is. A pipeline that does
+report a 'timings' field (such as scripts/webhook_stub.py) has its stages
+added to it, and the remainder of the round trip becomes "http_transfer".
+
+Author: Mike Murphy
+Project: CV-RAG
+"""
+
+import asyncio
+import importlib.util
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+from tracing import StageTimer
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class WebhookError(Exception):
+    """Raised when the webhook answers with a non-200 status."""
+
+
+def parse_stream_line(line: str) -> Optional[str]:
+    """
+    Extract the answer text from one line of a streaming response.
+
+    Handles n8n's streaming format ({"type": "item", "content": ...} per
+    line, plus "begin"/"end" events) and SSE `data:` lines carrying either
+    such an event or plain text.
+
+    Args:
+        line: One line of the response body
+
+    Returns:
+        Token text, or None for control/empty lines
+    """
+    line = line.strip()
+    if line.startswith("data:"):
+        line = line[5:].strip()
+        if line == "[DONE]":
+            return None
+    elif line.startswith(("event:", "id:", "retry:", ":")):
+        return None
+    if not line:
+        return None
+
+    try:
+        event = json.loads(line)
+    except json.JSONDecodeError:
+        return line
+
+    if isinstance(event, dict):
+        if event.get("type") == "item":
+            return event.get("content") or None
+        if event.get("type") == "error":
+            raise WebhookError(event.get("content") or "Streaming error")
+        return None
+    return None
+
+
+class RequestTrace:
+    """Collects httpcore trace events for a single request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.new_connection = False
+        self.ttfb = None
+        self.first_token = None
+
+    def record(self, event_name: str):
+        if event_name.startswith("connection.connect_tcp"):
+            self.new_connection = True
+        elif event_name.endswith("receive_response_headers.complete") and self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.start
+
+    def sync_hook(self, event_name: str, info: dict):
+        self.record(event_name)
+
+    async def async_hook(self, event_name: str, info: dict):
+        self.record(event_name)
+
+
+class WebhookClient:
+    """
+    Keep-alive client for the n8n webhook with sync and async query paths.
+
+    Args:
+        webhook_url: n8n webhook endpoint
+        timeout: Seconds to wait for a response
+        max_connections: Upper bound on pooled connections
+        stream_url: Optional streaming webhook endpoint (see stream())
+    """
+
+    def __init__(self, webhook_url: str, timeout: float = 60, max_connections: int = 10,
+                 stream_url: str = None):
+        self.webhook_url = webhook_url
+        self.stream_url = stream_url
+        self.timeout = timeout
+        self.http2 = HTTP2_AVAILABLE
+
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections,
+                              keepalive_expiry=120)
+        self.client = httpx.Client(http2=self.http2, timeout=timeout, limits=limits)
+
+        # Async requests run on a dedicated loop so the AsyncClient (and its
+        # pooled connections) survive across Streamlit reruns
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="webhook-client", daemon=True)
+        self._thread.start()
+        self.async_client = asyncio.run_coroutine_threadsafe(self._make_async_client(limits), self._loop).result()
+
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=50)
+        self.requests = 0
+        self.new_connections = 0
+
+    async def _make_async_client(self, limits: httpx.Limits) -> httpx.AsyncClient:
+        return httpx.AsyncClient(http2=self.http2, timeout=self.timeout, limits=limits)
+
+    def _record(self, trace: RequestTrace, response: httpx.Response = None):
+        """Update connection-reuse and TTFB statistics."""
+        with self._lock:
+            self.requests += 1
+            self.new_connections += int(trace.new_connection)
+            self._history.append({
+                'new_connection': trace.new_connection,
+                'http_version': response.http_version if response is not None else None,
+                'ttfb_ms': round(trace.ttfb * 1000, 1) if trace.ttfb is not None else None,
+                'first_token_ms': round(trace.first_token * 1000, 1) if trace.first_token is not None else None,
+                'total_ms': round((time.perf_counter() - trace.start) * 1000, 1)
+            })
+
+    @staticmethod
+    def _parse(response: httpx.Response, trace: RequestTrace, timer: StageTimer) -> Dict:
+        """Turn a webhook response into the app's result dictionary, with stage timings."""
+        if response.status_code == 200:
+            result = response.json()
+        else:
+            result = {
+                'answer': f"Error: Received status code {response.status_code}",
+                'error': True
+            }
+
+        reported = result.get('timings')
+        if isinstance(reported, dict):
+            # The pipeline finished just before its response headers arrived
+            end = trace.start + trace.ttfb if trace.ttfb is not None else time.perf_counter()
+            pipeline_ms = timer.record(reported, end)
+            if pipeline_ms:
+                timer.add("http_transfer", max(timer.timings.get('webhook_ms', 0.0) - pipeline_ms, 0.0))
+        result['timings'] = dict(timer.timings)
+        return result
+
+    @staticmethod
+    def error_result(e: Exception) -> Dict:
+        """
+        Turn an exception into the app's error result dictionary.
+
+        Args:
+            e: Exception raised while querying
+
+        Returns:
+            Dictionary with a user-facing 'answer' and 'error': True
+        """
+        if isinstance(e, WebhookError):
+            return {'answer': f"Error: {str(e)}", 'error': True}
+        if isinstance(e, httpx.TimeoutException):
+            return {'answer': "Request timed out. Please try again.", 'error': True}
+        return {'answer': f"Error: {str(e)}", 'error': True}
+
+    def query(self, question: str, timer: StageTimer = None) -> Dict:
+        """
+        Send a question and block until the answer arrives.
+
+        Args:
+            question: User's question
+            timer: Optional StageTimer to record stage timings into
+
+        Returns:
+            Response dictionary with 'answer', 'timings' and optional 'sources'
+        """
+        if timer is None:
+            with StageTimer("webhook.query") as timer:
+                return self.query(question, timer)
+
+        trace = RequestTrace()
+        response = None
+        try:
+            with timer.stage("webhook", url=self.webhook_url) as span:
+                response = self.client.post(self.webhook_url, json={'chatInput': question},
+                                            extensions={'trace': trace.sync_hook})
+                span['http.status_code'] = response.status_code
+            return self._parse(response, trace, timer)
+        except Exception as e:
+            return self.error_result(e)
+        finally:
+            self._record(trace, response)
+
+    async def query_async(self, question: str, timer: StageTimer = None) -> Dict:
+        """
+        Async variant of query(); must run on this client's event loop.
+
+        Args:
+            question: User's question
+            timer: Optional StageTimer to record stage timings into
+
+        Returns:
+            Response dictionary with 'answer', 'timings' and optional 'sources'
+        """
+        if timer is None:
+            with StageTimer("webhook.query") as timer:
+                return await self.query_async(question, timer)
+
+        trace = RequestTrace()
+        response = None
+        try:
+            with timer.stage("webhook", url=self.webhook_url) as span:
+                response = await self.async_client.post(self.webhook_url, json={'chatInput': question},
+                                                        extensions={'trace': trace.async_hook})
+                span['http.status_code'] = response.status_code
+            return self._parse(response, trace, timer)
+        except Exception as e:
+            return self.error_result(e)
+        finally:
+            self._record(trace, response)
+
+    def stream(self, question: str, timer: StageTimer = None) -> Iterator[str]:
+        """
+        Send a question to the streaming webhook and yield tokens as they arrive.
+
+        The stream carries no pipeline timings; the timer gets the round trip
+        ("webhook") and the time to the first token ("first_token").
+
+        Args:
+            question: User's question
+            timer: Optional StageTimer to record stage timings into
+
+        Yields:
+            Answer text fragments
+
+        Raises:
+            WebhookError: The webhook returned a non-200 status or an error event
+            httpx.HTTPError: Connection problems or timeouts
+        """
+        if not self.stream_url:
+            raise WebhookError("No streaming webhook URL configured")
+
+        if timer is None:
+            with StageTimer("webhook.stream") as timer:
+                yield from self.stream(question, timer)
+            return
+
+        trace = RequestTrace()
+        response = None
+        try:
+            with timer.stage("webhook", url=self.stream_url, streaming=True), \
+                    self.client.stream("POST", self.stream_url, json={'chatInput': question},
+                                       extensions={'trace': trace.sync_hook}) as response:
+                if response.status_code != 200:
+                    raise WebhookError(f"Received status code {response.status_code}")
+
+                for line in response.iter_lines():
+                    token = parse_stream_line(line)
+                    if token:
+                        if trace.first_token is None:
+                            trace.first_token = time.perf_counter() - trace.start
+                            timer.add("first_token", trace.first_token * 1000)
+                        yield token
+        finally:
+            self._record(trace, response)
+
+    def submit(self, question: str, timer: StageTimer = None) -> Future:
+        """
+        Fire a question without blocking.
+
+        Args:
+            question: User's question
+            timer: Optional StageTimer to record stage timings into
+
+        Returns:
+            concurrent.futures.Future resolving to the response dictionary
+        """
+        return asyncio.run_coroutine_threadsafe(self.query_async(question, timer), self._loop)
+
+    def query_many(self, questions: List[str]) -> List[Dict]:
+        """
+        Send several questions concurrently and wait for all answers.
+
+        Args:
+            questions: Questions to ask
+
+        Returns:
+            Response dictionaries in the same order as questions
+        """
+        futures = [self.submit(question) for question in questions]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict:
+        """
+        Connection reuse and latency statistics for the debug panel.
+
+        Returns:
+            Dictionary with totals and the most recent requests
+        """
+        with self._lock:
+            history = list(self._history)
+            requests_sent, new_connections = self.requests, self.new_connections
+
+        ttfbs = sorted(h['ttfb_ms'] for h in history if h['ttfb_ms'] is not None)
+        first_tokens = sorted(h['first_token_ms'] for h in history if h['first_token_ms'] is not None)
+        return {
+            'http2_enabled': self.http2,
+            'requests': requests_sent,
+            'new_connections': new_connections,
+            'reused_connections': requests_sent - new_connections,
+            'median_ttfb_ms': ttfbs[len(ttfbs) // 2] if ttfbs else None,
+            'median_first_token_ms': first_tokens[len(first_tokens) // 2] if first_tokens else None,
+            'recent': history[::-1]
+        }
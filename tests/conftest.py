@@ -0,0 +1,12 @@
+"""
+Test configuration: the scripts under test import their siblings by
+module name, so their directories go on sys.path like when they run.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+for directory in ("archive/scripts", "scripts"):
+    sys.path.insert(0, str(REPO_ROOT / directory))
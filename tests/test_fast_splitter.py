@@ -0,0 +1,36 @@
+"""
+FastRecursiveSplitter must split every document under docs/ into exactly
+the chunks LangChain's RecursiveCharacterTextSplitter produces (configured
+as chunk_document used to), for every configuration in
+benchmark_splitter.CONFIGS.
+"""
+
+import pytest
+
+pytest.importorskip("langchain_text_splitters")
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: E402
+
+from benchmark_splitter import CONFIGS, load_corpus  # noqa: E402
+from chunker import SEPARATORS  # noqa: E402
+from fast_splitter import FastRecursiveSplitter  # noqa: E402
+
+CORPUS = load_corpus()
+
+
+def test_corpus_found():
+    assert CORPUS, "no Markdown documents under docs/"
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", CONFIGS)
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_matches_langchain(name, chunk_size, chunk_overlap):
+    reference = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=list(SEPARATORS),
+        length_function=len,
+    )
+    fast = FastRecursiveSplitter(chunk_size, chunk_overlap, separators=list(SEPARATORS))
+
+    assert fast.split_text(CORPUS[name]) == reference.split_text(CORPUS[name])
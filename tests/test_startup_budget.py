@@ -0,0 +1,25 @@
+"""
+Every entry point in scripts/startup_budget.json must import within its
+budget and without its forbidden packages (see benchmark_startup.py).
+"""
+
+import json
+
+import pytest
+
+from benchmark_startup import DEFAULT_BUDGET, REPO_ROOT, check, measure
+
+with open(DEFAULT_BUDGET, encoding="utf-8") as f:
+    BUDGETS = json.load(f)['modules']
+
+
+@pytest.mark.parametrize("path", sorted(BUDGETS))
+def test_import_within_budget(path):
+    try:
+        result = measure(REPO_ROOT / path, runs=3, top=5)
+    except RuntimeError as e:
+        if "ModuleNotFoundError" in str(e):
+            pytest.skip(f"dependency not installed: {e}")
+        raise
+
+    assert check(path, BUDGETS[path], result) == []